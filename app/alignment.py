@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from app.cache import LRUCache, data_fingerprint
+from app.timeseries import SeriesLike, TimeSeries
+
+
+MAX_ALIGNMENT_CACHE_ENTRIES = 32
+
+_ALIGNMENT_CACHE = LRUCache(MAX_ALIGNMENT_CACHE_ENTRIES)
+
+
+@dataclass(frozen=True)
+class DailyAlignment:
+    days: np.ndarray
+    values: np.ndarray
+    volumes: np.ndarray
+    funding_rates: np.ndarray
+    market_values: np.ndarray
+    market_observed: np.ndarray
+    market_matches: int
+    market_provided: bool
+
+    def volume_list(self) -> list[float | None]:
+        return optional_values(self.volumes)
+
+    def funding_list(self) -> list[float | None]:
+        return optional_values(self.funding_rates)
+
+
+def optional_values(values: np.ndarray) -> list[float | None]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+def matched_or_fallback(values: Any, fallback: Any) -> list[float]:
+    """Return ``values`` when it covers ``fallback`` with positive numbers."""
+    candidate = np.asarray(values, dtype=np.float64)[: len(fallback)]
+    if len(candidate) != len(fallback) or not bool(np.all(candidate > 0)):
+        return [float(value) for value in fallback]
+    return candidate.tolist()
+
+
+def _values_on_days(days: np.ndarray, series: TimeSeries) -> np.ndarray:
+    daily = series.daily()
+    output = np.full(len(days), np.nan)
+    if not len(daily) or not len(days):
+        return output
+    daily_days = daily.days
+    positions = np.minimum(np.searchsorted(daily_days, days), len(daily_days) - 1)
+    matched = daily_days[positions] == days
+    output[matched] = daily.values[positions[matched]]
+    return output
+
+
+def _align(
+    prices: TimeSeries,
+    volumes: TimeSeries,
+    funding_rates: TimeSeries,
+    market_prices: TimeSeries,
+) -> DailyAlignment:
+    days = prices.days
+    market_provided = len(market_prices) > 0
+    market = _values_on_days(days, market_prices if market_provided else prices)
+    valid_market = np.isfinite(market) & (market > 0)
+    last_valid = np.where(valid_market, np.arange(len(days)), -1)
+    np.maximum.accumulate(last_valid, out=last_valid)
+    observed = last_valid >= 0
+    market_values = np.where(
+        observed,
+        market[np.maximum(last_valid, 0)],
+        prices.values,
+    )
+    return DailyAlignment(
+        days=days,
+        values=prices.values,
+        volumes=_values_on_days(days, volumes),
+        funding_rates=_values_on_days(days, funding_rates),
+        market_values=market_values,
+        market_observed=observed,
+        market_matches=int(valid_market.sum()),
+        market_provided=market_provided,
+    )
+
+
+def align_daily(
+    prices: TimeSeries,
+    volumes: SeriesLike | None = None,
+    funding_rates: SeriesLike | None = None,
+    market_prices: SeriesLike | None = None,
+) -> DailyAlignment:
+    """Align side series onto the daily price grid by integer epoch day.
+
+    Volumes and funding keep NaN where a day is missing; market prices are
+    forward-filled and fall back to the asset's own price before the first
+    observation. Results are reused while the input buffers are unchanged.
+    """
+    inputs = (
+        prices,
+        TimeSeries.from_points(volumes),
+        TimeSeries.from_points(funding_rates),
+        TimeSeries.from_points(market_prices),
+    )
+    key = data_fingerprint(
+        *(column for series in inputs for column in (series.timestamps, series.values))
+    )
+    cached = _ALIGNMENT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    alignment = _align(*inputs)
+    for array in (
+        alignment.days,
+        alignment.volumes,
+        alignment.funding_rates,
+        alignment.market_values,
+        alignment.market_observed,
+    ):
+        array.flags.writeable = False
+    return _ALIGNMENT_CACHE.put(key, alignment)
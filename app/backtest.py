@@ -1,9 +1,14 @@
+from bisect import bisect_left, bisect_right
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
+from functools import partial
 from math import sqrt
 from statistics import mean
-from typing import Any
+from typing import Any, Callable
 
+from app.alignment import align_daily
 from app.forecast import (
     DIRECTION_THRESHOLDS,
     MAX_CALIBRATION_SAMPLES,
@@ -13,27 +18,31 @@ from app.forecast import (
     apply_specialist_estimate,
     build_model_estimate,
     classify_direction,
-    daily_points,
-    daily_value_map,
-    technical_snapshot,
+    daily_series,
+    technical_snapshot_at,
 )
+from app.governor import limit_openmp_threads, openmp_threads
+from app.indicators import build_indicator_series
 from app.probability_models import (
     PROBABILITY_REGISTRY,
+    ProbabilityState,
     binary_log_loss,
     brier_score,
     calibration_error,
     prepare_probability_data,
-    probability_from_state,
+    probabilities_from_state,
     reliability_bins,
     safe_roc_auc,
     train_probability_model,
 )
 from app.specialist_models import (
     SPECIALIST_REGISTRY,
+    SpecialistState,
     prepare_specialist_data,
-    specialist_estimate_from_state,
+    specialist_estimates_from_state,
     train_specialist,
 )
+from app.timeseries import SeriesLike
 
 
 MINIMUM_TRAINING_DAYS = 61
@@ -77,52 +86,139 @@ def _agreement_bands(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
     return output
 
 
-def walk_forward_backtest(
-    prices: list[list[float]],
+@dataclass
+class WalkForwardRefits:
+    """Latest specialist and probability fits of a walk-forward run.
+
+    Fit days are UTC day numbers, so a later run over a longer history can
+    continue the refit schedule where this one stopped.
+    """
+
+    specialist_state: SpecialistState | None = None
+    specialist_day: int | None = None
+    probability_state: ProbabilityState | None = None
+    probability_day: int | None = None
+
+
+@dataclass
+class WalkForwardRun:
+    rows: list[dict[str, Any]]
+    refits: WalkForwardRefits
+
+
+def _day_index(days: list[int], day: int | None) -> int | None:
+    return None if day is None else bisect_left(days, day)
+
+
+def _refit_plan(
+    anchors: range,
+    last_refit: int | None,
+    has_state: bool,
+    refit_days: int,
+) -> list[int]:
+    plan = []
+    for anchor in anchors:
+        if not has_state or last_refit is None or anchor - last_refit >= refit_days:
+            plan.append(anchor)
+            last_refit = anchor
+            has_state = True
+    return plan
+
+
+def _train_all(jobs: list[Callable[[], Any]], workers: int) -> list[Any]:
+    if workers <= 1 or len(jobs) <= 1:
+        return [job() for job in jobs]
+    # Every estimator is seeded and single-threaded, so concurrent fits
+    # produce the same states as fitting them one after another. New threads
+    # start without the caller's OpenMP cap, so they split it between them.
+    workers = min(workers, len(jobs))
+    with ThreadPoolExecutor(
+        max_workers=workers,
+        initializer=limit_openmp_threads,
+        initargs=(max(1, openmp_threads() // workers),),
+    ) as executor:
+        return list(executor.map(lambda job: job(), jobs))
+
+
+def _segment_states(
+    anchors: range,
+    plan: list[int],
+    fits: list[Any],
+    carried_state: Any,
+) -> list[Any]:
+    """The state in force at every anchor: the latest fit at or before it."""
+    return [
+        fits[index - 1] if index else carried_state
+        for index in (bisect_right(plan, anchor) for anchor in anchors)
+    ]
+
+
+def _evaluate_segments(
+    states: list[Any],
+    features: list[Any],
+    evaluate: Callable[[Any, list[Any]], list[Any]],
+) -> list[Any]:
+    """Evaluate each run of anchors that share a state in one batch."""
+    output: list[Any] = []
+    start = 0
+    while start < len(states):
+        end = start
+        while end < len(states) and states[end] is states[start]:
+            end += 1
+        output.extend(evaluate(states[start], features[start:end]))
+        start = end
+    return output
+
+
+def extend_walk_forward(
+    prices: SeriesLike,
     horizon_days: int,
-    volumes: list[list[float]] | None = None,
+    volumes: SeriesLike | None = None,
     max_samples: int = MAX_BACKTEST_SAMPLES,
-    market_prices: list[list[float]] | None = None,
-    funding_rates: list[list[float]] | None = None,
+    market_prices: SeriesLike | None = None,
+    funding_rates: SeriesLike | None = None,
     minimum_refit_days: int | None = None,
-) -> dict[str, Any]:
+    after_day: int | None = None,
+    refits: WalkForwardRefits | None = None,
+    closed_only: bool = False,
+    refit_workers: int = 0,
+) -> WalkForwardRun:
+    """Walk-forward rows for the anchors after ``after_day``.
+
+    ``refits`` carries the fits of an earlier run, so only refits that fall
+    due among the new anchors are trained. With ``closed_only`` the last
+    daily point is treated as the still open candle and never evaluated.
+    With ``refit_workers`` above one the planned refits train on that many
+    threads; the rows are the same as with serial training.
+    """
     if horizon_days not in {1, 7, 30}:
         raise ValueError("Az időtáv 1, 7 vagy 30 nap lehet.")
 
-    points = daily_points(prices)
-    last_anchor = len(points) - horizon_days - 1
+    series = daily_series(prices)
+    if closed_only:
+        series = series[:-1]
+    last_anchor = len(series) - horizon_days - 1
     first_anchor = MINIMUM_TRAINING_DAYS - 1
     if last_anchor < first_anchor:
         raise ValueError("Nincs elegendő lezárt időszak a visszaméréshez.")
 
     first_anchor = max(first_anchor, last_anchor - max_samples + 1)
-    values = [float(point["price"]) for point in points]
-    volume_by_day = daily_value_map(volumes or [])
-    volume_values = [
-        volume_by_day.get(_parse_timestamp(point["timestamp"]).date().isoformat())
-        for point in points
-    ]
-    funding_by_day = daily_value_map(funding_rates or [])
-    funding_values = [
-        funding_by_day.get(_parse_timestamp(point["timestamp"]).date().isoformat())
-        for point in points
-    ]
-    market_by_day = daily_value_map(market_prices or prices)
-    market_values = []
-    previous_market_value = None
-    for point, fallback_value in zip(points, values):
-        day = _parse_timestamp(point["timestamp"]).date().isoformat()
-        market_value = market_by_day.get(day)
-        if market_value is not None and market_value > 0:
-            previous_market_value = market_value
-        market_values.append(float(previous_market_value or fallback_value))
+    days = series.days.tolist()
+    if after_day is not None:
+        first_anchor = max(first_anchor, bisect_right(days, after_day))
+    refits = replace(refits) if refits is not None else WalkForwardRefits()
+    if first_anchor > last_anchor:
+        return WalkForwardRun([], refits)
+
+    alignment = align_daily(series, volumes, funding_rates, market_prices)
+    values = series.values.tolist()
+    volume_values = alignment.volume_list()
+    funding_values = alignment.funding_list()
+    market_values = alignment.market_values.tolist()
     feature_first = MINIMUM_FEATURE_DAYS - 1
+    indicator_series = build_indicator_series(values, volume_values)
     snapshots = {
-        anchor: technical_snapshot(
-            values[: anchor + 1],
-            horizon_days,
-            volume_values[: anchor + 1],
-        )
+        anchor: technical_snapshot_at(indicator_series, anchor, horizon_days)
         for anchor in range(feature_first, last_anchor + 1)
     }
     calibration_samples = {
@@ -144,21 +240,83 @@ def walk_forward_backtest(
         horizon_days,
         funding_values,
     )
-    specialist_state = None
-    specialist_last_refit = None
+    anchors = range(first_anchor, last_anchor + 1)
     specialist_refit_days = max(
         SPECIALIST_REGISTRY[horizon_days].refit_days,
         minimum_refit_days or 0,
     )
-    probability_state = None
-    probability_last_refit = None
     probability_refit_days = max(
         PROBABILITY_REGISTRY[horizon_days].refit_days,
         minimum_refit_days or 0,
     )
+    # Refit points only depend on the schedule, so every fit is planned before
+    # any anchor is evaluated and independent fits can train side by side.
+    specialist_plan = _refit_plan(
+        anchors,
+        _day_index(days, refits.specialist_day),
+        refits.specialist_state is not None,
+        specialist_refit_days,
+    )
+    probability_plan = _refit_plan(
+        anchors,
+        _day_index(days, refits.probability_day),
+        refits.probability_state is not None,
+        probability_refit_days,
+    )
+    fits = _train_all(
+        [
+            partial(
+                train_specialist,
+                specialist_data,
+                known_through_origin=anchor - horizon_days,
+                direction_threshold=DIRECTION_THRESHOLDS[horizon_days],
+            )
+            for anchor in specialist_plan
+        ]
+        + [
+            partial(
+                train_probability_model,
+                probability_data,
+                known_through_origin=anchor - horizon_days,
+                lazy_importance=True,
+            )
+            for anchor in probability_plan
+        ],
+        refit_workers,
+    )
+    specialist_fits = fits[: len(specialist_plan)]
+    probability_fits = fits[len(specialist_plan) :]
+    specialist_states = _segment_states(
+        anchors,
+        specialist_plan,
+        specialist_fits,
+        refits.specialist_state,
+    )
+    probability_states = _segment_states(
+        anchors,
+        probability_plan,
+        probability_fits,
+        refits.probability_state,
+    )
+    specialists = _evaluate_segments(
+        specialist_states,
+        [specialist_data.features_by_origin[anchor] for anchor in anchors],
+        specialist_estimates_from_state,
+    )
+    probabilities = _evaluate_segments(
+        probability_states,
+        [probability_data.features_by_origin.get(anchor) for anchor in anchors],
+        probabilities_from_state,
+    )
+    if specialist_plan:
+        refits.specialist_state = specialist_fits[-1]
+        refits.specialist_day = days[specialist_plan[-1]]
+    if probability_plan:
+        refits.probability_state = probability_fits[-1]
+        refits.probability_day = days[probability_plan[-1]]
     results = []
 
-    for anchor in range(first_anchor, last_anchor + 1):
+    for position, anchor in enumerate(anchors):
         known_last_anchor = anchor - horizon_days
         known_samples = [
             calibration_samples[origin]
@@ -171,35 +329,9 @@ def walk_forward_backtest(
             horizon_days,
         )
         technical_change = float(estimate["expected_change"])
-        if (
-            specialist_state is None
-            or specialist_last_refit is None
-            or anchor - specialist_last_refit >= specialist_refit_days
-        ):
-            specialist_state = train_specialist(
-                specialist_data,
-                known_through_origin=known_last_anchor,
-                direction_threshold=DIRECTION_THRESHOLDS[horizon_days],
-            )
-            specialist_last_refit = anchor
-        specialist = specialist_estimate_from_state(
-            specialist_state,
-            specialist_data.features_by_origin[anchor],
-        )
-        if (
-            probability_state is None
-            or probability_last_refit is None
-            or anchor - probability_last_refit >= probability_refit_days
-        ):
-            probability_state = train_probability_model(
-                probability_data,
-                known_through_origin=known_last_anchor,
-            )
-            probability_last_refit = anchor
-        probability = probability_from_state(
-            probability_state,
-            probability_data.features_by_origin.get(anchor),
-        )
+        specialist = specialists[position]
+        probability_state = probability_states[position]
+        probability = probabilities[position]
         estimate = apply_specialist_estimate(estimate, specialist, horizon_days)
         base_price = values[anchor]
         actual_price = values[anchor + horizon_days]
@@ -215,8 +347,8 @@ def walk_forward_backtest(
 
         results.append(
             {
-                "forecast_at": points[anchor]["timestamp"],
-                "evaluated_at": points[anchor + horizon_days]["timestamp"],
+                "forecast_at": series.isoformat(anchor),
+                "evaluated_at": series.isoformat(anchor + horizon_days),
                 "base_price": round(base_price, 8),
                 "target_price": round(base_price * (1 + expected_change / 100), 8),
                 "actual_price": round(actual_price, 8),
@@ -251,6 +383,55 @@ def walk_forward_backtest(
             }
         )
 
+    return WalkForwardRun(results, refits)
+
+
+def walk_forward_backtest(
+    prices: SeriesLike,
+    horizon_days: int,
+    volumes: SeriesLike | None = None,
+    max_samples: int = MAX_BACKTEST_SAMPLES,
+    market_prices: SeriesLike | None = None,
+    funding_rates: SeriesLike | None = None,
+    minimum_refit_days: int | None = None,
+    refit_workers: int = 0,
+) -> dict[str, Any]:
+    run = extend_walk_forward(
+        prices,
+        horizon_days,
+        volumes,
+        max_samples,
+        market_prices,
+        funding_rates,
+        minimum_refit_days,
+        refit_workers=refit_workers,
+    )
+    return summarize_walk_forward(
+        run.rows,
+        horizon_days,
+        run.refits,
+        minimum_refit_days,
+    )
+
+
+def summarize_walk_forward(
+    results: list[dict[str, Any]],
+    horizon_days: int,
+    refits: WalkForwardRefits,
+    minimum_refit_days: int | None = None,
+) -> dict[str, Any]:
+    if not results:
+        raise ValueError("Nincs elegendő lezárt időszak a visszaméréshez.")
+
+    specialist_state = refits.specialist_state
+    specialist_refit_days = max(
+        SPECIALIST_REGISTRY[horizon_days].refit_days,
+        minimum_refit_days or 0,
+    )
+    probability_refit_days = max(
+        PROBABILITY_REGISTRY[horizon_days].refit_days,
+        minimum_refit_days or 0,
+    )
     model_mae = mean(item["absolute_error_pct"] for item in results)
     baseline_mae = mean(item["baseline_error_pct"] for item in results)
     technical_mae = mean(item["technical_error_pct"] for item in results)
@@ -364,16 +545,20 @@ def walk_forward_backtest(
             "minimum_training_days": MINIMUM_TRAINING_DAYS,
             "specialist": {
                 "key": (
-                    specialist_state.selected_model_key
+                    getattr(specialist_state, "selected_model_key", None)
                     or SPECIALIST_REGISTRY[horizon_days].key
                 ),
                 "label": SPECIALIST_REGISTRY[horizon_days].label,
                 "family": (
-                    specialist_state.selected_model_family
+                    getattr(specialist_state, "selected_model_family", None)
                     or SPECIALIST_REGISTRY[horizon_days].family
                 ),
-                "validation_skill_pct": specialist_state.validation_skill_pct,
-                "holdout_skill_pct": specialist_state.holdout_skill_pct,
+                "validation_skill_pct": getattr(
+                    specialist_state,
+                    "validation_skill_pct",
+                    None,
+                ),
+                "holdout_skill_pct": getattr(specialist_state, "holdout_skill_pct", None),
                 "refit_days": specialist_refit_days,
             },
             "probability": {
@@ -442,21 +627,17 @@ def walk_forward_backtest(
 
 def evaluate_journal(
     records: list[dict[str, Any]],
-    prices: list[list[float]],
+    prices: SeriesLike,
 ) -> list[dict[str, Any]]:
-    points = daily_points(prices)
-    dated_points = [
-        (_parse_timestamp(point["timestamp"]).date(), float(point["price"]))
-        for point in points
-    ]
+    series = daily_series(prices)
+    days = series.days.tolist()
+    values = series.values.tolist()
     evaluated = []
 
     for record in records:
-        due_date = _parse_timestamp(record["due_at"]).date()
-        actual_price = next(
-            (price for point_date, price in dated_points if point_date >= due_date),
-            None,
-        )
+        due_day = int(_parse_timestamp(record["due_at"]).timestamp() // 86_400)
+        due_index = bisect_left(days, due_day)
+        actual_price = values[due_index] if due_index < len(values) else None
         item = dict(record)
         if actual_price is None:
             item.update(
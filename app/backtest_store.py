@@ -0,0 +1,273 @@
+import asyncio
+import json
+import pickle
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from math import isclose
+from pathlib import Path
+from typing import Any
+
+from app.backtest import (
+    MAX_BACKTEST_SAMPLES,
+    WalkForwardRefits,
+    summarize_walk_forward,
+)
+from app.compute import ComputePool
+from app.database import SqlStore
+from app.timeseries import DAY_MS, TimeSeries
+
+
+@dataclass(frozen=True)
+class StoredBacktest:
+    rows: list[dict[str, Any]]
+    refits: WalkForwardRefits | None
+
+    @property
+    def last_day(self) -> int | None:
+        return forecast_day(self.rows[-1]) if self.rows else None
+
+
+def _day(value: str) -> int:
+    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000) // DAY_MS
+
+
+def forecast_day(row: dict[str, Any]) -> int:
+    return _day(row["forecast_at"])
+
+
+def matching_rows(rows: list[dict[str, Any]], prices: TimeSeries) -> int:
+    """Number of leading rows whose base and actual prices ``prices`` still has.
+
+    A source that revised a close, or a fallback source with other prices,
+    invalidates every row from the first mismatch on. Days ``prices`` no
+    longer covers cannot be checked and are kept.
+    """
+    daily = prices.daily()
+    closes = dict(zip(daily.days.tolist(), daily.values.tolist()))
+    for index, row in enumerate(rows):
+        for day, stored in (
+            (forecast_day(row), row["base_price"]),
+            (_day(row["evaluated_at"]), row["actual_price"]),
+        ):
+            close = closes.get(day)
+            if close is not None and not isclose(round(close, 8), stored, rel_tol=1e-9):
+                return index
+    return len(rows)
+
+
+class BacktestStore(SqlStore):
+    """Walk-forward rows per asset, horizon and model version, plus the latest fits.
+
+    A closed anchor's row never changes, so analytics only computes the anchors
+    that closed since the last run and assembles the rest from here.
+    """
+
+    def __init__(
+        self,
+        database_path: str | Path,
+        model_version: str,
+        database_url: str | None = None,
+        max_rows: int = MAX_BACKTEST_SAMPLES,
+    ):
+        super().__init__(database_path, database_url)
+        self.model_version = model_version
+        self.max_rows = max_rows
+
+    def initialize(self) -> None:
+        if self.backend == "sqlite":
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        blob_type = "BYTEA" if self.backend == "postgresql" else "BLOB"
+        with self._connect() as connection:
+            if self.backend == "sqlite":
+                self._execute(connection, "PRAGMA journal_mode=WAL")
+            self._execute(
+                connection,
+                """
+                CREATE TABLE IF NOT EXISTS backtest_result (
+                    model_version TEXT NOT NULL,
+                    asset TEXT NOT NULL,
+                    horizon_days INTEGER NOT NULL,
+                    forecast_day INTEGER NOT NULL,
+                    row_json TEXT NOT NULL,
+                    PRIMARY KEY (model_version, asset, horizon_days, forecast_day)
+                )
+                """,
+            )
+            self._execute(
+                connection,
+                f"""
+                CREATE TABLE IF NOT EXISTS backtest_refit (
+                    model_version TEXT NOT NULL,
+                    asset TEXT NOT NULL,
+                    horizon_days INTEGER NOT NULL,
+                    payload {blob_type} NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (model_version, asset, horizon_days)
+                )
+                """,
+            )
+            # Rows and fits of other model versions are never read again.
+            for table in ("backtest_result", "backtest_refit"):
+                self._execute(
+                    connection,
+                    f"DELETE FROM {table} WHERE model_version <> ?",
+                    (self.model_version,),
+                )
+
+    def load(self, asset: str, horizon_days: int, limit: int) -> StoredBacktest:
+        slot = (self.model_version, asset, horizon_days)
+        with self._connect() as connection:
+            rows = self._execute(
+                connection,
+                """
+                SELECT row_json
+                FROM backtest_result
+                WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                ORDER BY forecast_day DESC
+                LIMIT ?
+                """,
+                (*slot, limit),
+            ).fetchall()
+            refit = self._execute(
+                connection,
+                """
+                SELECT payload
+                FROM backtest_refit
+                WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                """,
+                slot,
+            ).fetchone()
+        try:
+            refits = pickle.loads(bytes(refit["payload"])) if refit else None
+        except Exception:
+            # Rows stay readable; the next new anchor simply refits.
+            refits = None
+        return StoredBacktest(
+            rows=[json.loads(row["row_json"]) for row in reversed(rows)],
+            refits=refits,
+        )
+
+    def discard(self, asset: str, horizon_days: int, from_day: int) -> None:
+        """Drop the rows from ``from_day`` on and the fits they were built with."""
+        slot = (self.model_version, asset, horizon_days)
+        with self._connect() as connection:
+            self._execute(
+                connection,
+                """
+                DELETE FROM backtest_result
+                WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                    AND forecast_day >= ?
+                """,
+                (*slot, from_day),
+            )
+            self._execute(
+                connection,
+                """
+                DELETE FROM backtest_refit
+                WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                """,
+                slot,
+            )
+
+    def save(
+        self,
+        asset: str,
+        horizon_days: int,
+        rows: list[dict[str, Any]],
+        refits: WalkForwardRefits,
+    ) -> None:
+        slot = (self.model_version, asset, horizon_days)
+        with self._connect() as connection:
+            for row in rows:
+                self._execute(
+                    connection,
+                    """
+                    INSERT INTO backtest_result (
+                        model_version, asset, horizon_days, forecast_day, row_json
+                    )
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (model_version, asset, horizon_days, forecast_day)
+                    DO NOTHING
+                    """,
+                    (*slot, forecast_day(row), json.dumps(row, ensure_ascii=False)),
+                )
+            self._execute(
+                connection,
+                """
+                INSERT INTO backtest_refit (
+                    model_version, asset, horizon_days, payload, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (model_version, asset, horizon_days)
+                DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at
+                """,
+                (
+                    *slot,
+                    pickle.dumps(refits, protocol=pickle.HIGHEST_PROTOCOL),
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            self._execute(
+                connection,
+                """
+                DELETE FROM backtest_result
+                WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                    AND forecast_day NOT IN (
+                        SELECT forecast_day
+                        FROM backtest_result
+                        WHERE model_version = ? AND asset = ? AND horizon_days = ?
+                        ORDER BY forecast_day DESC
+                        LIMIT ?
+                    )
+                """,
+                (*slot, *slot, self.max_rows),
+            )
+
+
+async def incremental_backtest(
+    store: BacktestStore,
+    compute: ComputePool,
+    asset: str,
+    horizon_days: int,
+    prices: TimeSeries,
+    volumes: TimeSeries,
+    market_prices: TimeSeries,
+    funding_rates: TimeSeries,
+    max_samples: int,
+    minimum_refit_days: int | None = None,
+    refit_workers: int = 0,
+) -> dict[str, Any]:
+    stored = await asyncio.to_thread(store.load, asset, horizon_days, max_samples)
+    kept = matching_rows(stored.rows, prices)
+    if kept < len(stored.rows):
+        await asyncio.to_thread(
+            store.discard,
+            asset,
+            horizon_days,
+            forecast_day(stored.rows[kept]),
+        )
+        stored = StoredBacktest(rows=stored.rows[:kept], refits=None)
+    run = await compute.extend_backtest(
+        prices,
+        horizon_days,
+        volumes,
+        market_prices=market_prices,
+        funding_rates=funding_rates,
+        max_samples=max_samples,
+        minimum_refit_days=minimum_refit_days,
+        after_day=stored.last_day,
+        refits=stored.refits,
+        closed_only=True,
+        refit_workers=refit_workers,
+    )
+    if run.rows:
+        await asyncio.to_thread(store.save, asset, horizon_days, run.rows, run.refits)
+    return summarize_walk_forward(
+        [*stored.rows, *run.rows][-max_samples:],
+        horizon_days,
+        run.refits,
+        minimum_refit_days,
+    )
@@ -0,0 +1,115 @@
+import asyncio
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any, AsyncIterator
+
+from app.backtest import MAX_BACKTEST_SAMPLES
+from app.compute import ComputePool
+from app.dashboard import history_series, load_forecast_history
+from app.market_data import MarketDataService
+from app.timeseries import TimeSeries
+
+
+@dataclass
+class BatchInputs:
+    """Columnar histories of a batch, converted once per asset.
+
+    Every asset is backtested against the same bitcoin market context, so it
+    is loaded and converted once for the whole universe.
+    """
+
+    market_prices: TimeSeries
+    datasets: dict[str, tuple[TimeSeries, TimeSeries, TimeSeries]] = field(
+        default_factory=dict
+    )
+    sources: dict[str, dict[str, Any]] = field(default_factory=dict)
+    failures: dict[str, str] = field(default_factory=dict)
+
+
+async def load_batch_inputs(service: MarketDataService, coins: list[str]) -> BatchInputs:
+    requested = list(dict.fromkeys(["bitcoin", *coins]))
+    loaded = await asyncio.gather(
+        *(load_forecast_history(service, coin) for coin in requested),
+        return_exceptions=True,
+    )
+    histories = dict(zip(requested, loaded))
+    if isinstance(histories["bitcoin"], BaseException):
+        raise histories["bitcoin"]
+
+    inputs = BatchInputs(
+        market_prices=TimeSeries.from_points(histories["bitcoin"].get("prices", []))
+    )
+    for coin in dict.fromkeys(coins):
+        history = histories[coin]
+        if isinstance(history, BaseException):
+            inputs.failures[coin] = str(history)
+            continue
+        series = history_series(history)
+        inputs.datasets[coin] = (
+            series["prices"],
+            series["total_volumes"],
+            series["funding_rates"],
+        )
+        inputs.sources[coin] = {
+            "source": history.get("source"),
+            "history_days": len(series["prices"]),
+        }
+    return inputs
+
+
+async def stream_batch_backtest(
+    compute: ComputePool,
+    inputs: BatchInputs,
+    horizons: list[int],
+    max_samples: int = MAX_BACKTEST_SAMPLES,
+    minimum_refit_days: int | None = None,
+    refit_workers: int = 0,
+) -> AsyncIterator[dict[str, Any]]:
+    """Per-dataset summaries in completion order, then one closing record."""
+    started = monotonic()
+    completed = 0
+    failed = 0
+    for coin, detail in inputs.failures.items():
+        for horizon in horizons:
+            failed += 1
+            yield {
+                "status": "failed",
+                "coin": coin,
+                "horizon_days": horizon,
+                "detail": detail,
+                "elapsed_seconds": round(monotonic() - started, 2),
+            }
+
+    async for coin, horizon, result in compute.backtest_batch(
+        inputs.market_prices,
+        inputs.datasets,
+        horizons,
+        max_samples=max_samples,
+        minimum_refit_days=minimum_refit_days,
+        refit_workers=refit_workers,
+    ):
+        record = {
+            "coin": coin,
+            "horizon_days": horizon,
+            **inputs.sources[coin],
+            "elapsed_seconds": round(monotonic() - started, 2),
+        }
+        if isinstance(result, Exception):
+            failed += 1
+            yield {"status": "failed", **record, "detail": str(result)}
+            continue
+        completed += 1
+        yield {
+            "status": "ready",
+            **record,
+            "period": result["period"],
+            "summary": result["summary"],
+        }
+
+    yield {
+        "status": "complete",
+        "datasets": completed + failed,
+        "completed": completed,
+        "failed": failed,
+        "elapsed_seconds": round(monotonic() - started, 2),
+    }
@@ -1,7 +1,18 @@
 import asyncio
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
+from hashlib import blake2b
+from threading import Lock
 from time import monotonic
-from typing import Any, Awaitable, Callable
+from typing import Any, Awaitable, Callable, Hashable
+
+import numpy as np
+
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SWEEP_INTERVAL_SECONDS = 60.0
 
 
 @dataclass
@@ -9,42 +20,363 @@ class CacheEntry:
     value: Any
     created_at: float
     expires_at: float
+    stale_seconds: int
+    size_bytes: int
+
+
+def approximate_size(value: Any) -> int:
+    """Rough deep size of a JSON-like payload in bytes."""
+    seen: set[int] = set()
+    pending = [value]
+    total = 0
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+    return total
+
+
+def data_fingerprint(*parts: Any) -> str:
+    """Stable digest of numeric columns and scalar settings, across processes.
+
+    Lists, tuples and arrays hash as float64 columns (``None`` as NaN), so the
+    same numbers give the same digest whichever container holds them.
+    """
+    digest = blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part, dtype=np.float64).tobytes())
+        elif isinstance(part, (list, tuple)):
+            digest.update(
+                np.fromiter(
+                    (np.nan if value is None else value for value in part),
+                    dtype=np.float64,
+                    count=len(part),
+                ).tobytes()
+            )
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe map keeping the ``max_entries`` most recently used values.
+
+    Values are built outside the lock, so two threads missing the same key
+    may both build it; the first stored value wins and is returned to both.
+    """
+
+    def __init__(self, max_entries: int):
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = Lock()
+        self.max_entries = max_entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> Any:
+        with self._lock:
+            value = self._entries.setdefault(key, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        return value if value is not None else self.put(key, build())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass(frozen=True)
+class WindowMatch:
+    """Result of a ``WindowCache`` lookup.
+
+    ``value`` is the entry of exactly these columns. Otherwise ``earlier`` may
+    hold the entry of an overlapping window: the columns equal its columns
+    without the first ``dropped`` points, followed by ``added`` new ones.
+    """
+
+    key: str
+    value: Any = None
+    earlier: Any = None
+    dropped: int = 0
+    added: int = 0
+
+
+class WindowCache:
+    """LRU of values derived from a series window, found again after it moved.
+
+    A history capped at a fixed length slides forward when a new point
+    closes, so its earlier window is no longer a prefix. Every entry is also
+    indexed by its columns without their first few points, so a lookup finds
+    the earlier window of a history that grew or slid by up to ``max_shift``
+    points and only the difference has to be computed.
+    """
+
+    def __init__(self, max_entries: int, max_shift: int = 3):
+        self._entries = LRUCache(max_entries)
+        self._tails = LRUCache(max_entries * max_shift)
+        self.max_shift = max_shift
+
+    def find(self, *columns: Any) -> WindowMatch:
+        key = data_fingerprint(*columns)
+        value = self._entries.get(key)
+        if value is not None:
+            return WindowMatch(key, value=value)
+        length = min(len(column) for column in columns)
+        for added in range(1, min(self.max_shift, length - 1) + 1):
+            head = data_fingerprint(*(column[:-added] for column in columns))
+            earlier = self._entries.get(head)
+            if earlier is not None:
+                return WindowMatch(key, earlier=earlier, added=added)
+            tail = self._tails.get(head)
+            if tail is not None:
+                earlier_key, dropped = tail
+                earlier = self._entries.get(earlier_key)
+                if earlier is not None:
+                    return WindowMatch(key, earlier=earlier, dropped=dropped, added=added)
+        return WindowMatch(key)
+
+    def put(self, key: str, columns: tuple[Any, ...], value: Any) -> Any:
+        value = self._entries.put(key, value)
+        length = min(len(column) for column in columns)
+        for dropped in range(1, min(self.max_shift, length - 1) + 1):
+            self._tails.put(
+                data_fingerprint(*(column[dropped:] for column in columns)),
+                (key, dropped),
+            )
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tails.clear()
+
+
+def key_prefix(key: str) -> str:
+    """Group cache keys by endpoint: drop query strings and request bodies."""
+    prefix = key.split("?", 1)[0]
+    if prefix.startswith("post:"):
+        prefix = prefix.split(":{", 1)[0]
+    elif "://" not in prefix:
+        prefix = prefix.split(":", 1)[0]
+    return prefix
 
 
 class AsyncTTLCache:
-    def __init__(self, stale_seconds: int = 900):
-        self._entries: dict[str, CacheEntry] = {}
+    """Per-key TTL cache with single-flight loads and a stale fallback.
+
+    Callers that queued behind a load which failed receive its error instead
+    of retrying one after the other.
+    With ``serve_stale`` an expired entry that is still inside its staleness
+    limit is returned at once while a background task reloads it. With
+    ``refresh_ahead_seconds`` a key that is read shortly before it expires is
+    reloaded in the background, so hot keys never reach expiry.
+    """
+
+    def __init__(
+        self,
+        stale_seconds: int = 900,
+        serve_stale: bool = False,
+        refresh_ahead_seconds: float = 0.0,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
         self._locks: dict[str, asyncio.Lock] = {}
+        self._failures: dict[str, Exception] = {}
+        self._refreshes: dict[str, asyncio.Task[None]] = {}
         self._stale_seconds = stale_seconds
+        self._serve_stale = serve_stale
+        self._refresh_ahead_seconds = refresh_ahead_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._total_bytes = 0
+        self._evictions = 0
+        self._last_sweep = monotonic()
 
     async def get_or_set(
         self,
         key: str,
         ttl_seconds: int,
         loader: Callable[[], Awaitable[Any]],
+        stale_seconds: int | None = None,
     ) -> Any:
         now = monotonic()
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self.sweep()
         entry = self._entries.get(key)
+        if entry:
+            self._entries.move_to_end(key)
         if entry and entry.expires_at > now:
+            if entry.expires_at - now <= self._refresh_ahead_seconds:
+                self._refresh_in_background(key, ttl_seconds, loader, stale_seconds)
+            return entry.value
+        if (
+            entry
+            and self._serve_stale
+            and now - entry.created_at <= entry.stale_seconds
+        ):
+            self._refresh_in_background(key, ttl_seconds, loader, stale_seconds)
             return entry.value
 
         lock = self._locks.setdefault(key, asyncio.Lock())
+        seen_failure = self._failures.get(key)
         async with lock:
             now = monotonic()
             entry = self._entries.get(key)
             if entry and entry.expires_at > now:
                 return entry.value
+            failure = self._failures.get(key)
+            if failure is not None and failure is not seen_failure:
+                # The load this caller waited for failed; share its error.
+                raise failure
+            return await self._load(key, ttl_seconds, loader, stale_seconds, entry)
 
-            try:
-                value = await loader()
-            except Exception:
-                if entry and now - entry.created_at <= self._stale_seconds:
-                    return entry.value
-                raise
+    async def _load(
+        self,
+        key: str,
+        ttl_seconds: int,
+        loader: Callable[[], Awaitable[Any]],
+        stale_seconds: int | None,
+        entry: CacheEntry | None,
+    ) -> Any:
+        try:
+            value = await loader()
+        except Exception as error:
+            if entry and monotonic() - entry.created_at <= entry.stale_seconds:
+                return entry.value
+            self._failures[key] = error
+            raise
 
-            self._entries[key] = CacheEntry(
+        self._failures.pop(key, None)
+        now = monotonic()
+        self._store(
+            key,
+            CacheEntry(
                 value=value,
                 created_at=now,
                 expires_at=now + ttl_seconds,
-            )
-            return value
+                stale_seconds=(
+                    self._stale_seconds if stale_seconds is None else stale_seconds
+                ),
+                size_bytes=approximate_size(value),
+            ),
+        )
+        return value
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous.size_bytes
+        self._entries[key] = entry
+        self._total_bytes += entry.size_bytes
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_entries
+            or self._total_bytes > self._max_bytes
+        ):
+            evicted_key, _ = next(iter(self._entries.items()))
+            self._discard(evicted_key)
+            self._evictions += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size_bytes
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
+            self._failures.pop(key, None)
+
+    def sweep(self) -> int:
+        """Drop entries past their staleness limit and locks nobody holds."""
+        now = monotonic()
+        self._last_sweep = now
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry.expires_at <= now and now - entry.created_at > entry.stale_seconds
+        ]
+        for key in expired:
+            self._discard(key)
+        for key in [
+            key
+            for key, lock in self._locks.items()
+            if key not in self._entries and not lock.locked()
+        ]:
+            del self._locks[key]
+            self._failures.pop(key, None)
+        return len(expired)
+
+    def stats(self) -> dict[str, Any]:
+        prefixes: dict[str, dict[str, int]] = {}
+        for key, entry in self._entries.items():
+            bucket = prefixes.setdefault(key_prefix(key), {"entries": 0, "bytes": 0})
+            bucket["entries"] += 1
+            bucket["bytes"] += entry.size_bytes
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "locks": len(self._locks),
+            "evictions": self._evictions,
+            "prefixes": dict(
+                sorted(prefixes.items(), key=lambda item: item[1]["bytes"], reverse=True)
+            ),
+        }
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        ttl_seconds: int,
+        loader: Callable[[], Awaitable[Any]],
+        stale_seconds: int | None,
+    ) -> None:
+        if key in self._refreshes:
+            return
+
+        async def refresh() -> None:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    entry = self._entries.get(key)
+                    if (
+                        entry
+                        and entry.expires_at - monotonic() > self._refresh_ahead_seconds
+                    ):
+                        return
+                    await self._load(key, ttl_seconds, loader, stale_seconds, entry)
+            except Exception:
+                # The stale entry keeps being served until its limit runs out;
+                # the next foreground miss surfaces the upstream error.
+                pass
+            finally:
+                self._refreshes.pop(key, None)
+
+        self._refreshes[key] = asyncio.create_task(refresh())
+
+    async def close(self) -> None:
+        tasks = list(self._refreshes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refreshes.clear()
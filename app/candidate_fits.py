@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Sequence
+
+from app.config import settings
+from app.governor import job_threads, limit_openmp_threads
+
+
+_EXECUTOR: ThreadPoolExecutor | None = None
+_EXECUTOR_LOCK = Lock()
+
+
+def _threads_per_fit() -> int:
+    # The fits run inside one governor job, so they split its thread share.
+    share = job_threads(settings.compute_slots, settings.model_thread_budget)
+    return max(1, share // max(1, settings.candidate_fit_workers))
+
+
+def _limit_native_threads() -> None:
+    # OpenMP limits are per thread, so every worker caps its own
+    # HistGradientBoosting pool for as long as it lives. BLAS pools are
+    # process-wide and capped once at startup.
+    limit_openmp_threads(_threads_per_fit())
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=settings.candidate_fit_workers,
+                thread_name_prefix="candidate-fit",
+                initializer=_limit_native_threads,
+            )
+        return _EXECUTOR
+
+
+def fit_candidates(jobs: Sequence[Callable[[], Any]]) -> list[Any]:
+    """Results of the candidate fits, in the order of ``jobs``.
+
+    With ``CANDIDATE_FIT_WORKERS`` > 1 the fits share one process-wide pool,
+    so nested callers (parallel backtest refits, several horizons) never run
+    more than that many fits at once, and each fit gets an equal share of
+    the governor's per-job thread share. Every candidate is seeded and
+    only its own result is read, so the selection matches the serial mode.
+    """
+    if settings.candidate_fit_workers <= 1 or len(jobs) <= 1:
+        return [job() for job in jobs]
+    return list(_executor().map(lambda job: job(), jobs))
@@ -0,0 +1,182 @@
+
+from app.database import SqlStore
+
+
+Candle = tuple[int, float, float, float, float, float]
+FundingRate = tuple[int, float]
+
+
+class CandleStore(SqlStore):
+    """Append-only OHLCV history keyed by source, symbol and interval."""
+
+    def initialize(self) -> None:
+        if self.backend == "sqlite":
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            if self.backend == "sqlite":
+                self._execute(connection, "PRAGMA journal_mode=WAL")
+            self._execute(
+                connection,
+                """
+                CREATE TABLE IF NOT EXISTS market_candle (
+                    source TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    open_time BIGINT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume REAL NOT NULL,
+                    PRIMARY KEY (source, symbol, resolution, open_time)
+                )
+                """,
+            )
+            self._execute(
+                connection,
+                """
+                CREATE TABLE IF NOT EXISTS market_candle_series (
+                    source TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    history_start BIGINT,
+                    PRIMARY KEY (source, symbol, resolution)
+                )
+                """,
+            )
+            self._execute(
+                connection,
+                """
+                CREATE TABLE IF NOT EXISTS funding_rate (
+                    symbol TEXT NOT NULL,
+                    funding_time BIGINT NOT NULL,
+                    funding_rate REAL NOT NULL,
+                    PRIMARY KEY (symbol, funding_time)
+                )
+                """,
+            )
+
+    def candles(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        limit: int,
+    ) -> list[Candle]:
+        with self._connect() as connection:
+            rows = self._execute(
+                connection,
+                """
+                SELECT open_time, open, high, low, close, volume
+                FROM market_candle
+                WHERE source = ? AND symbol = ? AND resolution = ?
+                ORDER BY open_time DESC
+                LIMIT ?
+                """,
+                (source, symbol, interval, max(int(limit), 0)),
+            ).fetchall()
+        return [
+            (
+                int(row["open_time"]),
+                float(row["open"]),
+                float(row["high"]),
+                float(row["low"]),
+                float(row["close"]),
+                float(row["volume"]),
+            )
+            for row in reversed(rows)
+        ]
+
+    def history_start(self, source: str, symbol: str, interval: str) -> int | None:
+        with self._connect() as connection:
+            row = self._execute(
+                connection,
+                """
+                SELECT history_start
+                FROM market_candle_series
+                WHERE source = ? AND symbol = ? AND resolution = ?
+                """,
+                (source, symbol, interval),
+            ).fetchone()
+        if row is None or row["history_start"] is None:
+            return None
+        return int(row["history_start"])
+
+    def upsert(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        candles: list[Candle],
+        history_start: int | None = None,
+    ) -> int:
+        if not candles and history_start is None:
+            return 0
+        with self._connect() as connection:
+            for candle in candles:
+                # The newest candle is still open upstream, so a repeated
+                # open_time replaces the stored values instead of being skipped.
+                self._execute(
+                    connection,
+                    """
+                    INSERT INTO market_candle (
+                        source, symbol, resolution, open_time,
+                        open, high, low, close, volume
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (source, symbol, resolution, open_time) DO UPDATE SET
+                        open = excluded.open,
+                        high = excluded.high,
+                        low = excluded.low,
+                        close = excluded.close,
+                        volume = excluded.volume
+                    """,
+                    (source, symbol, interval, *candle),
+                )
+            if history_start is not None:
+                self._execute(
+                    connection,
+                    """
+                    INSERT INTO market_candle_series (
+                        source, symbol, resolution, history_start
+                    )
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (source, symbol, resolution) DO UPDATE SET
+                        history_start = excluded.history_start
+                    """,
+                    (source, symbol, interval, history_start),
+                )
+        return len(candles)
+
+    def funding_rates(self, symbol: str, since: int) -> list[FundingRate]:
+        with self._connect() as connection:
+            rows = self._execute(
+                connection,
+                """
+                SELECT funding_time, funding_rate
+                FROM funding_rate
+                WHERE symbol = ? AND funding_time >= ?
+                ORDER BY funding_time
+                """,
+                (symbol, since),
+            ).fetchall()
+        return [
+            (int(row["funding_time"]), float(row["funding_rate"]))
+            for row in rows
+        ]
+
+    def upsert_funding_rates(self, symbol: str, rates: list[FundingRate]) -> int:
+        if not rates:
+            return 0
+        with self._connect() as connection:
+            for funding_time, funding_rate in rates:
+                self._execute(
+                    connection,
+                    """
+                    INSERT INTO funding_rate (symbol, funding_time, funding_rate)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (symbol, funding_time) DO NOTHING
+                    """,
+                    (symbol, funding_time, funding_rate),
+                )
+        return len(rates)
@@ -0,0 +1,331 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, AsyncIterator, Callable
+
+import numpy as np
+
+from app.backtest import WalkForwardRun, extend_walk_forward, walk_forward_backtest
+from app.governor import BACKGROUND, ComputeGovernor, limit_blas_threads
+from app.timeseries import TimeSeries
+
+
+@dataclass(frozen=True)
+class SharedField:
+    key: str
+    offset: int
+    shape: tuple[int, ...]
+    dtype: str
+
+
+@dataclass(frozen=True)
+class SharedBundle:
+    """Picklable description of arrays packed into one shared memory block."""
+
+    name: str
+    fields: tuple[SharedField, ...]
+
+
+class SharedArrays:
+    """Owns a shared memory block holding several arrays for one job."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        fields = []
+        offset = 0
+        for key, array in arrays.items():
+            fields.append(SharedField(key, offset, array.shape, array.dtype.str))
+            offset += array.nbytes
+        self._memory = SharedMemory(create=True, size=max(offset, 1))
+        for field, array in zip(fields, arrays.values()):
+            target = np.ndarray(
+                field.shape,
+                dtype=field.dtype,
+                buffer=self._memory.buf,
+                offset=field.offset,
+            )
+            target[...] = array
+            del target
+        self.bundle = SharedBundle(self._memory.name, tuple(fields))
+
+    def close(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+
+def load_shared(bundle: SharedBundle) -> dict[str, np.ndarray]:
+    """Copy the bundle's arrays out of shared memory in the worker process."""
+    memory = SharedMemory(name=bundle.name)
+    try:
+        return {
+            field.key: np.ndarray(
+                field.shape,
+                dtype=field.dtype,
+                buffer=memory.buf,
+                offset=field.offset,
+            ).copy()
+            for field in bundle.fields
+        }
+    finally:
+        memory.close()
+
+
+def _series_arrays(prefix: str, series: TimeSeries) -> dict[str, np.ndarray]:
+    return {
+        f"{prefix}.timestamps": series.timestamps,
+        f"{prefix}.values": series.values,
+    }
+
+
+def _shared_series(arrays: dict[str, np.ndarray], prefix: str) -> TimeSeries:
+    return TimeSeries(arrays[f"{prefix}.timestamps"], arrays[f"{prefix}.values"])
+
+
+def _backtest_job(
+    function: Callable[..., Any],
+    bundles: tuple[SharedBundle, ...],
+    horizon_days: int | tuple[int, ...],
+    options: dict[str, Any],
+):
+    arrays = {}
+    for bundle in bundles:
+        arrays.update(load_shared(bundle))
+    return function(
+        _shared_series(arrays, "prices"),
+        horizon_days,
+        _shared_series(arrays, "volumes"),
+        market_prices=_shared_series(arrays, "market_prices"),
+        funding_rates=_shared_series(arrays, "funding_rates"),
+        **options,
+    )
+
+
+def _horizon_backtests(
+    prices: TimeSeries,
+    horizons: tuple[int, ...],
+    volumes: TimeSeries,
+    market_prices: TimeSeries,
+    funding_rates: TimeSeries,
+    **options: Any,
+) -> list[Any]:
+    """Walk-forward summaries of one asset per horizon, or each horizon's error."""
+    results: list[Any] = []
+    for horizon in horizons:
+        try:
+            results.append(
+                walk_forward_backtest(
+                    prices,
+                    horizon,
+                    volumes,
+                    market_prices=market_prices,
+                    funding_rates=funding_rates,
+                    **options,
+                )
+            )
+        except Exception as exc:
+            results.append(exc)
+    return results
+
+
+class ComputePool:
+    """Process-pool tier for CPU-bound jobs, falling back to threads.
+
+    With ``workers`` set to zero every job runs through ``asyncio.to_thread``
+    as before. Otherwise jobs run in spawned worker processes. Their
+    columnar inputs travel through shared memory instead of being pickled.
+    Every job holds one background slot of the ``governor`` while it runs,
+    so worker processes count against the same budget as in-process jobs,
+    and gets the governor's per-job thread share in either mode.
+    """
+
+    def __init__(self, workers: int = 0, governor: ComputeGovernor | None = None):
+        self.workers = max(0, workers)
+        self.governor = governor or ComputeGovernor()
+        self._executor = (
+            ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=limit_blas_threads,
+                initargs=(self.governor.threads_per_job,),
+            )
+            if self.workers
+            else None
+        )
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        return await self.governor.run(
+            BACKGROUND,
+            function,
+            *args,
+            executor=self._executor,
+        )
+
+    async def backtest(
+        self,
+        prices: TimeSeries,
+        horizon_days: int,
+        volumes: TimeSeries,
+        market_prices: TimeSeries,
+        funding_rates: TimeSeries,
+        **options: Any,
+    ) -> dict[str, Any]:
+        return await self._walk_forward(
+            walk_forward_backtest,
+            prices,
+            horizon_days,
+            volumes,
+            market_prices,
+            funding_rates,
+            options,
+        )
+
+    async def extend_backtest(
+        self,
+        prices: TimeSeries,
+        horizon_days: int,
+        volumes: TimeSeries,
+        market_prices: TimeSeries,
+        funding_rates: TimeSeries,
+        **options: Any,
+    ) -> WalkForwardRun:
+        return await self._walk_forward(
+            extend_walk_forward,
+            prices,
+            horizon_days,
+            volumes,
+            market_prices,
+            funding_rates,
+            options,
+        )
+
+    async def _walk_forward(
+        self,
+        function: Callable[..., Any],
+        prices: TimeSeries,
+        horizon_days: int,
+        volumes: TimeSeries,
+        market_prices: TimeSeries,
+        funding_rates: TimeSeries,
+        options: dict[str, Any],
+    ) -> Any:
+        if self._executor is None:
+            return await self.run(
+                partial(
+                    function,
+                    prices,
+                    horizon_days,
+                    volumes,
+                    market_prices=market_prices,
+                    funding_rates=funding_rates,
+                    **options,
+                )
+            )
+
+        shared = SharedArrays(
+            {
+                **_series_arrays("prices", prices),
+                **_series_arrays("volumes", volumes),
+                **_series_arrays("market_prices", market_prices),
+                **_series_arrays("funding_rates", funding_rates),
+            }
+        )
+        try:
+            return await self.run(
+                _backtest_job,
+                function,
+                (shared.bundle,),
+                horizon_days,
+                options,
+            )
+        finally:
+            shared.close()
+
+    async def backtest_batch(
+        self,
+        market_prices: TimeSeries,
+        datasets: dict[str, tuple[TimeSeries, TimeSeries, TimeSeries]],
+        horizons: list[int],
+        **options: Any,
+    ) -> AsyncIterator[tuple[str, int, Any]]:
+        """Backtest every (asset, horizon) pair, yielding each asset as it finishes.
+
+        ``datasets`` maps an asset to its prices, volumes and funding rates.
+        Every asset is one job covering all of its horizons, so they share
+        the feature caches of the thread or worker that runs them; the jobs
+        of different assets run side by side as the governor admits them.
+        The market context is packed into shared memory once for the whole
+        batch. A failed horizon yields its exception instead of stopping the
+        batch.
+        """
+        # Shorter horizons refit most often, so they run first within a job.
+        ordered = tuple(sorted(horizons))
+        shared: list[SharedArrays] = []
+        jobs: dict[str, tuple[Any, ...]] = {}
+        try:
+            if self._executor is None:
+                for asset, (prices, volumes, funding_rates) in datasets.items():
+                    jobs[asset] = (
+                        partial(
+                            _horizon_backtests,
+                            prices,
+                            ordered,
+                            volumes,
+                            market_prices=market_prices,
+                            funding_rates=funding_rates,
+                            **options,
+                        ),
+                    )
+            else:
+                shared.append(SharedArrays(_series_arrays("market_prices", market_prices)))
+                for asset, (prices, volumes, funding_rates) in datasets.items():
+                    shared.append(
+                        SharedArrays(
+                            {
+                                **_series_arrays("prices", prices),
+                                **_series_arrays("volumes", volumes),
+                                **_series_arrays("funding_rates", funding_rates),
+                            }
+                        )
+                    )
+                    jobs[asset] = (
+                        _backtest_job,
+                        _horizon_backtests,
+                        (shared[0].bundle, shared[-1].bundle),
+                        ordered,
+                        options,
+                    )
+
+            async def run_job(asset: str) -> tuple[str, list[Any]]:
+                try:
+                    results = await self.run(*jobs[asset])
+                except Exception as exc:
+                    results = [exc] * len(ordered)
+                return asset, results
+
+            tasks = [asyncio.create_task(run_job(asset)) for asset in jobs]
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    asset, results = await finished
+                    for horizon, result in zip(ordered, results):
+                        yield asset, horizon, result
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for item in shared:
+                item.close()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "mode": "process" if self._executor is not None else "thread",
+            "workers": self.workers,
+            "thread_limit": self.governor.threads_per_job,
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
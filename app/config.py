@@ -19,6 +19,16 @@ class Settings:
     chart_cache_seconds: int = int(os.getenv("CHART_CACHE_SECONDS", "300"))
     news_cache_seconds: int = int(os.getenv("NEWS_CACHE_SECONDS", "300"))
     stale_cache_seconds: int = int(os.getenv("STALE_CACHE_SECONDS", "900"))
+    cache_serve_stale: bool = os.getenv("CACHE_SERVE_STALE", "true").strip().lower() in {
+        "1",
+        "true",
+        "yes",
+    }
+    cache_refresh_ahead_seconds: int = int(
+        os.getenv("CACHE_REFRESH_AHEAD_SECONDS", "10")
+    )
+    cache_max_entries: int = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+    cache_max_mb: int = int(os.getenv("CACHE_MAX_MB", "64"))
     cryptocompare_api_key: str = os.getenv("CRYPTOCOMPARE_API_KEY", "").strip()
     forecast_db_path: str = os.getenv(
         "FORECAST_DB_PATH",
@@ -31,6 +41,28 @@ class Settings:
     forecast_storage_limit_mb: int = int(
         os.getenv("FORECAST_STORAGE_LIMIT_MB", "512")
     )
+    compute_workers: int = int(os.getenv("COMPUTE_WORKERS", "0"))
+    compute_slots: int = int(os.getenv("COMPUTE_SLOTS", "0"))
+    forecast_admission_wait_seconds: float = float(
+        os.getenv("FORECAST_ADMISSION_WAIT_SECONDS", "2")
+    )
+    backtest_refit_workers: int = int(os.getenv("BACKTEST_REFIT_WORKERS", "1"))
+    candidate_fit_workers: int = int(os.getenv("CANDIDATE_FIT_WORKERS", "1"))
+    model_thread_budget: int = int(os.getenv("MODEL_THREAD_BUDGET", "0"))
+    training_scheduler_enabled: bool = os.getenv(
+        "TRAINING_SCHEDULER_ENABLED",
+        "true",
+    ).strip().lower() in {"1", "true", "yes"}
+    training_workers: int = int(os.getenv("TRAINING_WORKERS", "1"))
+    training_poll_seconds: int = int(os.getenv("TRAINING_POLL_SECONDS", "60"))
+    training_start_delay_seconds: int = int(
+        os.getenv("TRAINING_START_DELAY_SECONDS", "30")
+    )
+    training_intraday: bool = os.getenv("TRAINING_INTRADAY", "true").strip().lower() in {
+        "1",
+        "true",
+        "yes",
+    }
     snapshot_token: str = os.getenv("SNAPSHOT_TOKEN", "").strip()
     snapshot_stale_after_minutes: int = int(
         os.getenv("SNAPSHOT_STALE_AFTER_MINUTES", "45")
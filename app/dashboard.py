@@ -1,16 +1,30 @@
 import asyncio
 from datetime import datetime, timezone
-from typing import Any
+from hashlib import blake2b
+import json
+from typing import Any, Awaitable, Callable
 
 from app.assets import ANALYSIS_ASSETS, analysis_asset_list
-from app.forecast import build_forecast, calculate_indicators
+from app.cache import AsyncTTLCache
+from app.forecast import (
+    build_forecast,
+    calculate_indicators,
+    classify_direction,
+    refit_daily_state,
+)
+from app.governor import INTERACTIVE, ComputeBusyError, ComputeGovernor
 from app.market_data import MarketDataService, UpstreamServiceError
 from app.news import aggregate_news_sentiment, normalize_articles
 from app.publication_schedule import publication_rule_payload
+from app.timeseries import TimeSeries
 
 
 SUPPORTED_COINS = ANALYSIS_ASSETS
 FORECAST_HISTORY_DAYS = 2000
+# Keys already change with every upstream payload; the TTL only bounds how
+# long a live state refitted on unchanged data can be hidden.
+DASHBOARD_CACHE_SECONDS = 60
+MAX_DASHBOARD_ENTRIES = 128
 
 
 def _number(value: Any, default: float = 0.0) -> float:
@@ -119,12 +133,160 @@ async def load_forecast_history(
     return {**chart, "source": chart.get("source", "CoinGecko")}
 
 
+def history_series(history: dict[str, Any]) -> dict[str, TimeSeries]:
+    return {
+        key: TimeSeries.from_points(history.get(key, []))
+        for key in ("prices", "total_volumes", "funding_rates")
+    }
+
+
+def forecast_data_version(
+    chart: dict[str, Any],
+    benchmark_chart: dict[str, Any],
+) -> str:
+    """Joined market-data versions, empty when either history lacks one."""
+    version = chart.get("data_version", "")
+    if benchmark_chart is chart or not version:
+        return version
+    benchmark_version = benchmark_chart.get("data_version", "")
+    return f"{version}|{benchmark_version}" if benchmark_version else ""
+
+
+def forecast_from_history(
+    chart: dict[str, Any],
+    benchmark_chart: dict[str, Any],
+    horizon_days: int,
+    current_price: float | None = None,
+    state_key: str = "",
+) -> dict[str, Any]:
+    series = history_series(chart)
+    return build_forecast(
+        series["prices"],
+        horizon_days,
+        current_price=current_price,
+        volumes=series["total_volumes"],
+        market_prices=(
+            series["prices"]
+            if benchmark_chart is chart
+            else TimeSeries.from_points(benchmark_chart.get("prices", []))
+        ),
+        funding_rates=series["funding_rates"],
+        state_key=state_key,
+        data_version=forecast_data_version(chart, benchmark_chart),
+    )
+
+
+def refit_from_history(
+    chart: dict[str, Any],
+    benchmark_chart: dict[str, Any],
+    family: str,
+    horizon_days: int,
+    state_key: str = "",
+) -> Any:
+    """Refit one live daily state on the history ``forecast_from_history`` reads."""
+    series = history_series(chart)
+    return refit_daily_state(
+        family,
+        series["prices"],
+        horizon_days,
+        volumes=series["total_volumes"],
+        market_prices=(
+            series["prices"]
+            if benchmark_chart is chart
+            else TimeSeries.from_points(benchmark_chart.get("prices", []))
+        ),
+        funding_rates=series["funding_rates"],
+        state_key=state_key,
+        data_version=forecast_data_version(chart, benchmark_chart),
+    )
+
+
+def stale_forecast(record: dict[str, Any], chart: dict[str, Any]) -> dict[str, Any]:
+    """A journaled forecast in the live forecast's shape, flagged as stale."""
+    model = record.get("model", {})
+    horizon_days = int(record["horizon_days"])
+    direction, direction_key = classify_direction(
+        float(record["expected_change_pct"]),
+        horizon_days,
+    )
+    series = history_series(chart)["prices"]
+    return {
+        "base_price": record["base_price"],
+        "direction": direction,
+        "direction_key": record["direction_key"] or direction_key,
+        "expected_change_pct": record["expected_change_pct"],
+        "target_price": record["target_price"],
+        "prediction_interval": model.get("prediction_interval", {}),
+        "confidence": record["confidence"],
+        "confidence_label": "Visszamért jelminőség",
+        "horizon_days": horizon_days,
+        "model": model.get("model"),
+        "model_version": record["model_version"],
+        "ensemble": model.get("ensemble", {}),
+        "specialist": model.get("specialist", {}),
+        "probability_forecast": model.get("probability", {}),
+        "signals": [],
+        "indicators": record["indicators"],
+        "series": [
+            {"timestamp": series.isoformat(index), "price": round(float(price), 8)}
+            for index, price in enumerate(
+                series.values[-60:].tolist(),
+                start=max(len(series) - 60, 0),
+            )
+        ],
+        "stale": True,
+        "stale_generated_at": record["generated_at"],
+        "stale_reason": (
+            "Túlterhelés miatt a legutóbb naplózott előrejelzés látható; "
+            "a friss számítás nem kapott időben helyet."
+        ),
+    }
+
+
+def _history_version(history: dict[str, Any]) -> Any:
+    # Closed rows are covered by the data version; the open candle is not.
+    if not history.get("data_version"):
+        return {key: history.get(key) for key in ("source", "prices", "total_volumes", "funding_rates")}
+    return (
+        history["data_version"],
+        history.get("prices", [])[-1:],
+        history.get("total_volumes", [])[-1:],
+        history.get("derivatives"),
+    )
+
+
+def dashboard_input_version(*inputs: Any) -> str:
+    """Digest of the upstream payloads a dashboard build reads."""
+    digest = blake2b(digest_size=16)
+    for item in inputs:
+        digest.update(
+            json.dumps(item, sort_keys=True, separators=(",", ":"), default=str).encode()
+        )
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
 async def build_dashboard(
     service: MarketDataService,
     selected_coin: str,
     horizon_days: int,
     include_news: bool = True,
+    governor: ComputeGovernor | None = None,
+    stale_loader: Callable[[], Awaitable[dict[str, Any] | None]] | None = None,
+    cache: AsyncTTLCache | None = None,
 ) -> dict[str, Any]:
+    """The dashboard payload of one asset and horizon.
+
+    With a governor the forecast queues as interactive work. When a
+    ``stale_loader`` is also given, a forecast that cannot start within the
+    governor's admission wait is replaced by the journaled forecast it
+    returns; without one the request keeps waiting for its turn.
+
+    With a ``cache`` the built payload is shared by every request that reads
+    the same upstream data, and concurrent identical requests wait for one
+    build. Stale fallbacks are never cached. Shared payloads must not be
+    modified; only ``generated_at`` and the publication rule are per request.
+    """
     global_task = _optional(service.global_market(), {"data": {}})
     markets_task = _optional(service.markets(per_page=30, sparkline=True), [])
     chart_task = load_forecast_history(service, selected_coin)
@@ -165,60 +327,100 @@ async def build_dashboard(
             for coin in markets
         ] or [selected_raw]
 
-    selected = _market_row(selected_raw)
-    selected["forecast"] = await asyncio.to_thread(
-        build_forecast,
-        chart.get("prices", []),
-        horizon_days,
-        current_price=selected["current_price"],
-        volumes=chart.get("total_volumes", []),
-        market_prices=benchmark_chart.get("prices", []),
-        funding_rates=chart.get("funding_rates", []),
-    )
-    selected["forecast"]["data_source"] = chart.get("source", "CoinGecko")
-    selected["forecast"]["history_days"] = len(chart.get("prices", []))
+    async def build(admit: bool, journaled: dict[str, Any] | None = None) -> dict[str, Any]:
+        selected = _market_row(selected_raw)
+        forecast_args = (
+            chart,
+            benchmark_chart,
+            horizon_days,
+            selected["current_price"],
+            selected_coin,
+        )
+        if journaled is not None:
+            selected["forecast"] = stale_forecast(journaled, chart)
+        elif governor is None:
+            selected["forecast"] = await asyncio.to_thread(forecast_from_history, *forecast_args)
+        else:
+            selected["forecast"] = await governor.run(
+                INTERACTIVE,
+                forecast_from_history,
+                *forecast_args,
+                admit=admit,
+            )
+        selected["forecast"]["data_source"] = chart.get("source", "CoinGecko")
+        selected["forecast"]["history_days"] = len(chart.get("prices", []))
 
-    market_rows = normalize_market_rows(markets)
-    valid_movers = [row for row in market_rows if row["change_24h"] is not None]
-    sorted_movers = sorted(valid_movers, key=lambda row: row["change_24h"], reverse=True)
+        market_rows = normalize_market_rows(markets)
+        valid_movers = [row for row in market_rows if row["change_24h"] is not None]
+        sorted_movers = sorted(valid_movers, key=lambda row: row["change_24h"], reverse=True)
 
-    fear_value = int(fear_greed.get("value", 0)) if fear_greed else None
-    fear_label = fear_greed.get("value_classification") if fear_greed else None
-    news_rows = normalize_news(articles)
-    news_sentiment = aggregate_news_sentiment(news_rows, selected_coin)
-    selected["forecast"]["sentiment_context"] = dict(news_sentiment)
+        fear_value = int(fear_greed.get("value", 0)) if fear_greed else None
+        fear_label = fear_greed.get("value_classification") if fear_greed else None
+        news_rows = normalize_news(articles)
+        news_sentiment = aggregate_news_sentiment(news_rows, selected_coin)
+        selected["forecast"]["sentiment_context"] = dict(news_sentiment)
+
+        return {
+            "market": {
+                "overview_available": bool(global_data),
+                "total_market_cap": _optional_number(global_data.get("total_market_cap", {}).get("usd")),
+                "total_volume_24h": _optional_number(global_data.get("total_volume", {}).get("usd")),
+                "btc_dominance": _optional_number(global_data.get("market_cap_percentage", {}).get("btc")),
+                "eth_dominance": _optional_number(global_data.get("market_cap_percentage", {}).get("eth")),
+                "market_cap_change_24h": _optional_number(global_data.get("market_cap_change_percentage_24h_usd")),
+                "active_cryptocurrencies": int(global_data.get("active_cryptocurrencies", 0)),
+                "fear_greed": {"value": fear_value, "label": fear_label},
+            },
+            "market_data_source": market_data_source,
+            "derivatives": chart.get(
+                "derivatives",
+                {
+                    "available": False,
+                    "source": "Binance USDⓈ-M Futures",
+                    "status": "unavailable",
+                },
+            ),
+            "news_sentiment": news_sentiment,
+            "selected": selected,
+            "movers": {
+                "gainers": sorted_movers[:5],
+                "losers": list(reversed(sorted_movers[-5:])),
+            },
+            "watchlist": market_rows[:10],
+            "news": news_rows[:6],
+            "supported_coins": analysis_asset_list(),
+            "disclaimer": "Kísérleti technikai piaci jelzés, nem pénzügyi tanács.",
+        }
+
+    async def shared_build(admit: bool) -> dict[str, Any]:
+        if cache is None:
+            return await build(admit)
+        key = (
+            f"dashboard:{selected_coin}:{horizon_days}:{int(include_news)}:"
+            + dashboard_input_version(
+                _history_version(chart),
+                None if benchmark_chart is chart else _history_version(benchmark_chart),
+                global_response,
+                markets,
+                fear_greed,
+                articles,
+            )
+        )
+        return await cache.get_or_set(key, DASHBOARD_CACHE_SECONDS, lambda: build(admit))
+
+    try:
+        payload = await shared_build(admit=stale_loader is not None)
+    except ComputeBusyError:
+        journaled = await stale_loader()
+        payload = (
+            await build(admit=False, journaled=journaled)
+            if journaled is not None
+            else await shared_build(admit=False)
+        )
 
     generated_at = datetime.now(timezone.utc)
     return {
         "generated_at": generated_at.isoformat(),
         "forecast_publication": publication_rule_payload(horizon_days, generated_at),
-        "market": {
-            "overview_available": bool(global_data),
-            "total_market_cap": _optional_number(global_data.get("total_market_cap", {}).get("usd")),
-            "total_volume_24h": _optional_number(global_data.get("total_volume", {}).get("usd")),
-            "btc_dominance": _optional_number(global_data.get("market_cap_percentage", {}).get("btc")),
-            "eth_dominance": _optional_number(global_data.get("market_cap_percentage", {}).get("eth")),
-            "market_cap_change_24h": _optional_number(global_data.get("market_cap_change_percentage_24h_usd")),
-            "active_cryptocurrencies": int(global_data.get("active_cryptocurrencies", 0)),
-            "fear_greed": {"value": fear_value, "label": fear_label},
-        },
-        "market_data_source": market_data_source,
-        "derivatives": chart.get(
-            "derivatives",
-            {
-                "available": False,
-                "source": "Binance USDⓈ-M Futures",
-                "status": "unavailable",
-            },
-        ),
-        "news_sentiment": news_sentiment,
-        "selected": selected,
-        "movers": {
-            "gainers": sorted_movers[:5],
-            "losers": list(reversed(sorted_movers[-5:])),
-        },
-        "watchlist": market_rows[:10],
-        "news": news_rows[:6],
-        "supported_coins": analysis_asset_list(),
-        "disclaimer": "Kísérleti technikai piaci jelzés, nem pénzügyi tanács.",
+        **payload,
     }
@@ -0,0 +1,54 @@
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+
+class SqlStore:
+    """Connection handling shared by the stores of the forecast database.
+
+    Without ``database_url`` the store is a local SQLite file; with a
+    PostgreSQL URL every store writes to that database instead. Statements
+    use ``?`` placeholders on both backends.
+    """
+
+    def __init__(
+        self,
+        database_path: str | Path,
+        database_url: str | None = None,
+    ):
+        self.database_path = Path(database_path)
+        self.database_url = (database_url or "").strip()
+        if self.database_url and not self.database_url.startswith(
+            ("postgresql://", "postgres://")
+        ):
+            raise ValueError("FORECAST_DATABASE_URL must be a PostgreSQL URL")
+        self.backend = "postgresql" if self.database_url else "sqlite"
+
+    def _connect(self) -> Any:
+        if self.database_url:
+            try:
+                import psycopg
+                from psycopg.rows import dict_row
+            except ImportError as exc:
+                raise RuntimeError(
+                    "PostgreSQL storage requires psycopg[binary]"
+                ) from exc
+            return psycopg.connect(
+                self.database_url,
+                connect_timeout=5,
+                row_factory=dict_row,
+            )
+
+        connection = sqlite3.connect(self.database_path, timeout=5)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _execute(
+        self,
+        connection: Any,
+        statement: str,
+        parameters: tuple[Any, ...] = (),
+    ) -> Any:
+        if self.backend == "postgresql":
+            statement = statement.replace("?", "%s")
+        return connection.execute(statement, parameters)
@@ -0,0 +1,255 @@
+from math import isfinite
+from statistics import mean, stdev
+from threading import Lock
+from typing import Callable, Sequence
+
+import numpy as np
+
+from app.cache import WindowCache
+
+
+MAX_FEATURE_FRAMES = 32
+
+_FRAME_CACHE = WindowCache(MAX_FEATURE_FRAMES)
+
+
+def clamp(value: float, lower: float, upper: float) -> float:
+    return max(lower, min(upper, value))
+
+
+def finite(value: float, default: float = 0.0) -> float:
+    return float(value) if isfinite(float(value)) else default
+
+
+def return_pct(values: list[float], periods: int) -> float:
+    lookback = min(periods, len(values) - 1)
+    if lookback <= 0 or values[-lookback - 1] <= 0:
+        return 0.0
+    return ((values[-1] / values[-lookback - 1]) - 1) * 100
+
+
+def pct_returns(values: list[float]) -> list[float]:
+    return [
+        ((current / previous) - 1) * 100
+        for previous, current in zip(values, values[1:])
+        if previous > 0
+    ]
+
+
+def ema_last(values: list[float], span: int) -> float:
+    alpha = 2 / (span + 1)
+    result = values[0]
+    for value in values[1:]:
+        result = alpha * value + (1 - alpha) * result
+    return result
+
+
+def mean_rsi(values: list[float], window: int = 14) -> float:
+    """RSI from plain average gains and losses of the last ``window`` returns."""
+    recent = pct_returns(values[-(window + 1) :])
+    gains = [max(value, 0.0) for value in recent]
+    losses = [max(-value, 0.0) for value in recent]
+    average_gain = mean(gains) if gains else 0.0
+    average_loss = mean(losses) if losses else 0.0
+    if average_gain == 0 and average_loss == 0:
+        return 50.0
+    if average_loss == 0:
+        return 100.0
+    return 100 - (100 / (1 + average_gain / average_loss))
+
+
+def normalized_slope(values: list[float], window: int) -> float:
+    recent = values[-window:]
+    x_middle = (len(recent) - 1) / 2
+    y_middle = mean(recent)
+    denominator = sum((index - x_middle) ** 2 for index in range(len(recent)))
+    if denominator == 0 or y_middle == 0:
+        return 0.0
+    numerator = sum(
+        (index - x_middle) * (value - y_middle)
+        for index, value in enumerate(recent)
+    )
+    return numerator / denominator / y_middle * 100
+
+
+def zscore(values: list[float]) -> float:
+    if len(values) < 2:
+        return 0.0
+    deviation = stdev(values)
+    return (values[-1] - mean(values)) / deviation if deviation > 0 else 0.0
+
+
+def ema_series(values: Sequence[float] | np.ndarray, span: int) -> np.ndarray:
+    alpha = 2 / (span + 1)
+    points = values.tolist() if isinstance(values, np.ndarray) else list(values)
+    output = np.empty(len(points))
+    result = points[0] if points else 0.0
+    for index, value in enumerate(points):
+        if index:
+            result = alpha * value + (1 - alpha) * result
+        output[index] = result
+    return output
+
+
+def trailing(values: np.ndarray, ends: np.ndarray, width: int) -> np.ndarray:
+    return values[ends[:, None] + np.arange(1 - width, 1)[None, :]]
+
+
+def sample_deviation(windows: np.ndarray) -> np.ndarray:
+    deviations = windows.std(axis=1, ddof=1)
+    # statistics.stdev is exactly zero on flat windows; keep that instead of
+    # the rounding noise a float mean leaves behind.
+    return np.where(windows.max(axis=1) == windows.min(axis=1), 0.0, deviations)
+
+
+def trailing_rsi(returns: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    """``mean_rsi`` at every end index, from the returns leading into it."""
+    recent = trailing(returns, ends - 1, window)
+    average_gain = np.maximum(recent, 0.0).mean(axis=1)
+    average_loss = np.maximum(-recent, 0.0).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            average_loss == 0,
+            np.where(average_gain == 0, 50.0, 100.0),
+            100 - (100 / (1 + average_gain / average_loss)),
+        )
+
+
+def trailing_slope(values: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    recent = trailing(values, ends, window)
+    offsets = np.arange(window) - (window - 1) / 2
+    y_middle = recent.mean(axis=1)
+    numerator = ((recent - y_middle[:, None]) * offsets).sum(axis=1)
+    return numerator / float((offsets**2).sum()) / y_middle * 100
+
+
+def _return_column(prices: np.ndarray, ends: np.ndarray, periods: int) -> np.ndarray:
+    return (prices[ends] / prices[ends - periods] - 1) * 100
+
+
+def _sma_column(prices: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    return trailing(prices, ends, window).mean(axis=1)
+
+
+def _high_column(prices: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    return trailing(prices, ends, window).max(axis=1)
+
+
+def _rsi_column(prices: np.ndarray, ends: np.ndarray, window: int) -> np.ndarray:
+    # Only the returns the requested windows read are computed.
+    first = int(ends[0]) - window
+    returns = (prices[first + 1 :] / prices[first:-1] - 1) * 100
+    return trailing_rsi(returns, ends - first, window)
+
+
+# Kind -> (builder for the given end indexes, first index with a value).
+_WINDOW_COLUMNS: dict[
+    str,
+    tuple[Callable[[np.ndarray, np.ndarray, int], np.ndarray], Callable[[int], int]],
+] = {
+    "return": (_return_column, lambda periods: periods),
+    "sma": (_sma_column, lambda window: window - 1),
+    "high": (_high_column, lambda window: window - 1),
+    "rsi": (_rsi_column, lambda window: window),
+}
+
+
+class FeatureFrame:
+    """Named feature columns of one price history, shared by every model.
+
+    Columns are named ``<kind>_<period>`` (``return_7``, ``ema_20``,
+    ``sma_200``, ``high_30``, ``rsi_14``) and hold a value for every index,
+    NaN until enough history exists. The value at an index only uses prices
+    up to it, so a column is built once per history and each model family
+    selects the rows of its own origins. Returned columns must not be
+    modified.
+    """
+
+    def __init__(self, prices: np.ndarray):
+        self.prices = prices
+        self._columns: dict[str, np.ndarray] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def column(self, name: str) -> np.ndarray:
+        with self._lock:
+            column = self._columns.get(name)
+            if column is None:
+                column = self._build(name, 0, None)
+                self._columns[name] = column
+            return column
+
+    def select(self, names: Sequence[str], origins: np.ndarray) -> dict[str, np.ndarray]:
+        return {name: self.column(name)[origins] for name in names}
+
+    def extended(self, prices: np.ndarray, dropped: int = 0) -> "FeatureFrame":
+        """Frame of a history continuing this one's prices.
+
+        ``prices`` starts ``dropped`` points into this frame's history, as a
+        fixed-length window does after sliding forward. Built columns carry
+        over; only the values of the new indexes are computed, with the same
+        arithmetic as a full build. EMAs depend on where the history starts,
+        so a slid window builds them again when they are first read.
+        """
+        frame = FeatureFrame(prices)
+        with self._lock:
+            columns = dict(self._columns)
+        for name, previous in columns.items():
+            if dropped and name.startswith("ema_"):
+                continue
+            frame._columns[name] = frame._build(
+                name,
+                len(self) - dropped,
+                previous[dropped:],
+            )
+        return frame
+
+    def _build(self, name: str, start: int, previous: np.ndarray | None) -> np.ndarray:
+        kind, _, period_text = name.rpartition("_")
+        period = int(period_text)
+        length = len(self.prices)
+        output = np.full(length, np.nan)
+        if previous is not None:
+            output[:start] = previous
+
+        if kind == "ema":
+            if previous is None or not start:
+                return ema_series(self.prices, period)
+            alpha = 2 / (period + 1)
+            result = float(previous[-1])
+            for index in range(start, length):
+                result = alpha * float(self.prices[index]) + (1 - alpha) * result
+                output[index] = result
+            return output
+
+        if kind not in _WINDOW_COLUMNS:
+            raise ValueError(f"Ismeretlen jellemzőoszlop: {name}")
+        builder, first = _WINDOW_COLUMNS[kind]
+        # Carried values before the first full window came from history that
+        # a slid window no longer has.
+        output[: first(period)] = np.nan
+        ends = np.arange(max(first(period), start), length)
+        if len(ends):
+            output[ends] = builder(self.prices, ends, period)
+        return output
+
+
+def feature_frame(values: Sequence[float] | np.ndarray) -> FeatureFrame:
+    """The cached frame of ``values``, extending the frame of an earlier window.
+
+    Frames are keyed by the prices themselves, so every model family and
+    every horizon reading the same history shares one frame. A history that
+    gained a few closes, or a capped window that slid forward by a few days,
+    continues the frame of its earlier window.
+    """
+    prices = np.asarray(values, dtype=np.float64)
+    match = _FRAME_CACHE.find(prices)
+    if match.value is not None:
+        return match.value
+    if match.earlier is not None:
+        frame = match.earlier.extended(prices, match.dropped)
+    else:
+        frame = FeatureFrame(prices)
+    return _FRAME_CACHE.put(match.key, (prices,), frame)
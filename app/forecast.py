@@ -1,10 +1,21 @@
-from datetime import datetime, timezone
 from math import isfinite, sqrt
-from statistics import mean, stdev
+from statistics import mean
 from typing import Any
 
-from app.probability_models import build_probability_forecast
-from app.specialist_models import build_specialist_estimate
+from app.alignment import DailyAlignment, align_daily
+from app.features import clamp
+from app.indicators import IndicatorSeries, build_indicator_series
+from app.probability_models import (
+    build_probability_forecast,
+    live_probability_state,
+    state_top_features,
+)
+from app.specialist_models import (
+    FEATURE_LOOKBACK_DAYS,
+    build_specialist_estimate,
+    live_specialist_state,
+)
+from app.timeseries import SeriesLike, TimeSeries
 
 MODEL_NAME = "Kalibrált horizont-specialista ensemble"
 MODEL_VERSION = "5.1.0"
@@ -50,10 +61,6 @@ REGIME_PRIORS = {
 }
 
 
-def _clamp(value: float, minimum: float, maximum: float) -> float:
-    return max(minimum, min(maximum, value))
-
-
 def _clean_number(value: Any, digits: int = 2) -> float | None:
     try:
         number = float(value)
@@ -73,38 +80,6 @@ def classify_direction(change_pct: float, horizon_days: int) -> tuple[str, str]:
     return "Semleges", "neutral"
 
 
-def _ema(values: list[float], span: int) -> list[float]:
-    alpha = 2 / (span + 1)
-    output = [values[0]]
-    for value in values[1:]:
-        output.append(alpha * value + (1 - alpha) * output[-1])
-    return output
-
-
-def _latest_rsi(values: list[float], window: int = 14) -> float:
-    deltas = [current - previous for previous, current in zip(values, values[1:])]
-    if len(deltas) < window:
-        return 50.0
-
-    gains = [max(delta, 0.0) for delta in deltas]
-    losses = [max(-delta, 0.0) for delta in deltas]
-    average_gain = sum(gains[:window]) / window
-    average_loss = sum(losses[:window]) / window
-
-    for gain, loss in zip(gains[window:], losses[window:]):
-        average_gain = ((window - 1) * average_gain + gain) / window
-        average_loss = ((window - 1) * average_loss + loss) / window
-
-    if average_gain == 0 and average_loss == 0:
-        return 50.0
-    if average_loss == 0:
-        return 100.0
-    if average_gain == 0:
-        return 0.0
-    relative_strength = average_gain / average_loss
-    return 100 - (100 / (1 + relative_strength))
-
-
 def _quantile(values: list[float], probability: float) -> float:
     ordered = sorted(values)
     position = (len(ordered) - 1) * probability
@@ -114,112 +89,64 @@ def _quantile(values: list[float], probability: float) -> float:
     return ordered[lower_index] * (1 - weight) + ordered[upper_index] * weight
 
 
-def _series_by_day(series: list[list[float]]) -> dict[str, dict[str, Any]]:
-    by_day: dict[str, dict[str, Any]] = {}
-    for item in series:
-        if not isinstance(item, (list, tuple)) or len(item) < 2:
-            continue
-        try:
-            timestamp = datetime.fromtimestamp(float(item[0]) / 1000, timezone.utc)
-            value = float(item[1])
-        except (TypeError, ValueError, OSError):
-            continue
-        if not isfinite(value) or value < 0:
-            continue
-        by_day[timestamp.date().isoformat()] = {
-            "timestamp": timestamp.isoformat(),
-            "value": value,
-        }
-    return by_day
-
-
-def daily_value_map(series: list[list[float]]) -> dict[str, float]:
-    return {day: item["value"] for day, item in _series_by_day(series).items()}
+def daily_series(prices: SeriesLike) -> TimeSeries:
+    series = TimeSeries.from_points(prices)
+    if not len(series):
+        raise ValueError("Nincsenek árfolyamadatok")
 
+    daily = series.daily()
+    positive = daily.values > 0
+    daily = TimeSeries(daily.timestamps[positive], daily.values[positive])
+    if len(daily) < 35:
+        raise ValueError("Legalább 35 napi adat szükséges")
+    return daily
 
-def daily_points(prices: list[list[float]]) -> list[dict[str, Any]]:
-    if not prices:
-        raise ValueError("Nincsenek árfolyamadatok")
 
-    points = [
-        {"timestamp": item["timestamp"], "price": item["value"]}
-        for _day, item in sorted(_series_by_day(prices).items())
-        if item["value"] > 0
+def daily_points(prices: SeriesLike) -> list[dict[str, Any]]:
+    series = daily_series(prices)
+    return [
+        {"timestamp": series.isoformat(index), "price": price}
+        for index, price in enumerate(series.values.tolist())
     ]
-    if len(points) < 35:
-        raise ValueError("Legalább 35 napi adat szükséges")
-    return points
 
 
 def _indicator_values(values: list[float]) -> dict[str, float]:
-    ema20_values = _ema(values, 20)
-    ema50_values = _ema(values, 50)
-    ema12_values = _ema(values, 12)
-    ema26_values = _ema(values, 26)
-    macd_values = [fast - slow for fast, slow in zip(ema12_values, ema26_values)]
-    macd_signal_values = _ema(macd_values, 9)
-    recent = values[-20:]
-    middle = mean(recent)
-    deviation = stdev(recent) if len(recent) > 1 else 0.0
-
-    return {
-        "price": values[-1],
-        "ema20": ema20_values[-1],
-        "ema50": ema50_values[-1],
-        "sma200": mean(values[-min(200, len(values)) :]),
-        "rsi": _latest_rsi(values),
-        "macd_histogram": macd_values[-1] - macd_signal_values[-1],
-        "bollinger_middle": middle,
-        "bollinger_upper": middle + 2 * deviation,
-        "bollinger_lower": middle - 2 * deviation,
-    }
+    return build_indicator_series(values).indicators(len(values) - 1)
 
 
-def calculate_indicators(prices: list[list[float]]) -> dict[str, Any]:
+def calculate_indicators(prices: SeriesLike) -> dict[str, Any]:
     points = daily_points(prices)
     values = [point["price"] for point in points]
     return {"points": points, **_indicator_values(values)}
 
 
-def _lookback_change(values: list[float], days: int) -> float:
-    lookback = min(days, len(values) - 1)
-    return ((values[-1] / values[-lookback - 1]) - 1) * 100
-
-
-def _trimmed_daily_drift(returns: list[float], horizon_days: int) -> float:
-    recent = sorted(returns[-30:])
-    if len(recent) >= 10:
-        trim = max(1, len(recent) // 10)
-        recent = recent[trim:-trim]
-    return mean(recent) * horizon_days * 100 if recent else 0.0
-
-
-def _volume_ratio(volumes: list[float | None]) -> float | None:
-    valid = [float(value) for value in volumes if value is not None and value > 0]
-    if len(valid) < 21:
-        return None
-    short = mean(valid[-7:])
-    long = mean(valid[-30:])
-    return short / long if long > 0 else None
-
-
 def technical_snapshot(
     values: list[float],
     horizon_days: int,
     volumes: list[float | None] | None = None,
+) -> dict[str, Any]:
+    return technical_snapshot_at(
+        build_indicator_series(values, volumes),
+        len(values) - 1,
+        horizon_days,
+    )
+
+
+def technical_snapshot_at(
+    series: IndicatorSeries,
+    anchor: int,
+    horizon_days: int,
 ) -> dict[str, Any]:
     config = HORIZON_CONFIG[horizon_days]
-    indicators = _indicator_values(values)
-    price = values[-1]
+    indicators = series.indicators(anchor)
+    price = indicators["price"]
     ema20 = indicators["ema20"]
     ema50 = indicators["ema50"]
-    returns = [(current / previous) - 1 for previous, current in zip(values, values[1:])]
-    recent_returns = returns[-30:]
-    daily_volatility = stdev(recent_returns) if len(recent_returns) > 1 else 0.0
+    daily_volatility = float(series.daily_volatility[anchor])
     annualized_volatility = daily_volatility * sqrt(365) * 100
 
-    momentum = _lookback_change(values, config["momentum_days"])
-    secondary_momentum = _lookback_change(values, config["secondary_days"])
+    momentum = series.lookback_change(anchor, config["momentum_days"])
+    secondary_momentum = series.lookback_change(anchor, config["secondary_days"])
     trend_pct = ((ema20 / ema50) - 1) * 100
     deviation_pct = ((price / ema20) - 1) * 100
     trend_noise = max(daily_volatility * sqrt(20) * 100, 0.35)
@@ -235,23 +162,27 @@ def technical_snapshot(
 
     limit = config["limit"]
     horizon_scale = max(0.22, sqrt(horizon_days / 20))
-    momentum_candidate = _clamp(
+    momentum_candidate = clamp(
         momentum * 0.30 + secondary_momentum * 0.10,
         -limit,
         limit,
     )
-    trend_candidate = _clamp(trend_pct * horizon_scale * 0.85, -limit, limit)
-    drift_candidate = _clamp(_trimmed_daily_drift(returns, horizon_days), -limit, limit)
-    mean_reversion_candidate = _clamp(
+    trend_candidate = clamp(trend_pct * horizon_scale * 0.85, -limit, limit)
+    drift_candidate = clamp(
+        float(series.daily_drift[anchor]) * horizon_days * 100,
+        -limit,
+        limit,
+    )
+    mean_reversion_candidate = clamp(
         -deviation_pct * 0.35 * max(0.45, sqrt(horizon_days / 7)),
         -limit,
         limit,
     )
-    volume_ratio = _volume_ratio(volumes or [])
+    volume_ratio = series.volume_ratio_at(anchor)
     volume_candidate = momentum_candidate
     if volume_ratio is not None:
-        volume_candidate *= _clamp(volume_ratio, 0.7, 1.3)
-    volume_candidate = _clamp(volume_candidate, -limit, limit)
+        volume_candidate *= clamp(volume_ratio, 0.7, 1.3)
+    volume_candidate = clamp(volume_candidate, -limit, limit)
 
     return {
         "regime": regime,
@@ -276,10 +207,10 @@ def technical_snapshot(
 
 
 def _calibration_samples(
-    values: list[float],
+    series: IndicatorSeries,
     horizon_days: int,
-    volumes: list[float | None],
 ) -> list[dict[str, Any]]:
+    values = series.values
     last_anchor = len(values) - horizon_days - 1
     first_anchor = MINIMUM_FEATURE_DAYS - 1
     if last_anchor < first_anchor:
@@ -288,11 +219,7 @@ def _calibration_samples(
 
     samples = []
     for anchor in range(first_anchor, last_anchor + 1):
-        snapshot = technical_snapshot(
-            values[: anchor + 1],
-            horizon_days,
-            volumes[: anchor + 1],
-        )
+        snapshot = technical_snapshot_at(series, anchor, horizon_days)
         actual_change = ((values[anchor + horizon_days] / values[anchor]) - 1) * 100
         samples.append(
             {
@@ -395,8 +322,8 @@ def _calibrate_ensemble(
         empty["method_skills"] = fit["method_skills"]
         return empty
 
-    sample_factor = _clamp(len(training) / 45, 0.45, 1.0)
-    reliability = _clamp(
+    sample_factor = clamp(len(training) / 45, 0.45, 1.0)
+    reliability = clamp(
         (fit["strongest_skill"] - MINIMUM_METHOD_SKILL) * 2.8,
         0.0,
         0.72,
@@ -422,7 +349,7 @@ def _calibrate_ensemble(
         empty["method_skills"] = fit["method_skills"]
         return empty
 
-    reliability *= _clamp(initial_skill * 4, 0.15, 1.0)
+    reliability *= clamp(initial_skill * 4, 0.15, 1.0)
     holdout_active_hits = []
     for sample in holdout:
         _, predicted_direction = classify_direction(
@@ -504,7 +431,7 @@ def build_model_estimate(
     )
     expected_change = raw_ensemble * calibration["reliability"]
     limit = HORIZON_CONFIG[horizon_days]["limit"]
-    expected_change = _clamp(expected_change, -limit, limit)
+    expected_change = clamp(expected_change, -limit, limit)
     direction, direction_key = classify_direction(expected_change, horizon_days)
     lower_change, upper_change = _prediction_interval(
         expected_change,
@@ -534,7 +461,7 @@ def build_model_estimate(
         "direction_key": direction_key,
         "lower_change": lower_change,
         "upper_change": upper_change,
-        "confidence": _clamp(quality, 38, 78),
+        "confidence": clamp(quality, 38, 78),
     }
 
 
@@ -556,20 +483,20 @@ def apply_specialist_estimate(
         + specialist_change * blend_weight
     )
     limit = HORIZON_CONFIG[horizon_days]["limit"]
-    expected_change = _clamp(expected_change, -limit, limit)
+    expected_change = clamp(expected_change, -limit, limit)
     interval_shift = expected_change - technical_change
-    lower_change = _clamp(
+    lower_change = clamp(
         float(estimate["lower_change"]) + interval_shift,
         -95.0,
         expected_change,
     )
-    upper_change = _clamp(
+    upper_change = clamp(
         float(estimate["upper_change"]) + interval_shift,
         expected_change,
         300.0,
     )
     direction, direction_key = classify_direction(expected_change, horizon_days)
-    skill_bonus = _clamp(float(specialist["validation_skill_pct"]) / 4, 0.0, 5.0)
+    skill_bonus = clamp(float(specialist["validation_skill_pct"]) / 4, 0.0, 5.0)
 
     output.update(
         {
@@ -578,61 +505,71 @@ def apply_specialist_estimate(
             "direction_key": direction_key,
             "lower_change": lower_change,
             "upper_change": upper_change,
-            "confidence": _clamp(float(estimate["confidence"]) + skill_bonus, 38, 82),
+            "confidence": clamp(float(estimate["confidence"]) + skill_bonus, 38, 82),
         }
     )
     return output
 
 
+def _daily_inputs(
+    series: TimeSeries,
+    current_price: float | None,
+    volumes: SeriesLike | None,
+    market_prices: SeriesLike | None,
+    funding_rates: SeriesLike | None,
+) -> tuple[DailyAlignment, list[float], list[float | None], list[float], list[float | None]]:
+    alignment = align_daily(series, volumes, funding_rates, market_prices)
+    values = series.values.tolist()
+    base_price = float(current_price or values[-1])
+    values[-1] = base_price
+    market_values = alignment.market_values.tolist()
+    if not alignment.market_observed[-1]:
+        market_values[-1] = base_price
+    return (
+        alignment,
+        values,
+        alignment.volume_list(),
+        market_values,
+        alignment.funding_list(),
+    )
+
+
 def build_forecast(
-    prices: list[list[float]],
+    prices: SeriesLike,
     horizon_days: int,
     current_price: float | None = None,
-    volumes: list[list[float]] | None = None,
-    market_prices: list[list[float]] | None = None,
-    funding_rates: list[list[float]] | None = None,
+    volumes: SeriesLike | None = None,
+    market_prices: SeriesLike | None = None,
+    funding_rates: SeriesLike | None = None,
+    state_key: str = "",
+    data_version: str = "",
 ) -> dict[str, Any]:
     if horizon_days not in HORIZON_CONFIG:
         raise ValueError("Az időtáv 1, 7 vagy 30 nap lehet.")
 
-    indicators = calculate_indicators(prices)
-    points = indicators["points"]
-    values = [float(point["price"]) for point in points]
-    base_price = float(current_price or values[-1])
-    values[-1] = base_price
-
-    volume_by_day = daily_value_map(volumes or [])
-    volume_values: list[float | None] = [
-        volume_by_day.get(_parse_point_day(point["timestamp"]))
-        for point in points
-    ]
-    funding_by_day = daily_value_map(funding_rates or [])
-    funding_values: list[float | None] = [
-        funding_by_day.get(_parse_point_day(point["timestamp"]))
-        for point in points
-    ]
-    market_by_day = daily_value_map(market_prices or prices)
-    market_values = []
-    previous_market_value = None
-    matched_market_days = 0
-    for point, fallback_value in zip(points, values):
-        market_value = market_by_day.get(_parse_point_day(point["timestamp"]))
-        if market_value is not None and market_value > 0:
-            previous_market_value = market_value
-            matched_market_days += 1
-        market_values.append(float(previous_market_value or fallback_value))
-    market_context_available = bool(market_prices) and matched_market_days >= min(
-        200,
-        round(len(points) * 0.90),
+    series = daily_series(prices)
+    alignment, values, volume_values, market_values, funding_values = _daily_inputs(
+        series,
+        current_price,
+        volumes,
+        market_prices,
+        funding_rates,
+    )
+    base_price = values[-1]
+    market_context_available = alignment.market_provided and (
+        alignment.market_matches >= min(200, round(len(values) * 0.90))
     )
-    snapshot = technical_snapshot(values, horizon_days, volume_values)
-    samples = _calibration_samples(values, horizon_days, volume_values)
+    indicator_series = build_indicator_series(values, volume_values)
+    snapshot = technical_snapshot_at(indicator_series, len(values) - 1, horizon_days)
+    samples = _calibration_samples(indicator_series, horizon_days)
     estimate = build_model_estimate(snapshot, samples, horizon_days)
     specialist = build_specialist_estimate(
         values,
         volume_values,
         horizon_days,
         DIRECTION_THRESHOLDS[horizon_days],
+        state_key=state_key,
+        data_version=data_version,
     )
     estimate = apply_specialist_estimate(estimate, specialist, horizon_days)
     calibration = estimate["calibration"]
@@ -651,6 +588,8 @@ def build_forecast(
         upper_change,
         market_context_available,
         funding_rates=funding_values,
+        state_key=state_key,
+        data_version=data_version,
     )
 
     recent_prices = values[-20:]
@@ -701,8 +640,11 @@ def build_forecast(
     decision_signal = f"Döntési kapu: {probability_forecast['decision']['label']}"
 
     chart_points = [
-        {"timestamp": point["timestamp"], "price": round(float(point["price"]), 8)}
-        for point in points[-60:]
+        {"timestamp": series.isoformat(index), "price": round(float(price), 8)}
+        for index, price in enumerate(
+            series.values[-60:].tolist(),
+            start=max(len(series) - 60, 0),
+        )
     ]
 
     return {
@@ -777,8 +719,53 @@ def build_forecast(
     }
 
 
-def _parse_point_day(value: str) -> str:
-    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
-    if timestamp.tzinfo is None:
-        timestamp = timestamp.replace(tzinfo=timezone.utc)
-    return timestamp.astimezone(timezone.utc).date().isoformat()
+def refit_daily_state(
+    family: str,
+    prices: SeriesLike,
+    horizon_days: int,
+    volumes: SeriesLike | None = None,
+    market_prices: SeriesLike | None = None,
+    funding_rates: SeriesLike | None = None,
+    state_key: str = "",
+    data_version: str = "",
+) -> Any:
+    """Live state of one daily model family, from the inputs ``build_forecast`` uses.
+
+    Refits run in the background, so the state is returned fully resolved.
+    """
+    if horizon_days not in HORIZON_CONFIG:
+        raise ValueError("Az időtáv 1, 7 vagy 30 nap lehet.")
+
+    _, values, volume_values, market_values, funding_values = _daily_inputs(
+        daily_series(prices),
+        None,
+        volumes,
+        market_prices,
+        funding_rates,
+    )
+    if family == "specialist":
+        if len(values) < FEATURE_LOOKBACK_DAYS:
+            raise ValueError("Legalább 61 napi adat szükséges a specialista modellhez.")
+        return live_specialist_state(
+            values,
+            volume_values,
+            horizon_days,
+            DIRECTION_THRESHOLDS[horizon_days],
+            state_key,
+            data_version,
+        )
+    if family == "probability":
+        state = live_probability_state(
+            values,
+            volume_values,
+            market_values,
+            horizon_days,
+            funding_values,
+            state_key,
+            data_version,
+        )
+        # Live fits defer their permutation importance; resolve it here, off
+        # the request path, so requests only run inference.
+        state_top_features(state)
+        return state
+    raise ValueError(f"Ismeretlen napi modellcsalád: {family}")
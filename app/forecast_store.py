@@ -1,11 +1,11 @@
 import json
 from math import sqrt
-import sqlite3
 from statistics import mean
 from datetime import datetime, timedelta, timezone
-from pathlib import Path
 from typing import Any
 
+from app.database import SqlStore
+
 
 JOURNAL_BUCKET_MINUTES = 15
 FEATURE_SNAPSHOT_VERSION = "1.0.0"
@@ -167,49 +167,7 @@ def _performance_metrics(
     }
 
 
-class ForecastStore:
-    def __init__(
-        self,
-        database_path: str | Path,
-        database_url: str | None = None,
-    ):
-        self.database_path = Path(database_path)
-        self.database_url = (database_url or "").strip()
-        if self.database_url and not self.database_url.startswith(
-            ("postgresql://", "postgres://")
-        ):
-            raise ValueError("FORECAST_DATABASE_URL must be a PostgreSQL URL")
-        self.backend = "postgresql" if self.database_url else "sqlite"
-
-    def _connect(self) -> Any:
-        if self.database_url:
-            try:
-                import psycopg
-                from psycopg.rows import dict_row
-            except ImportError as exc:
-                raise RuntimeError(
-                    "PostgreSQL storage requires psycopg[binary]"
-                ) from exc
-            return psycopg.connect(
-                self.database_url,
-                connect_timeout=5,
-                row_factory=dict_row,
-            )
-
-        connection = sqlite3.connect(self.database_path, timeout=5)
-        connection.row_factory = sqlite3.Row
-        return connection
-
-    def _execute(
-        self,
-        connection: Any,
-        statement: str,
-        parameters: tuple[Any, ...] = (),
-    ) -> Any:
-        if self.backend == "postgresql":
-            statement = statement.replace("?", "%s")
-        return connection.execute(statement, parameters)
-
+class ForecastStore(SqlStore):
     def _column_names(self, connection: Any, table_name: str) -> set[str]:
         if self.backend == "postgresql":
             rows = self._execute(
@@ -1031,3 +989,64 @@ class ForecastStore:
             }
             for row in rows
         ]
+
+    def latest_forecast(
+        self,
+        coin_id: str,
+        horizon_days: int,
+        model_version: str,
+        max_age_minutes: int = 0,
+        now: datetime | None = None,
+    ) -> dict[str, Any] | None:
+        """The newest journaled forecast with the model block of its snapshot.
+
+        With ``max_age_minutes`` an older forecast counts as missing, so a
+        replay never shows a price and signal from long ago as the latest.
+        """
+        with self._connect() as connection:
+            row = self._execute(
+                connection,
+                """
+                SELECT *
+                FROM forecast_log
+                WHERE coin_id = ? AND horizon_days = ? AND model_version = ?
+                ORDER BY generated_at DESC
+                LIMIT 1
+                """,
+                (coin_id, horizon_days, model_version),
+            ).fetchone()
+            if row is None:
+                return None
+            if max_age_minutes > 0:
+                current_time = now or datetime.now(timezone.utc)
+                if current_time.tzinfo is None:
+                    current_time = current_time.replace(tzinfo=timezone.utc)
+                age = current_time - _utc_datetime(str(row["generated_at"]))
+                if age > timedelta(minutes=max_age_minutes):
+                    return None
+            snapshot = self._execute(
+                connection,
+                """
+                SELECT model_json
+                FROM feature_snapshot
+                WHERE coin_id = ? AND horizon_days = ? AND bucket_start = ?
+                ORDER BY generated_at DESC
+                LIMIT 1
+                """,
+                (coin_id, horizon_days, row["bucket_start"]),
+            ).fetchone()
+
+        return {
+            "coin_id": row["coin_id"],
+            "symbol": row["symbol"],
+            "horizon_days": row["horizon_days"],
+            "model_version": row["model_version"],
+            "generated_at": row["generated_at"],
+            "base_price": row["base_price"],
+            "target_price": row["target_price"],
+            "expected_change_pct": row["expected_change_pct"],
+            "direction_key": row["direction_key"],
+            "confidence": row["confidence"],
+            "indicators": json.loads(row["indicators_json"]),
+            "model": json.loads(snapshot["model_json"]) if snapshot else {},
+        }
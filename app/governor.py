@@ -0,0 +1,225 @@
+import asyncio
+import os
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from contextvars import copy_context
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, AsyncIterator, Callable
+
+from threadpoolctl import ThreadpoolController, threadpool_limits
+
+
+INTERACTIVE = 0
+ANALYTICS = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {
+    INTERACTIVE: "interactive",
+    ANALYTICS: "analytics",
+    BACKGROUND: "background",
+}
+
+
+class ComputeBusyError(RuntimeError):
+    """An admission-controlled job waited longer than the admission limit."""
+
+
+def compute_slots(slots: int = 0) -> int:
+    """Configured slot count, or one per core (at least two) when unset."""
+    return max(1, slots) if slots else max(2, os.cpu_count() or 1)
+
+
+def job_threads(slots: int = 0, thread_budget: int = 0) -> int:
+    """Native threads of one admitted job: an equal share of the budget."""
+    return max(1, (thread_budget or os.cpu_count() or 1) // compute_slots(slots))
+
+
+def limit_blas_threads(threads: int) -> None:
+    """Cap the process-wide BLAS pools once, at process start.
+
+    BLAS limits are global to the process, so they are never set and
+    restored around single jobs, where concurrent jobs would undo each
+    other's limits.
+    """
+    threadpool_limits(limits=threads, user_api="blas")
+
+
+def openmp_threads() -> int:
+    """OpenMP threads the calling thread may currently use."""
+    limits = [
+        item["num_threads"]
+        for item in ThreadpoolController().select(user_api="openmp").info()
+    ]
+    return min(limits, default=os.cpu_count() or 1)
+
+
+def limit_openmp_threads(threads: int) -> None:
+    threadpool_limits(limits=threads, user_api="openmp")
+
+
+def run_limited(threads: int, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call ``function`` with the calling thread's OpenMP pool capped at ``threads``.
+
+    OpenMP limits belong to the calling thread, so concurrent jobs keep their
+    own caps. Module level so process pools can pickle it together with the job.
+    """
+    with threadpool_limits(limits=threads, user_api="openmp"):
+        return function(*args, **kwargs)
+
+
+class ComputeGovernor:
+    """Admits CPU-bound jobs into a fixed number of slots, by priority.
+
+    A job waits until a slot frees up; waiting jobs are admitted in priority
+    order (interactive inference, then analytics, then backtests and
+    background training) and first come, first served within a priority.
+    With two or more slots one of them is reserved for interactive jobs, so
+    a forecast never waits for a running backtest; long jobs take a slot per
+    unit of work (one dataset, one background fit) rather than for a whole run.
+    Each admitted job gets an equal share of the native thread budget, so
+    HistGradientBoosting and BLAS pools never add up to more threads than
+    the instance has. Jobs entered with ``admit`` give up with
+    ``ComputeBusyError`` after ``admission_wait_seconds`` in the queue, so
+    callers with a cheaper answer can serve it instead of piling up.
+    """
+
+    def __init__(
+        self,
+        slots: int = 0,
+        thread_budget: int = 0,
+        admission_wait_seconds: float = 0.0,
+    ):
+        self.slots = compute_slots(slots)
+        self.shared_slots = max(1, self.slots - 1)
+        self.threads_per_job = job_threads(slots, thread_budget)
+        self.admission_wait_seconds = max(0.0, admission_wait_seconds)
+        self._running = 0
+        self._shared_running = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = count()
+        self._completed = 0
+        self._rejected = 0
+
+    async def _enter(self, priority: int, admit: bool) -> None:
+        if admit and self.admission_wait_seconds > 0:
+            try:
+                async with asyncio.timeout(self.admission_wait_seconds):
+                    await self._acquire(priority)
+            except TimeoutError:
+                self._rejected += 1
+                raise ComputeBusyError(
+                    "A számítási sor túl hosszú; a kérés nem kapott időben helyet."
+                ) from None
+        else:
+            await self._acquire(priority)
+
+    def _leave(self, priority: int) -> None:
+        self._release(priority)
+        self._completed += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int, admit: bool = False) -> AsyncIterator[None]:
+        await self._enter(priority, admit)
+        try:
+            yield
+        finally:
+            self._leave(priority)
+
+    async def run(
+        self,
+        priority: int,
+        function: Callable[..., Any],
+        *args: Any,
+        admit: bool = False,
+        executor: Executor | None = None,
+    ) -> Any:
+        """Run ``function`` in a worker thread, or in ``executor``, inside a slot.
+
+        A cancelled caller cannot stop a running thread or worker process, so
+        the slot is held until the job itself returns, not until the caller
+        stops waiting; otherwise orphaned jobs would run beside newly
+        admitted ones.
+        """
+        await self._enter(priority, admit)
+        try:
+            call = partial(run_limited, self.threads_per_job, function, *args)
+            if executor is None:
+                # Like ``asyncio.to_thread``: the job sees the caller's context.
+                call = partial(copy_context().run, call)
+            future = asyncio.get_running_loop().run_in_executor(executor, call)
+        except BaseException:
+            self._leave(priority)
+            raise
+        future.add_done_callback(partial(self._job_done, priority))
+        return await asyncio.shield(future)
+
+    def _job_done(self, priority: int, future: asyncio.Future[Any]) -> None:
+        if not future.cancelled():
+            # Retrieved here too, for jobs whose caller was cancelled.
+            future.exception()
+        self._leave(priority)
+
+    def _admissible(self, priority: int) -> bool:
+        return self._running < self.slots and (
+            priority == INTERACTIVE or self._shared_running < self.shared_slots
+        )
+
+    def _start(self, priority: int) -> None:
+        self._running += 1
+        if priority != INTERACTIVE:
+            self._shared_running += 1
+
+    async def _acquire(self, priority: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heappush(self._waiters, (priority, next(self._sequence), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation.
+            if future.done() and not future.cancelled():
+                self._release(priority)
+            raise
+
+    def _release(self, priority: int) -> None:
+        self._running -= 1
+        if priority != INTERACTIVE:
+            self._shared_running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        # The heap head is the most urgent waiter; when it cannot start,
+        # nobody behind it can either (interactive jobs always sort first).
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heappop(self._waiters)
+                continue
+            if not self._admissible(priority):
+                return
+            heappop(self._waiters)
+            self._start(priority)
+            future.set_result(None)
+
+    def queue_depth(self, priority: int | None = None) -> int:
+        return sum(
+            not future.done() and (priority is None or waiting_priority == priority)
+            for waiting_priority, _, future in self._waiters
+        )
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "slots": self.slots,
+            "interactive_reserved": self.slots - self.shared_slots,
+            "threads_per_job": self.threads_per_job,
+            "running": self._running,
+            "queued": self.queue_depth(),
+            "queued_by_priority": {
+                name: self.queue_depth(priority)
+                for priority, name in PRIORITY_NAMES.items()
+            },
+            "completed": self._completed,
+            "admission_wait_seconds": self.admission_wait_seconds,
+            "rejected": self._rejected,
+        }
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.features import ema_series, feature_frame, sample_deviation
+
+
+RSI_WINDOW = 14
+BOLLINGER_WINDOW = 20
+SMA_WINDOW = 200
+RETURN_WINDOW = 30
+VOLUME_SHORT_WINDOW = 7
+VOLUME_LONG_WINDOW = 30
+MINIMUM_VOLUME_DAYS = 21
+
+
+def _rsi(values: list[float], window: int = RSI_WINDOW) -> list[float]:
+    """Wilder RSI after every close, 50 until the first full window."""
+    output = [50.0] * len(values)
+    average_gain = 0.0
+    average_loss = 0.0
+    for index in range(1, len(values)):
+        delta = values[index] - values[index - 1]
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+        if index <= window:
+            average_gain += gain
+            average_loss += loss
+            if index < window:
+                continue
+            average_gain /= window
+            average_loss /= window
+        else:
+            average_gain = ((window - 1) * average_gain + gain) / window
+            average_loss = ((window - 1) * average_loss + loss) / window
+
+        if average_gain == 0 and average_loss == 0:
+            output[index] = 50.0
+        elif average_loss == 0:
+            output[index] = 100.0
+        elif average_gain == 0:
+            output[index] = 0.0
+        else:
+            output[index] = 100 - (100 / (1 + average_gain / average_loss))
+    return output
+
+
+def _trailing_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the last ``window`` values (fewer at the start) at every index."""
+    output = np.empty(len(values))
+    head = min(window - 1, len(values))
+    output[:head] = np.cumsum(values[:head]) / np.arange(1, head + 1)
+    if len(values) >= window:
+        output[window - 1 :] = sliding_window_view(values, window).mean(axis=1)
+    return output
+
+
+def _trailing_deviation(values: np.ndarray, window: int) -> np.ndarray:
+    """Sample deviation of the trailing window, zero below two values."""
+    output = np.zeros(len(values))
+    for index in range(1, min(window - 1, len(values))):
+        output[index] = sample_deviation(values[None, : index + 1])[0]
+    if len(values) >= window:
+        output[window - 1 :] = sample_deviation(sliding_window_view(values, window))
+    return output
+
+
+def _trimmed_mean(recent: np.ndarray) -> np.ndarray:
+    ordered = np.sort(recent, axis=1)
+    if ordered.shape[1] >= 10:
+        trim = max(1, ordered.shape[1] // 10)
+        ordered = ordered[:, trim:-trim]
+    return ordered.mean(axis=1)
+
+
+def _trailing_trimmed_mean(values: np.ndarray, window: int) -> np.ndarray:
+    output = np.empty(len(values))
+    for index in range(min(window - 1, len(values))):
+        output[index] = _trimmed_mean(values[None, : index + 1])[0]
+    if len(values) >= window:
+        output[window - 1 :] = _trimmed_mean(sliding_window_view(values, window))
+    return output
+
+
+def _volume_ratio(volumes: list[float | None], length: int) -> np.ndarray:
+    aligned = np.full(length, np.nan)
+    observed = [np.nan if value is None else value for value in volumes[:length]]
+    aligned[: len(observed)] = np.asarray(observed, dtype=float)
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(aligned) & (aligned > 0)
+    compacted = aligned[valid]
+    counts = np.cumsum(valid)
+    output = np.full(length, np.nan)
+    if len(compacted) < MINIMUM_VOLUME_DAYS:
+        return output
+
+    ratios = _trailing_mean(compacted, VOLUME_SHORT_WINDOW) / _trailing_mean(
+        compacted,
+        VOLUME_LONG_WINDOW,
+    )
+    ready = counts >= MINIMUM_VOLUME_DAYS
+    output[ready] = ratios[counts[ready] - 1]
+    return output
+
+
+@dataclass(frozen=True)
+class IndicatorSeries:
+    """Daily indicator columns of one history.
+
+    Every column is computed once; the entry at an anchor only uses closes up
+    to that anchor, so it equals the indicator of the prefix ending there.
+    """
+
+    values: list[float]
+    ema20: list[float]
+    ema50: list[float]
+    macd_histogram: list[float]
+    rsi: list[float]
+    sma200: np.ndarray
+    bollinger_middle: np.ndarray
+    bollinger_deviation: np.ndarray
+    daily_volatility: np.ndarray
+    daily_drift: np.ndarray
+    volume_ratio: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def indicators(self, anchor: int) -> dict[str, float]:
+        middle = float(self.bollinger_middle[anchor])
+        deviation = float(self.bollinger_deviation[anchor])
+        return {
+            "price": self.values[anchor],
+            "ema20": self.ema20[anchor],
+            "ema50": self.ema50[anchor],
+            "sma200": float(self.sma200[anchor]),
+            "rsi": self.rsi[anchor],
+            "macd_histogram": self.macd_histogram[anchor],
+            "bollinger_middle": middle,
+            "bollinger_upper": middle + 2 * deviation,
+            "bollinger_lower": middle - 2 * deviation,
+        }
+
+    def lookback_change(self, anchor: int, days: int) -> float:
+        lookback = min(days, anchor)
+        return ((self.values[anchor] / self.values[anchor - lookback]) - 1) * 100
+
+    def volume_ratio_at(self, anchor: int) -> float | None:
+        ratio = float(self.volume_ratio[anchor])
+        return ratio if np.isfinite(ratio) else None
+
+
+def build_indicator_series(
+    values: list[float],
+    volumes: list[float | None] | None = None,
+) -> IndicatorSeries:
+    if not values:
+        raise ValueError("Nincsenek árfolyamadatok")
+
+    frame = feature_frame(values)
+    prices = frame.prices
+    ema12 = frame.column("ema_12").tolist()
+    ema26 = frame.column("ema_26").tolist()
+    macd = [fast - slow for fast, slow in zip(ema12, ema26)]
+    macd_signal = ema_series(macd, 9).tolist()
+    returns = prices[1:] / prices[:-1] - 1
+    return IndicatorSeries(
+        values=list(values),
+        ema20=frame.column("ema_20").tolist(),
+        ema50=frame.column("ema_50").tolist(),
+        macd_histogram=[line - signal for line, signal in zip(macd, macd_signal)],
+        rsi=_rsi(values),
+        sma200=_trailing_mean(prices, SMA_WINDOW),
+        bollinger_middle=_trailing_mean(prices, BOLLINGER_WINDOW),
+        bollinger_deviation=_trailing_deviation(prices, BOLLINGER_WINDOW),
+        daily_volatility=np.concatenate(
+            ([0.0], _trailing_deviation(returns, RETURN_WINDOW))
+        ),
+        daily_drift=np.concatenate(
+            ([0.0], _trailing_trimmed_mean(returns, RETURN_WINDOW))
+        ),
+        volume_ratio=_volume_ratio(volumes or [], len(values)),
+    )
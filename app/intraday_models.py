@@ -1,15 +1,31 @@
-from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from math import cos, isfinite, pi, sin, sqrt
 from statistics import mean, stdev
 from typing import Any
 
+import numpy as np
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.linear_model import HuberRegressor, Ridge
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+from app.cache import LRUCache, data_fingerprint
+from app.features import (
+    clamp,
+    ema_last,
+    feature_frame,
+    mean_rsi,
+    normalized_slope,
+    pct_returns,
+    return_pct,
+    sample_deviation,
+    trailing,
+    trailing_slope,
+    zscore,
+)
+from app.live_states import LIVE_STATES
+
 
 INTRADAY_LOOKBACK_HOURS = 721
 INTRADAY_HORIZON_HOURS = {1: 24, 7: 168}
@@ -17,6 +33,15 @@ INTRADAY_SAMPLE_STRIDE = {1: 3, 7: 6}
 SHRINKAGE_CANDIDATES = (0.25, 0.5, 0.75, 1.0)
 MODEL_CANDIDATES = ("huber", "ridge", "gradient_boosting")
 MAX_LIVE_CACHE_ENTRIES = 20
+MAX_FEATURE_MATRIX_ENTRIES = 8
+HOUR_MS = 3_600_000
+CANDLE_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+SHARED_COLUMNS = (
+    *(f"return_{hours}" for hours in (1, 3, 6, 12, 24, 72, 168, 336, 720)),
+    "rsi_14",
+    "rsi_24",
+    "high_168",
+)
 
 
 @dataclass(frozen=True)
@@ -156,11 +181,8 @@ class IntradayState:
     reason: str
 
 
-_LIVE_STATE_CACHE: OrderedDict[tuple[Any, ...], IntradayState] = OrderedDict()
-
-
-def _clamp(value: float, lower: float, upper: float) -> float:
-    return max(lower, min(upper, value))
+_LIVE_STATE_CACHE = LRUCache(MAX_LIVE_CACHE_ENTRIES)
+_FEATURE_MATRIX_CACHE = LRUCache(MAX_FEATURE_MATRIX_ENTRIES)
 
 
 def clean_intraday_candles(candles: list[dict[str, Any]]) -> list[dict[str, float]]:
@@ -186,55 +208,6 @@ def clean_intraday_candles(candles: list[dict[str, Any]]) -> list[dict[str, floa
     return [output[timestamp] for timestamp in sorted(output)]
 
 
-def _return_pct(values: list[float], hours: int) -> float:
-    return ((values[-1] / values[-hours - 1]) - 1) * 100
-
-
-def _returns(values: list[float]) -> list[float]:
-    return [((current / previous) - 1) * 100 for previous, current in zip(values, values[1:])]
-
-
-def _ema_last(values: list[float], span: int) -> float:
-    alpha = 2 / (span + 1)
-    result = values[0]
-    for value in values[1:]:
-        result = alpha * value + (1 - alpha) * result
-    return result
-
-
-def _rsi(values: list[float], window: int) -> float:
-    recent = _returns(values[-(window + 1) :])
-    gains = [max(value, 0.0) for value in recent]
-    losses = [max(-value, 0.0) for value in recent]
-    average_gain = mean(gains) if gains else 0.0
-    average_loss = mean(losses) if losses else 0.0
-    if average_gain == 0 and average_loss == 0:
-        return 50.0
-    if average_loss == 0:
-        return 100.0
-    return 100 - 100 / (1 + average_gain / average_loss)
-
-
-def _normalized_slope(values: list[float], window: int) -> float:
-    recent = values[-window:]
-    x_middle = (len(recent) - 1) / 2
-    y_middle = mean(recent)
-    denominator = sum((index - x_middle) ** 2 for index in range(len(recent)))
-    if denominator == 0 or y_middle == 0:
-        return 0.0
-    numerator = sum(
-        (index - x_middle) * (value - y_middle)
-        for index, value in enumerate(recent)
-    )
-    return numerator / denominator / y_middle * 100
-
-
-def _zscore(values: list[float], window: int) -> float:
-    recent = values[-window:]
-    deviation = stdev(recent) if len(recent) > 1 else 0.0
-    return (values[-1] - mean(recent)) / deviation if deviation else 0.0
-
-
 def build_intraday_feature_vector(
     candles: list[dict[str, float]],
 ) -> list[float]:
@@ -243,7 +216,7 @@ def build_intraday_feature_vector(
 
     recent = candles[-INTRADAY_LOOKBACK_HOURS:]
     closes = [item["close"] for item in recent]
-    hourly_returns = _returns(closes)
+    hourly_returns = pct_returns(closes)
     ranges = [
         (item["high"] - item["low"]) / item["open"] * 100
         for item in recent
@@ -262,31 +235,31 @@ def build_intraday_feature_vector(
     volume_168 = mean(volumes[-168:])
     previous_volume = mean(volumes[-48:-24])
     timestamp = datetime.fromtimestamp(recent[-1]["timestamp"] / 1000, timezone.utc)
-    ema12 = _ema_last(closes, 12)
-    ema48 = _ema_last(closes, 48)
-    ema168 = _ema_last(closes, 168)
+    ema12 = ema_last(closes, 12)
+    ema48 = ema_last(closes, 48)
+    ema168 = ema_last(closes, 168)
 
     return [
-        _return_pct(closes, 1),
-        _return_pct(closes, 3),
-        _return_pct(closes, 6),
-        _return_pct(closes, 12),
-        _return_pct(closes, 24),
-        _return_pct(closes, 72),
-        _return_pct(closes, 168),
-        _return_pct(closes, 336),
-        _return_pct(closes, 720),
+        return_pct(closes, 1),
+        return_pct(closes, 3),
+        return_pct(closes, 6),
+        return_pct(closes, 12),
+        return_pct(closes, 24),
+        return_pct(closes, 72),
+        return_pct(closes, 168),
+        return_pct(closes, 336),
+        return_pct(closes, 720),
         stdev(hourly_returns[-24:]) * sqrt(24),
         stdev(hourly_returns[-168:]) * sqrt(168),
-        _normalized_slope(closes, 24),
-        _normalized_slope(closes, 168),
-        _normalized_slope(closes, 720),
+        normalized_slope(closes, 24),
+        normalized_slope(closes, 168),
+        normalized_slope(closes, 720),
         ((ema12 / ema48) - 1) * 100,
         ((ema48 / ema168) - 1) * 100,
-        _rsi(closes, 14),
-        _rsi(closes, 24),
-        _zscore(closes, 24),
-        _zscore(closes, 168),
+        mean_rsi(closes, 14),
+        mean_rsi(closes, 24),
+        zscore(closes[-24:]),
+        zscore(closes[-168:]),
         ((closes[-1] / max(closes[-168:])) - 1) * 100,
         mean(ranges[-24:]),
         mean(ranges[-168:]),
@@ -303,6 +276,143 @@ def build_intraday_feature_vector(
     ]
 
 
+def _window_mean(values: np.ndarray, ends: np.ndarray, width: int) -> np.ndarray:
+    return trailing(values, ends, width).mean(axis=1)
+
+
+def _window_ema(closes: np.ndarray, origins: np.ndarray, span: int) -> np.ndarray:
+    """EMA seeded at the first close of each 721-hour feature window."""
+    alpha = 2 / (span + 1)
+    decay = 1 - alpha
+    running = np.empty(len(closes))
+    result = 0.0
+    for index, value in enumerate(closes.tolist()):
+        result = alpha * value + decay * result
+        running[index] = result
+    starts = origins - (INTRADAY_LOOKBACK_HOURS - 1)
+    carried = decay ** (INTRADAY_LOOKBACK_HOURS - 1)
+    return carried * closes[starts] + running[origins] - carried * running[starts]
+
+
+def _window_zscore(closes: np.ndarray, origins: np.ndarray, window: int) -> np.ndarray:
+    recent = trailing(closes, origins, window)
+    deviation = sample_deviation(recent)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            deviation > 0,
+            (closes[origins] - recent.mean(axis=1)) / deviation,
+            0.0,
+        )
+
+
+def build_intraday_feature_matrix(
+    candles: list[dict[str, float]],
+    origins: list[int],
+) -> np.ndarray:
+    """Feature rows of cleaned ``candles`` for each origin, column by column.
+
+    Row ``k`` equals ``build_intraday_feature_vector(candles[: origins[k] + 1])``
+    up to floating-point rounding, so any sampling stride shares one pass.
+    """
+    ends = np.asarray(origins, dtype=np.int64)
+    if not len(ends):
+        return np.empty((0, len(FEATURE_NAMES)))
+    if int(ends.min()) < INTRADAY_LOOKBACK_HOURS - 1 or int(ends.max()) >= len(candles):
+        raise ValueError("Legalább 721 órás gyertya szükséges az intraday modellhez.")
+
+    columns = np.array(
+        [[item[field] for field in CANDLE_FIELDS] for item in candles],
+        dtype=np.float64,
+    )
+    timestamps, opens, highs, lows, closes, volumes = columns.T
+    frame = feature_frame(closes)
+    shared = frame.select(SHARED_COLUMNS, ends)
+    current = closes[ends]
+    hourly_returns = (closes[1:] / closes[:-1] - 1) * 100
+    ranges = (highs - lows) / opens * 100
+    bodies = (closes - opens) / opens * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        close_locations = np.where(highs > lows, (closes - lows) / (highs - lows), 0.5)
+
+    ema12 = _window_ema(closes, ends, 12)
+    ema48 = _window_ema(closes, ends, 48)
+    ema168 = _window_ema(closes, ends, 168)
+    volume_24 = _window_mean(volumes, ends, 24)
+    volume_168 = _window_mean(volumes, ends, 168)
+    previous_volume = _window_mean(volumes, ends - 24, 24)
+    hours = np.floor(timestamps[ends] / HOUR_MS)
+    hour_angle = 2 * np.pi * (hours % 24) / 24
+    weekday_angle = 2 * np.pi * ((np.floor(hours / 24) + 3) % 7) / 7
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.column_stack(
+            [
+                shared["return_1"],
+                shared["return_3"],
+                shared["return_6"],
+                shared["return_12"],
+                shared["return_24"],
+                shared["return_72"],
+                shared["return_168"],
+                shared["return_336"],
+                shared["return_720"],
+                sample_deviation(trailing(hourly_returns, ends - 1, 24)) * sqrt(24),
+                sample_deviation(trailing(hourly_returns, ends - 1, 168)) * sqrt(168),
+                trailing_slope(closes, ends, 24),
+                trailing_slope(closes, ends, 168),
+                trailing_slope(closes, ends, 720),
+                (ema12 / ema48 - 1) * 100,
+                (ema48 / ema168 - 1) * 100,
+                shared["rsi_14"],
+                shared["rsi_24"],
+                _window_zscore(closes, ends, 24),
+                _window_zscore(closes, ends, 168),
+                (current / shared["high_168"] - 1) * 100,
+                _window_mean(ranges, ends, 24),
+                _window_mean(ranges, ends, 168),
+                _window_mean(bodies, ends, 24),
+                _window_mean(close_locations, ends, 24),
+                np.where(volume_168 > 0, volume_24 / volume_168, 1.0),
+                np.where(
+                    previous_volume > 0,
+                    (volume_24 / previous_volume - 1) * 100,
+                    0.0,
+                ),
+                np.sin(hour_angle),
+                np.cos(hour_angle),
+                np.sin(weekday_angle),
+                np.cos(weekday_angle),
+            ]
+        )
+
+
+def strided_intraday_features(
+    candles: list[dict[str, float]],
+    stride: int,
+) -> dict[int, list[float]]:
+    """Features of every ``stride``-th origin, shared by the direction and risk models.
+
+    The returned mapping is cached per candle set and stride and must not be
+    modified by callers.
+    """
+    key = data_fingerprint(
+        np.array(
+            [[item[field] for field in CANDLE_FIELDS] for item in candles],
+            dtype=np.float64,
+        ),
+        stride,
+    )
+    features = _FEATURE_MATRIX_CACHE.get(key)
+    if features is not None:
+        return features
+
+    origins = list(range(INTRADAY_LOOKBACK_HOURS - 1, len(candles), stride))
+    features = dict(
+        zip(origins, build_intraday_feature_matrix(candles, origins).tolist())
+    )
+    return _FEATURE_MATRIX_CACHE.put(key, features)
+
+
 def prepare_intraday_data(
     candles: list[dict[str, Any]],
     horizon_days: int,
@@ -312,12 +422,9 @@ def prepare_intraday_data(
     cleaned = clean_intraday_candles(candles)
     horizon_hours = INTRADAY_HORIZON_HOURS[horizon_days]
     stride = INTRADAY_SAMPLE_STRIDE[horizon_days]
-    features_by_origin = {}
+    features_by_origin = strided_intraday_features(cleaned, stride)
     targets_by_origin = {}
-    for origin in range(INTRADAY_LOOKBACK_HOURS - 1, len(cleaned), stride):
-        features_by_origin[origin] = build_intraday_feature_vector(
-            cleaned[: origin + 1]
-        )
+    for origin in features_by_origin:
         if origin + horizon_hours < len(cleaned):
             targets_by_origin[origin] = (
                 (cleaned[origin + horizon_hours]["close"] / cleaned[origin]["close"])
@@ -375,7 +482,7 @@ def _fit_estimator(estimator, features: list[list[float]], targets: list[float])
 
 
 def _predict(estimator, features: list[list[float]], limit: float) -> list[float]:
-    return [_clamp(float(value), -limit, limit) for value in estimator.predict(features)]
+    return [clamp(float(value), -limit, limit) for value in estimator.predict(features)]
 
 
 def _mae(actual: list[float], predicted: list[float]) -> float:
@@ -483,7 +590,7 @@ def train_intraday_specialist(
     features = prepared.features_by_origin
     actual = prepared.targets_by_origin
     clipped = {
-        origin: _clamp(actual[origin], -spec.target_clip, spec.target_clip)
+        origin: clamp(actual[origin], -spec.target_clip, spec.target_clip)
         for origin in origins
     }
     validation_actual = [actual[origin] for origin in validation]
@@ -650,16 +757,12 @@ def intraday_estimate_from_state(
     }
 
 
-def build_intraday_estimate(
-    candles: list[dict[str, Any]],
+def live_intraday_state(
+    closed: list[dict[str, float]],
     horizon_days: int,
     direction_threshold: float,
     cache_key: str = "",
-) -> dict[str, Any]:
-    cleaned = clean_intraday_candles(candles)
-    if len(cleaned) < INTRADAY_LOOKBACK_HOURS + 1:
-        raise ValueError("Nincs elegendő órás adat az intraday modellhez.")
-    closed = cleaned[:-1]
+) -> IntradayState:
     cache_signature = (
         cache_key,
         horizon_days,
@@ -667,18 +770,44 @@ def build_intraday_estimate(
         int(closed[-1]["timestamp"]),
         round(closed[-1]["close"], 8),
     )
-    state = _LIVE_STATE_CACHE.get(cache_signature)
-    if state is None:
-        prepared = prepare_intraday_data(closed, horizon_days)
-        state = train_intraday_specialist(
-            prepared,
-            known_through_origin=len(closed) - 1 - INTRADAY_HORIZON_HOURS[horizon_days],
-            direction_threshold=direction_threshold,
+
+    def train() -> IntradayState:
+        return _LIVE_STATE_CACHE.get_or_build(
+            cache_signature,
+            lambda: train_intraday_specialist(
+                prepare_intraday_data(closed, horizon_days),
+                known_through_origin=(
+                    len(closed) - 1 - INTRADAY_HORIZON_HOURS[horizon_days]
+                ),
+                direction_threshold=direction_threshold,
+            ),
         )
-        _LIVE_STATE_CACHE[cache_signature] = state
-        _LIVE_STATE_CACHE.move_to_end(cache_signature)
-        while len(_LIVE_STATE_CACHE) > MAX_LIVE_CACHE_ENTRIES:
-            _LIVE_STATE_CACHE.popitem(last=False)
+
+    return LIVE_STATES.resolve(
+        "intraday_direction",
+        cache_key,
+        horizon_days,
+        [item["close"] for item in closed],
+        data_fingerprint(*cache_signature),
+        train,
+    )
+
+
+def build_intraday_estimate(
+    candles: list[dict[str, Any]],
+    horizon_days: int,
+    direction_threshold: float,
+    cache_key: str = "",
+) -> dict[str, Any]:
+    cleaned = clean_intraday_candles(candles)
+    if len(cleaned) < INTRADAY_LOOKBACK_HOURS + 1:
+        raise ValueError("Nincs elegendő órás adat az intraday modellhez.")
+    state = live_intraday_state(
+        cleaned[:-1],
+        horizon_days,
+        direction_threshold,
+        cache_key,
+    )
     return intraday_estimate_from_state(
         state,
         build_intraday_feature_vector(cleaned),
@@ -699,11 +828,12 @@ def walk_forward_intraday_backtest(
     first_possible = INTRADAY_LOOKBACK_HOURS - 1
     anchors = list(range(last_anchor, first_possible - 1, -24))[:max_samples]
     anchors.reverse()
+    anchor_features = build_intraday_feature_matrix(cleaned, anchors).tolist()
     state = None
     last_refit = None
     results = []
 
-    for anchor in anchors:
+    for anchor, features in zip(anchors, anchor_features):
         if (
             state is None
             or last_refit is None
@@ -715,11 +845,7 @@ def walk_forward_intraday_backtest(
                 direction_threshold=direction_threshold,
             )
             last_refit = anchor
-        estimate = intraday_estimate_from_state(
-            state,
-            build_intraday_feature_vector(cleaned[: anchor + 1]),
-            horizon_days,
-        )
+        estimate = intraday_estimate_from_state(state, features, horizon_days)
         expected_change = float(estimate["prediction_pct"])
         actual_change = (
             (cleaned[anchor + horizon_hours]["close"] / cleaned[anchor]["close"])
@@ -1,19 +1,22 @@
-from collections import OrderedDict
 from dataclasses import dataclass
 from statistics import mean
 from typing import Any
 
 from sklearn.ensemble import GradientBoostingRegressor
 
+from app.cache import LRUCache, data_fingerprint
 from app.intraday_models import (
     FEATURE_LABELS,
     FEATURE_NAMES,
     INTRADAY_HORIZON_HOURS,
     INTRADAY_LOOKBACK_HOURS,
     PreparedIntradayData,
+    build_intraday_feature_matrix,
     build_intraday_feature_vector,
+    clean_intraday_candles,
     prepare_intraday_data,
 )
+from app.live_states import LIVE_STATES
 
 
 RISK_QUANTILE = 0.80
@@ -46,7 +49,7 @@ class IntradayRiskState:
     reason: str
 
 
-_LIVE_RISK_CACHE: OrderedDict[tuple[Any, ...], IntradayRiskState] = OrderedDict()
+_LIVE_RISK_CACHE = LRUCache(MAX_LIVE_CACHE_ENTRIES)
 
 
 def _quantile(values: list[float], probability: float) -> float:
@@ -337,39 +340,51 @@ def risk_estimate_from_state(
     }
 
 
-def build_intraday_risk_estimate(
-    candles: list[dict[str, Any]],
+def live_risk_state(
+    closed: list[dict[str, float]],
     horizon_days: int,
     cache_key: str = "",
-) -> dict[str, Any]:
-    prepared = prepare_intraday_data(candles[:-1], horizon_days)
-    if len(prepared.candles) < INTRADAY_LOOKBACK_HOURS:
-        raise ValueError("Nincs elegendő órás adat a kockázati modellhez.")
+) -> IntradayRiskState:
     cache_signature = (
         cache_key,
         horizon_days,
-        len(prepared.candles),
-        int(prepared.candles[-1]["timestamp"]),
-        round(prepared.candles[-1]["close"], 8),
+        len(closed),
+        int(closed[-1]["timestamp"]),
+        round(closed[-1]["close"], 8),
     )
-    state = _LIVE_RISK_CACHE.get(cache_signature)
-    if state is None:
-        state = train_intraday_risk(
-            prepared,
-            known_through_origin=(
-                len(prepared.candles)
-                - 1
-                - INTRADAY_HORIZON_HOURS[horizon_days]
+
+    def train() -> IntradayRiskState:
+        return _LIVE_RISK_CACHE.get_or_build(
+            cache_signature,
+            lambda: train_intraday_risk(
+                prepare_intraday_data(closed, horizon_days),
+                known_through_origin=(
+                    len(closed) - 1 - INTRADAY_HORIZON_HOURS[horizon_days]
+                ),
             ),
         )
-        _LIVE_RISK_CACHE[cache_signature] = state
-        _LIVE_RISK_CACHE.move_to_end(cache_signature)
-        while len(_LIVE_RISK_CACHE) > MAX_LIVE_CACHE_ENTRIES:
-            _LIVE_RISK_CACHE.popitem(last=False)
-    current_prepared = prepare_intraday_data(candles, horizon_days)
+
+    return LIVE_STATES.resolve(
+        "intraday_risk",
+        cache_key,
+        horizon_days,
+        [item["close"] for item in closed],
+        data_fingerprint(*cache_signature),
+        train,
+    )
+
+
+def build_intraday_risk_estimate(
+    candles: list[dict[str, Any]],
+    horizon_days: int,
+    cache_key: str = "",
+) -> dict[str, Any]:
+    cleaned = clean_intraday_candles(candles)
+    if len(cleaned) < INTRADAY_LOOKBACK_HOURS + 1:
+        raise ValueError("Nincs elegendő órás adat a kockázati modellhez.")
     return risk_estimate_from_state(
-        state,
-        build_intraday_feature_vector(current_prepared.candles),
+        live_risk_state(cleaned[:-1], horizon_days, cache_key),
+        build_intraday_feature_vector(cleaned),
     )
 
 
@@ -385,11 +400,12 @@ def walk_forward_intraday_risk(
         range(last_anchor, INTRADAY_LOOKBACK_HOURS - 2, -24)
     )[:max_samples]
     anchors.reverse()
+    anchor_features = build_intraday_feature_matrix(prepared.candles, anchors).tolist()
     state = None
     last_refit = None
     results = []
 
-    for anchor in anchors:
+    for anchor, features in zip(anchors, anchor_features):
         if (
             state is None
             or last_refit is None
@@ -400,10 +416,7 @@ def walk_forward_intraday_risk(
                 known_through_origin=anchor - horizon_hours,
             )
             last_refit = anchor
-        estimate = risk_estimate_from_state(
-            state,
-            build_intraday_feature_vector(prepared.candles[: anchor + 1]),
-        )
+        estimate = risk_estimate_from_state(state, features)
         actual_range = abs(
             (
                 prepared.candles[anchor + horizon_hours]["close"]
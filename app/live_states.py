@@ -0,0 +1,193 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+from time import time
+from typing import Any, Callable, Sequence
+
+from app.model_state_store import ModelStateStore
+
+
+MAX_STALE_CLOSES = 3
+
+# Set while the training scheduler (or the snapshot collector) builds a state,
+# so those callers always train instead of being served the previous state.
+REFRESHING: ContextVar[bool] = ContextVar("live_state_refreshing", default=False)
+
+
+@dataclass(frozen=True)
+class ReadyState:
+    signature: str
+    state: Any
+    length: int
+    last_value: float
+    trained_at: float
+    source: str
+
+
+def closes_since(ready: ReadyState, closed_values: Sequence[float]) -> int | None:
+    """Closes the history gained after ``ready`` was fitted, if it continues it.
+
+    A capped history slides forward instead of growing, so the fitted
+    window is found by its last close among the newest closes rather than
+    by its length.
+    """
+    length = len(closed_values)
+    for closes in range(min(MAX_STALE_CLOSES, length - 1) + 1):
+        if (
+            length - closes <= ready.length <= length
+            and closed_values[-(closes + 1)] == ready.last_value
+        ):
+            return closes
+    return None
+
+
+class LiveStateRegistry:
+    """Latest trained state per model family, asset key and horizon.
+
+    Requests that carry an asset key look their state up here. Once the
+    background scheduler is running, a request whose history only gained a
+    few closes since the last fit (or whose capped window slid forward by a
+    few closes) is answered from the previous state and
+    the slot is marked stale for the scheduler; it never trains inline.
+    With a store attached, fitted states survive restarts.
+    """
+
+    def __init__(self):
+        self._states: dict[tuple[str, str, int], ReadyState] = {}
+        self._stale: set[tuple[str, str, int]] = set()
+        self._lock = Lock()
+        self.background = False
+        self.store: ModelStateStore | None = None
+
+    def _load_stored(self, slot: tuple[str, str, int]) -> ReadyState | None:
+        if self.store is None:
+            return None
+        try:
+            stored = self.store.latest(*slot)
+        except Exception:
+            return None
+        if stored is None:
+            return None
+        ready = ReadyState(
+            signature=stored.fingerprint,
+            state=stored.state,
+            length=stored.history_length,
+            last_value=stored.last_value,
+            trained_at=datetime.fromisoformat(stored.created_at).timestamp(),
+            source="store",
+        )
+        with self._lock:
+            self._states.setdefault(slot, ready)
+            return self._states[slot]
+
+    def _save(self, slot: tuple[str, str, int], ready: ReadyState) -> None:
+        if self.store is None:
+            return
+        try:
+            self.store.save(
+                *slot,
+                ready.signature,
+                ready.state,
+                ready.length,
+                ready.last_value,
+            )
+        except Exception:
+            # A fitted state stays usable in memory when the store is down.
+            pass
+
+    def resolve(
+        self,
+        family: str,
+        key: str,
+        horizon_days: int,
+        closed_values: Sequence[float],
+        signature: str,
+        train: Callable[[], Any],
+    ) -> Any:
+        if not key or not closed_values:
+            return train()
+
+        slot = (family, key, horizon_days)
+        with self._lock:
+            ready = self._states.get(slot)
+        if ready is None:
+            ready = self._load_stored(slot)
+        if ready is not None and ready.signature == signature:
+            if REFRESHING.get():
+                with self._lock:
+                    self._stale.discard(slot)
+            return ready.state
+        if (
+            ready is not None
+            and self.background
+            and not REFRESHING.get()
+            and closes_since(ready, closed_values) not in (None, 0)
+        ):
+            with self._lock:
+                self._stale.add(slot)
+            return ready.state
+
+        started = time()
+        state = train()
+        trained = ReadyState(
+            signature=signature,
+            state=state,
+            length=len(closed_values),
+            last_value=float(closed_values[-1]),
+            trained_at=time(),
+            source="trained",
+        )
+        with self._lock:
+            current = self._states.get(slot)
+            # A fit that started before the current state was published only
+            # replaces it when its history continues the current one.
+            published = (
+                current is None
+                or current.trained_at <= started
+                or closes_since(current, closed_values) is not None
+            )
+            if published:
+                self._states[slot] = trained
+                self._stale.discard(slot)
+        if published:
+            self._save(slot, trained)
+        return state
+
+    def stale_slots(self) -> set[tuple[str, str, int]]:
+        with self._lock:
+            return set(self._stale)
+
+    def describe(self, key: str | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._states.items())
+            stale = set(self._stale)
+        return [
+            {
+                "family": family,
+                "asset": asset,
+                "horizon_days": horizon_days,
+                "fingerprint": ready.signature,
+                "history_length": ready.length,
+                "trained_at": datetime.fromtimestamp(
+                    ready.trained_at,
+                    timezone.utc,
+                ).isoformat(),
+                "source": ready.source,
+                "stale": (family, asset, horizon_days) in stale,
+            }
+            for (family, asset, horizon_days), ready in items
+            if key is None or asset == key
+        ]
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            trained_at = [ready.trained_at for ready in self._states.values()]
+            return {
+                "states": len(self._states),
+                "stale": len(self._stale),
+                "last_trained_at": max(trained_at) if trained_at else None,
+            }
+
+
+LIVE_STATES = LiveStateRegistry()
@@ -1,16 +1,18 @@
 import asyncio
+from bisect import bisect_left
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from time import monotonic
-from typing import Any
+from typing import Any, Awaitable, Callable
 from urllib.parse import urlencode
 
 import httpx2
 
 from app.assets import ANALYSIS_ASSETS
 from app.cache import AsyncTTLCache
+from app.candle_store import Candle, CandleStore, FundingRate
 from app.config import settings
-from app.derivatives import normalize_derivatives
+from app.derivatives import DAY_MS, normalize_derivatives
 from app.news import MAX_FEED_BYTES, merge_articles, parse_rss_feed
 
 
@@ -20,6 +22,82 @@ class UpstreamServiceError(RuntimeError):
         self.service = service
 
 
+HYPERLIQUID_INTERVAL_MS = {"1h": 3_600_000, "1d": 86_400_000}
+CANDLE_BUFFER_LIMITS = {"1d": 2000, "1h": 10_000}
+
+
+def _kline_candles(rows_by_timestamp: dict[int, list[Any]]) -> list[Candle]:
+    candles = []
+    for timestamp, row in sorted(rows_by_timestamp.items()):
+        try:
+            candles.append(
+                (
+                    timestamp,
+                    float(row[1]),
+                    float(row[2]),
+                    float(row[3]),
+                    float(row[4]),
+                    float(row[7]),
+                )
+            )
+        except (TypeError, ValueError):
+            continue
+    return candles
+
+
+def _hyperliquid_candle_rows(rows: list[dict[str, Any]]) -> list[Candle]:
+    candles = []
+    for row in rows:
+        try:
+            close = float(row["c"])
+            candles.append(
+                (
+                    int(row["t"]),
+                    float(row["o"]),
+                    float(row["h"]),
+                    float(row["l"]),
+                    close,
+                    float(row.get("v", 0.0)) * close,
+                )
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return candles
+
+
+def _candle_dicts(candles: list[Candle]) -> list[dict[str, Any]]:
+    return [
+        {
+            "timestamp": timestamp,
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": max(volume, 0.0),
+        }
+        for timestamp, open_price, high, low, close, volume in candles
+        if min(open_price, high, low, close) > 0
+    ]
+
+
+def history_data_version(symbol: str, history: dict[str, Any]) -> str:
+    """Compact ID of a history's closed rows: source, symbol, last close, count."""
+    prices = history.get("prices", [])
+    funding = history.get("funding_rates", [])
+    last_closed = prices[-2][0] if len(prices) >= 2 else 0
+    # Funding settled during the open candle does not reach the models yet.
+    closed_funding = bisect_left(
+        funding,
+        prices[-1][0] if prices else 0,
+        key=lambda row: row[0],
+    )
+    last_funding = funding[closed_funding - 1][0] if closed_funding else 0
+    return (
+        f"{history.get('source', '')}:{symbol}:{last_closed}:{len(prices)}:"
+        f"{last_funding}:{closed_funding}"
+    )
+
+
 class MarketDataService:
     UPSTREAM_RETRY_SECONDS = 300
     COINGECKO_URL = "https://api.coingecko.com/api/v3"
@@ -46,11 +124,27 @@ class MarketDataService:
         for coin_id, metadata in ANALYSIS_ASSETS.items()
     }
     FUTURES_CATALOG_SYMBOLS = {"HYPE"}
+    _candle_store: CandleStore | None = None
 
-    def __init__(self):
+    def __init__(self, candle_store: CandleStore | None = None):
         self._client: httpx2.AsyncClient | None = None
-        self._cache = AsyncTTLCache(settings.stale_cache_seconds)
+        self._cache = AsyncTTLCache(
+            settings.stale_cache_seconds,
+            serve_stale=settings.cache_serve_stale,
+            refresh_ahead_seconds=settings.cache_refresh_ahead_seconds,
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_mb * 1024 * 1024,
+        )
         self._upstream_retry_at: dict[str, float] = {}
+        self._candle_store = candle_store
+        self._candle_series: dict[
+            tuple[str, str, str],
+            tuple[list[Candle], int | None],
+        ] = {}
+        self._funding_series: dict[
+            str,
+            tuple[list[FundingRate], int | None],
+        ] = {}
 
     def _ensure_upstream_available(self, service: str) -> None:
         if self._upstream_retry_at.get(service, 0) > monotonic():
@@ -71,7 +165,11 @@ class MarketDataService:
             headers={"User-Agent": "CryptoVision/2.0"},
         )
 
+    def cache_stats(self) -> dict[str, Any]:
+        return self._cache.stats()
+
     async def close(self) -> None:
+        await self._cache.close()
         if self._client:
             await self._client.aclose()
             self._client = None
@@ -373,15 +471,17 @@ class MarketDataService:
         symbol: str,
         interval: str,
         points: int,
+        start_time: int | None = None,
     ) -> list[dict[str, Any]]:
-        interval_ms = {"1h": 3_600_000, "1d": 86_400_000}.get(interval)
+        interval_ms = HYPERLIQUID_INTERVAL_MS.get(interval)
         if interval_ms is None:
             raise UpstreamServiceError("Hyperliquid", "Unsupported candle interval")
         requested_points = min(max(points, 1), 5000)
         now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
         cache_bucket_ms = max(settings.chart_cache_seconds * 1000, 60_000)
         end_time = now_ms - now_ms % cache_bucket_ms
-        start_time = end_time - (requested_points + 2) * interval_ms
+        if start_time is None:
+            start_time = end_time - (requested_points + 2) * interval_ms
         data = await self._post_json(
             "Hyperliquid",
             self.HYPERLIQUID_INFO_URL,
@@ -401,26 +501,48 @@ class MarketDataService:
         rows = [row for row in data if isinstance(row, dict)]
         return sorted(rows, key=lambda row: int(row.get("t", 0)))[-requested_points:]
 
+    async def _hyperliquid_series(
+        self,
+        symbol: str,
+        interval: str,
+        points: int,
+    ) -> list[Candle]:
+        async def backfill() -> tuple[list[Candle], bool]:
+            rows = await self._hyperliquid_candles(symbol, interval, points)
+            return _hyperliquid_candle_rows(rows), len(rows) < min(points, 5000)
+
+        async def top_up(start_time: int) -> list[Candle]:
+            rows = await self._hyperliquid_candles(
+                symbol,
+                interval,
+                5000,
+                start_time=start_time,
+            )
+            return _hyperliquid_candle_rows(rows)
+
+        return await self._stored_candles(
+            "Hyperliquid",
+            symbol,
+            interval,
+            points,
+            backfill,
+            top_up,
+        )
+
     async def _hyperliquid_history(
         self,
         symbol: str,
         days: int,
     ) -> dict[str, Any]:
         requested_days = min(max(days, 61), 2000)
-        rows = await self._hyperliquid_candles(symbol, "1d", requested_days)
+        candles = await self._hyperliquid_series(symbol, "1d", requested_days)
         prices = []
         volumes = []
-        for row in rows:
-            try:
-                timestamp = int(row["t"])
-                close = float(row["c"])
-                base_volume = float(row.get("v", 0.0))
-            except (KeyError, TypeError, ValueError):
-                continue
+        for timestamp, _open, _high, _low, close, quote_volume in candles:
             if close <= 0:
                 continue
             prices.append([timestamp, close])
-            volumes.append([timestamp, max(base_volume * close, 0.0)])
+            volumes.append([timestamp, max(quote_volume, 0.0)])
         if len(prices) < 61:
             raise UpstreamServiceError("Hyperliquid", "Not enough historical data")
         return {
@@ -435,30 +557,9 @@ class MarketDataService:
         hours: int,
     ) -> dict[str, Any]:
         requested_hours = min(max(hours, 720), 5000)
-        rows = await self._hyperliquid_candles(symbol, "1h", requested_hours)
-        candles = []
-        for row in rows:
-            try:
-                timestamp = int(row["t"])
-                open_price = float(row["o"])
-                high = float(row["h"])
-                low = float(row["l"])
-                close = float(row["c"])
-                base_volume = float(row.get("v", 0.0))
-            except (KeyError, TypeError, ValueError):
-                continue
-            if min(open_price, high, low, close) <= 0:
-                continue
-            candles.append(
-                {
-                    "timestamp": timestamp,
-                    "open": open_price,
-                    "high": high,
-                    "low": low,
-                    "close": close,
-                    "volume": max(base_volume * close, 0.0),
-                }
-            )
+        candles = _candle_dicts(
+            await self._hyperliquid_series(symbol, "1h", requested_hours)
+        )
         if len(candles) < 720:
             raise UpstreamServiceError("Hyperliquid", "Not enough hourly data")
         return {
@@ -480,17 +581,23 @@ class MarketDataService:
             "Binance (USDT)",
         )
 
-    async def _binance_history(self, symbol: str, days: int) -> dict[str, Any]:
-        requested_days = min(max(days, 61), 2000)
-        service_name, kline_url, source_label = self._binance_kline_config(symbol)
-        candles: dict[int, list[Any]] = {}
+    async def _binance_kline_pages(
+        self,
+        service_name: str,
+        kline_url: str,
+        symbol: str,
+        interval: str,
+        count: int,
+    ) -> tuple[dict[int, list[Any]], bool]:
+        rows_by_timestamp: dict[int, list[Any]] = {}
         end_time = None
+        exhausted = False
 
-        while len(candles) < requested_days:
-            remaining = requested_days - len(candles)
+        while len(rows_by_timestamp) < count:
+            remaining = count - len(rows_by_timestamp)
             params: dict[str, Any] = {
                 "symbol": f"{symbol}USDT",
-                "interval": "1d",
+                "interval": interval,
                 "limit": min(remaining, 1000),
             }
             if end_time is not None:
@@ -502,24 +609,151 @@ class MarketDataService:
                 settings.chart_cache_seconds,
             )
             if not isinstance(rows, list) or not rows:
+                exhausted = True
                 break
             valid_rows = [row for row in rows if isinstance(row, list) and len(row) >= 8]
             if not valid_rows:
+                exhausted = True
                 break
             for row in valid_rows:
-                candles[int(row[0])] = row
+                rows_by_timestamp[int(row[0])] = row
             end_time = min(int(row[0]) for row in valid_rows) - 1
             if len(valid_rows) < params["limit"]:
+                exhausted = True
                 break
+        return rows_by_timestamp, exhausted
+
+    async def _binance_kline_top_up(
+        self,
+        service_name: str,
+        kline_url: str,
+        symbol: str,
+        interval: str,
+        start_time: int,
+    ) -> dict[int, list[Any]]:
+        rows_by_timestamp: dict[int, list[Any]] = {}
+        cursor = start_time
+        while True:
+            params: dict[str, Any] = {
+                "symbol": f"{symbol}USDT",
+                "interval": interval,
+                "startTime": cursor,
+                "limit": 1000,
+            }
+            rows = await self._get_json(
+                service_name,
+                kline_url,
+                params,
+                settings.chart_cache_seconds,
+            )
+            if not isinstance(rows, list):
+                raise UpstreamServiceError(service_name, "Unexpected kline response")
+            valid_rows = [row for row in rows if isinstance(row, list) and len(row) >= 8]
+            for row in valid_rows:
+                rows_by_timestamp[int(row[0])] = row
+            if len(valid_rows) < params["limit"]:
+                return rows_by_timestamp
+            cursor = max(int(row[0]) for row in valid_rows) + 1
+
+    async def _stored_candles(
+        self,
+        source: str,
+        symbol: str,
+        interval: str,
+        count: int,
+        backfill: Callable[[], Awaitable[tuple[list[Candle], bool]]],
+        top_up: Callable[[int], Awaitable[list[Candle]]],
+    ) -> list[Candle]:
+        store = self._candle_store
+        if store is None:
+            candles, _exhausted = await backfill()
+            return candles[-count:]
+
+        key = (source, symbol, interval)
+        series = self._candle_series.get(key)
+        if series is None:
+            stored, history_start = await asyncio.gather(
+                asyncio.to_thread(store.candles, source, symbol, interval, count),
+                asyncio.to_thread(store.history_start, source, symbol, interval),
+            )
+            series = (stored, history_start)
+        stored, history_start = series
+        covered = bool(stored) and (
+            len(stored) >= count
+            or (history_start is not None and stored[0][0] <= history_start)
+        )
+
+        new_history_start = None
+        if covered:
+            # Only the last stored candle can still be open; refetch it together
+            # with everything that closed after it.
+            fresh = await top_up(stored[-1][0])
+        else:
+            fresh, exhausted = await backfill()
+            if exhausted and fresh:
+                new_history_start = history_start = fresh[0][0]
+
+        if fresh or new_history_start is not None:
+            await asyncio.to_thread(
+                store.upsert,
+                source,
+                symbol,
+                interval,
+                fresh,
+                new_history_start,
+            )
+        merged = {candle[0]: candle for candle in stored}
+        merged.update((candle[0], candle) for candle in fresh)
+        limit = CANDLE_BUFFER_LIMITS.get(interval, count)
+        candles = [merged[timestamp] for timestamp in sorted(merged)][-max(limit, count):]
+        self._candle_series[key] = (candles, history_start)
+        return candles[-count:]
+
+    async def _binance_candles(
+        self,
+        symbol: str,
+        interval: str,
+        count: int,
+    ) -> list[Candle]:
+        service_name, kline_url, _source_label = self._binance_kline_config(symbol)
+
+        async def backfill() -> tuple[list[Candle], bool]:
+            rows, exhausted = await self._binance_kline_pages(
+                service_name,
+                kline_url,
+                symbol,
+                interval,
+                count,
+            )
+            return _kline_candles(rows), exhausted
+
+        async def top_up(start_time: int) -> list[Candle]:
+            rows = await self._binance_kline_top_up(
+                service_name,
+                kline_url,
+                symbol,
+                interval,
+                start_time,
+            )
+            return _kline_candles(rows)
+
+        return await self._stored_candles(
+            service_name,
+            f"{symbol}USDT",
+            interval,
+            count,
+            backfill,
+            top_up,
+        )
+
+    async def _binance_history(self, symbol: str, days: int) -> dict[str, Any]:
+        requested_days = min(max(days, 61), 2000)
+        service_name, _kline_url, source_label = self._binance_kline_config(symbol)
+        candles = await self._binance_candles(symbol, "1d", requested_days)
 
         prices = []
         volumes = []
-        for timestamp, row in sorted(candles.items())[-requested_days:]:
-            try:
-                close = float(row[4])
-                quote_volume = float(row[7])
-            except (TypeError, ValueError):
-                continue
+        for timestamp, _open, _high, _low, close, quote_volume in candles:
             if close <= 0:
                 continue
             prices.append([timestamp, close])
@@ -539,59 +773,10 @@ class MarketDataService:
         hours: int,
     ) -> dict[str, Any]:
         requested_hours = min(max(hours, 720), 10_000)
-        service_name, kline_url, source_label = self._binance_kline_config(symbol)
-        rows_by_timestamp: dict[int, list[Any]] = {}
-        end_time = None
-
-        while len(rows_by_timestamp) < requested_hours:
-            remaining = requested_hours - len(rows_by_timestamp)
-            params: dict[str, Any] = {
-                "symbol": f"{symbol}USDT",
-                "interval": "1h",
-                "limit": min(remaining, 1000),
-            }
-            if end_time is not None:
-                params["endTime"] = end_time
-            rows = await self._get_json(
-                service_name,
-                kline_url,
-                params,
-                settings.chart_cache_seconds,
-            )
-            if not isinstance(rows, list) or not rows:
-                break
-            valid_rows = [row for row in rows if isinstance(row, list) and len(row) >= 8]
-            if not valid_rows:
-                break
-            for row in valid_rows:
-                rows_by_timestamp[int(row[0])] = row
-            end_time = min(int(row[0]) for row in valid_rows) - 1
-            if len(valid_rows) < params["limit"]:
-                break
-
-        candles = []
-        for timestamp, row in sorted(rows_by_timestamp.items())[-requested_hours:]:
-            try:
-                open_price = float(row[1])
-                high = float(row[2])
-                low = float(row[3])
-                close = float(row[4])
-                quote_volume = float(row[7])
-            except (TypeError, ValueError):
-                continue
-            if min(open_price, high, low, close) <= 0:
-                continue
-            candles.append(
-                {
-                    "timestamp": timestamp,
-                    "open": open_price,
-                    "high": high,
-                    "low": low,
-                    "close": close,
-                    "volume": max(quote_volume, 0.0),
-                }
-            )
-
+        service_name, _kline_url, source_label = self._binance_kline_config(symbol)
+        candles = _candle_dicts(
+            await self._binance_candles(symbol, "1h", requested_hours)
+        )
         if len(candles) < 720:
             raise UpstreamServiceError(
                 service_name,
@@ -603,27 +788,28 @@ class MarketDataService:
             "interval": "1h",
         }
 
-    async def _binance_funding_history(
+    async def _binance_funding_pages(
         self,
         symbol: str,
-        days: int,
-    ) -> list[dict[str, Any]]:
-        requested_days = min(max(days, 30), 2000)
-        now = datetime.now(timezone.utc)
-        cursor = int((now - timedelta(days=requested_days)).timestamp() * 1000)
-        end_time = int(now.timestamp() * 1000)
-        rows_by_timestamp: dict[int, dict[str, Any]] = {}
-
-        while cursor <= end_time and len(rows_by_timestamp) < requested_days * 4:
+        start_time: int,
+        end_time: int | None,
+        max_rows: int,
+    ) -> list[FundingRate]:
+        rates: dict[int, float] = {}
+        cursor = start_time
+
+        while (end_time is None or cursor <= end_time) and len(rates) < max_rows:
+            params: dict[str, Any] = {
+                "symbol": f"{symbol}USDT",
+                "startTime": cursor,
+                "limit": 1000,
+            }
+            if end_time is not None:
+                params["endTime"] = end_time
             rows = await self._get_json(
                 "Binance Futures",
                 f"{self.BINANCE_FUTURES_URL}/fapi/v1/fundingRate",
-                {
-                    "symbol": f"{symbol}USDT",
-                    "startTime": cursor,
-                    "endTime": end_time,
-                    "limit": 1000,
-                },
+                params,
                 settings.chart_cache_seconds,
             )
             if not isinstance(rows, list) or not rows:
@@ -636,13 +822,103 @@ class MarketDataService:
             if not valid_rows:
                 break
             for row in valid_rows:
-                rows_by_timestamp[int(row["fundingTime"])] = row
+                try:
+                    rates[int(row["fundingTime"])] = float(row.get("fundingRate"))
+                except (TypeError, ValueError):
+                    continue
             next_cursor = max(int(row["fundingTime"]) for row in valid_rows) + 1
             if next_cursor <= cursor or len(valid_rows) < 1000:
                 break
             cursor = next_cursor
 
-        return [rows_by_timestamp[key] for key in sorted(rows_by_timestamp)]
+        return sorted(rates.items())
+
+    async def _binance_funding_history(
+        self,
+        symbol: str,
+        days: int,
+    ) -> list[dict[str, Any]]:
+        requested_days = min(max(days, 30), 2000)
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        # Bucketed bounds keep the upstream cache key stable between refreshes.
+        cache_bucket_ms = max(settings.chart_cache_seconds * 1000, 60_000)
+        end_time = now_ms - now_ms % cache_bucket_ms
+        window_start = end_time - requested_days * DAY_MS
+        max_rows = requested_days * 4
+        pair = f"{symbol}USDT"
+        store = self._candle_store
+
+        if store is None:
+            rates = await self._binance_funding_pages(
+                symbol,
+                window_start,
+                end_time,
+                max_rows,
+            )
+        else:
+            ledger = self._funding_series.get(pair)
+            if ledger is None:
+                ledger = await asyncio.gather(
+                    asyncio.to_thread(store.funding_rates, pair, window_start),
+                    asyncio.to_thread(
+                        store.history_start,
+                        "Binance Futures",
+                        pair,
+                        "funding",
+                    ),
+                )
+            stored, history_start = ledger
+            covered = bool(stored) and (
+                stored[0][0] <= window_start + DAY_MS
+                or (history_start is not None and stored[0][0] <= history_start)
+            )
+            if covered:
+                # The cursor only moves when a new funding interval settles,
+                # so repeated top-ups hit the cached upstream response.
+                fresh = await self._binance_funding_pages(
+                    symbol,
+                    stored[-1][0] + 1,
+                    None,
+                    max_rows,
+                )
+            else:
+                fresh = await self._binance_funding_pages(
+                    symbol,
+                    window_start,
+                    end_time,
+                    max_rows,
+                )
+                if fresh and fresh[0][0] > window_start + DAY_MS:
+                    history_start = fresh[0][0]
+                    await asyncio.to_thread(
+                        store.upsert,
+                        "Binance Futures",
+                        pair,
+                        "funding",
+                        [],
+                        history_start,
+                    )
+            if fresh:
+                await asyncio.to_thread(store.upsert_funding_rates, pair, fresh)
+            merged = dict(stored)
+            merged.update(fresh)
+            retained_since = end_time - 2000 * DAY_MS
+            rates = [
+                (funding_time, rate)
+                for funding_time, rate in sorted(merged.items())
+                if funding_time >= retained_since
+            ]
+            self._funding_series[pair] = (rates, history_start)
+            rates = [
+                (funding_time, rate)
+                for funding_time, rate in rates
+                if funding_time >= window_start
+            ]
+
+        return [
+            {"symbol": pair, "fundingTime": funding_time, "fundingRate": rate}
+            for funding_time, rate in rates
+        ]
 
     async def _binance_derivatives_history(
         self,
@@ -773,21 +1049,22 @@ class MarketDataService:
                 derivatives["snapshot"]["reason"] = (
                     "A futures adatforrás átmenetileg nem érhető el."
                 )
-            return {
+            history = {
                 **history,
                 "funding_rates": derivatives.get("funding_rates", []),
                 "derivatives": derivatives.get("snapshot", {}),
             }
         except UpstreamServiceError:
-            if settings.cryptocompare_api_key:
-                return await self._cryptocompare_history(symbol, days)
-            raise
+            if not settings.cryptocompare_api_key:
+                raise
+            history = await self._cryptocompare_history(symbol, days)
+        return {**history, "data_version": history_data_version(symbol, history)}
 
     async def derivatives_snapshot(self, coin: str) -> dict[str, Any]:
         symbol = self.FORECAST_SYMBOLS.get(coin)
         if symbol is None:
             raise UpstreamServiceError("Binance Futures", "Unsupported forecast symbol")
-        payload = await self._binance_derivatives_history(symbol, days=2000)
+        payload = await self._binance_derivatives_history(symbol, days=30)
         return payload["snapshot"]
 
     async def forecast_intraday_history(
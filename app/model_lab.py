@@ -6,10 +6,9 @@ from app.intraday_models import (
     build_intraday_feature_vector,
     clean_intraday_candles,
     intraday_estimate_from_state,
-    prepare_intraday_data,
-    train_intraday_specialist,
+    live_intraday_state,
 )
-from app.intraday_risk import risk_estimate_from_state, train_intraday_risk
+from app.intraday_risk import live_risk_state, risk_estimate_from_state
 
 
 MODEL_LAB_VERSION = "1.0.0"
@@ -19,6 +18,7 @@ def build_model_lab(
     candles: list[dict[str, Any]],
     horizon_days: int,
     direction_threshold: float,
+    cache_key: str = "",
 ) -> dict[str, Any]:
     if horizon_days not in INTRADAY_HORIZON_HOURS:
         raise ValueError("Az órás modelllabor csak 1 vagy 7 napos időtávhoz érhető el.")
@@ -28,20 +28,14 @@ def build_model_lab(
         raise ValueError("Nincs elegendő órás adat a modelllaborhoz.")
 
     closed = cleaned[:-1]
-    prepared = prepare_intraday_data(closed, horizon_days)
-    known_through = (
-        len(closed) - 1 - INTRADAY_HORIZON_HOURS[horizon_days]
-    )
     current_features = build_intraday_feature_vector(cleaned)
-    direction_state = train_intraday_specialist(
-        prepared,
-        known_through_origin=known_through,
-        direction_threshold=direction_threshold,
-    )
-    risk_state = train_intraday_risk(
-        prepared,
-        known_through_origin=known_through,
+    direction_state = live_intraday_state(
+        closed,
+        horizon_days,
+        direction_threshold,
+        cache_key,
     )
+    risk_state = live_risk_state(closed, horizon_days, cache_key)
     direction = intraday_estimate_from_state(
         direction_state,
         current_features,
@@ -66,3 +60,25 @@ def build_model_lab(
             "időblokkon is stabil előnyt követel."
         ),
     }
+
+
+def refit_intraday_state(
+    family: str,
+    candles: list[dict[str, Any]],
+    horizon_days: int,
+    direction_threshold: float,
+    cache_key: str = "",
+) -> Any:
+    """Live state of one hourly model family, on the candles the lab reads."""
+    if horizon_days not in INTRADAY_HORIZON_HOURS:
+        raise ValueError("Az órás modelllabor csak 1 vagy 7 napos időtávhoz érhető el.")
+
+    cleaned = clean_intraday_candles(candles)
+    if len(cleaned) < INTRADAY_LOOKBACK_HOURS + 1:
+        raise ValueError("Nincs elegendő órás adat a modelllaborhoz.")
+    closed = cleaned[:-1]
+    if family == "intraday_direction":
+        return live_intraday_state(closed, horizon_days, direction_threshold, cache_key)
+    if family == "intraday_risk":
+        return live_risk_state(closed, horizon_days, cache_key)
+    raise ValueError(f"Ismeretlen órás modellcsalád: {family}")
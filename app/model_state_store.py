@@ -0,0 +1,152 @@
+import pickle
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import sklearn
+
+from app.database import SqlStore
+
+
+KEEP_STATES_PER_SLOT = 2
+# Bump when the pickled state classes change shape.
+STATE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class StoredState:
+    fingerprint: str
+    state: Any
+    history_length: int
+    last_value: float
+    created_at: str
+
+
+class ModelStateStore(SqlStore):
+    """Pickled live model states keyed by model version, slot and data fingerprint.
+
+    The stored version also names the state format and the scikit-learn
+    release, so states pickled by other code are never unpickled.
+    """
+
+    def __init__(
+        self,
+        database_path: str | Path,
+        model_version: str,
+        database_url: str | None = None,
+    ):
+        super().__init__(database_path, database_url)
+        self.model_version = (
+            f"{model_version}+state{STATE_FORMAT_VERSION}+sklearn{sklearn.__version__}"
+        )
+
+    def initialize(self) -> None:
+        if self.backend == "sqlite":
+            self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        blob_type = "BYTEA" if self.backend == "postgresql" else "BLOB"
+        with self._connect() as connection:
+            if self.backend == "sqlite":
+                self._execute(connection, "PRAGMA journal_mode=WAL")
+            self._execute(
+                connection,
+                f"""
+                CREATE TABLE IF NOT EXISTS model_state (
+                    model_version TEXT NOT NULL,
+                    family TEXT NOT NULL,
+                    asset TEXT NOT NULL,
+                    horizon_days INTEGER NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    history_length INTEGER NOT NULL,
+                    last_value REAL NOT NULL,
+                    payload {blob_type} NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (model_version, family, asset, horizon_days, fingerprint)
+                )
+                """,
+            )
+            # States of other model versions can never be loaded again.
+            self._execute(
+                connection,
+                "DELETE FROM model_state WHERE model_version <> ?",
+                (self.model_version,),
+            )
+
+    def latest(self, family: str, asset: str, horizon_days: int) -> StoredState | None:
+        with self._connect() as connection:
+            row = self._execute(
+                connection,
+                """
+                SELECT fingerprint, history_length, last_value, payload, created_at
+                FROM model_state
+                WHERE model_version = ? AND family = ? AND asset = ?
+                    AND horizon_days = ?
+                ORDER BY history_length DESC, created_at DESC
+                LIMIT 1
+                """,
+                (self.model_version, family, asset, horizon_days),
+            ).fetchone()
+        if row is None:
+            return None
+        return StoredState(
+            fingerprint=str(row["fingerprint"]),
+            state=pickle.loads(bytes(row["payload"])),
+            history_length=int(row["history_length"]),
+            last_value=float(row["last_value"]),
+            created_at=str(row["created_at"]),
+        )
+
+    def save(
+        self,
+        family: str,
+        asset: str,
+        horizon_days: int,
+        fingerprint: str,
+        state: Any,
+        history_length: int,
+        last_value: float,
+    ) -> None:
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        slot = (self.model_version, family, asset, horizon_days)
+        with self._connect() as connection:
+            self._execute(
+                connection,
+                """
+                INSERT INTO model_state (
+                    model_version, family, asset, horizon_days, fingerprint,
+                    history_length, last_value, payload, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (model_version, family, asset, horizon_days, fingerprint)
+                DO NOTHING
+                """,
+                (
+                    *slot,
+                    fingerprint,
+                    history_length,
+                    last_value,
+                    payload,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+            rows = self._execute(
+                connection,
+                """
+                SELECT fingerprint
+                FROM model_state
+                WHERE model_version = ? AND family = ? AND asset = ?
+                    AND horizon_days = ?
+                ORDER BY history_length DESC, created_at DESC
+                """,
+                slot,
+            ).fetchall()
+            for row in rows[KEEP_STATES_PER_SLOT:]:
+                self._execute(
+                    connection,
+                    """
+                    DELETE FROM model_state
+                    WHERE model_version = ? AND family = ? AND asset = ?
+                        AND horizon_days = ? AND fingerprint = ?
+                    """,
+                    (*slot, row["fingerprint"]),
+                )
@@ -1,21 +1,56 @@
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import partial
 from math import isfinite, log, sqrt
 from random import Random
 from statistics import mean, stdev
-from typing import Any
+from typing import Any, Callable
 
+import numpy as np
 from sklearn.ensemble import ExtraTreesClassifier, HistGradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import roc_auc_score
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+from app.alignment import matched_or_fallback
+from app.cache import LRUCache, data_fingerprint
+from app.candidate_fits import fit_candidates
+from app.features import (
+    clamp,
+    ema_last,
+    feature_frame,
+    finite,
+    mean_rsi,
+    pct_returns,
+    return_pct,
+    trailing,
+    zscore,
+)
+from app.live_states import LIVE_STATES
+
 
 FEATURE_LOOKBACK_DAYS = 201
 CALIBRATION_METHOD = "Platt-kalibráció"
 BUY_THRESHOLDS = (0.55, 0.60, 0.65, 0.70, 0.75)
 CALIBRATION_SHRINKAGE = (0.0, 0.25, 0.50, 0.75, 1.0)
+MAX_FEATURE_MATRIX_ENTRIES = 16
+SHARED_COLUMNS = (
+    "return_1",
+    "return_3",
+    "return_7",
+    "return_14",
+    "return_30",
+    "return_60",
+    "ema_20",
+    "ema_50",
+    "sma_200",
+    "rsi_14",
+    "high_30",
+)
+MARKET_COLUMNS = ("return_7", "return_30", "ema_20", "ema_50", "sma_200")
+MAX_LIVE_CACHE_ENTRIES = 48
+_FEATURE_MATRIX_CACHE = LRUCache(MAX_FEATURE_MATRIX_ENTRIES)
+_LIVE_STATE_CACHE = LRUCache(MAX_LIVE_CACHE_ENTRIES)
 HORIZON_CANDIDATES = {
     1: ("hist_gradient_boosting", "extra_trees"),
     7: ("logistic", "hist_gradient_boosting"),
@@ -191,60 +226,12 @@ class ProbabilityState:
     drift_status: str
     drift_features: list[dict[str, Any]]
     reliability_bins: list[dict[str, Any]]
-    top_features: list[dict[str, Any]]
+    top_features: list[dict[str, Any]] | None
     validation_candidates: dict[str, dict[str, float]]
     reason: str
-
-
-def _clamp(value: float, lower: float, upper: float) -> float:
-    return max(lower, min(upper, value))
-
-
-def _finite(value: float, default: float = 0.0) -> float:
-    return float(value) if isfinite(float(value)) else default
-
-
-def _return_pct(values: list[float], days: int) -> float:
-    lookback = min(days, len(values) - 1)
-    if lookback <= 0 or values[-lookback - 1] <= 0:
-        return 0.0
-    return ((values[-1] / values[-lookback - 1]) - 1) * 100
-
-
-def _returns(values: list[float]) -> list[float]:
-    return [
-        ((current / previous) - 1) * 100
-        for previous, current in zip(values, values[1:])
-        if previous > 0
-    ]
-
-
-def _ema_last(values: list[float], span: int) -> float:
-    alpha = 2 / (span + 1)
-    result = values[0]
-    for value in values[1:]:
-        result = alpha * value + (1 - alpha) * result
-    return result
-
-
-def _rsi(values: list[float], window: int = 14) -> float:
-    recent = _returns(values[-(window + 1) :])
-    gains = [max(value, 0.0) for value in recent]
-    losses = [max(-value, 0.0) for value in recent]
-    average_gain = mean(gains) if gains else 0.0
-    average_loss = mean(losses) if losses else 0.0
-    if average_gain == 0 and average_loss == 0:
-        return 50.0
-    if average_loss == 0:
-        return 100.0
-    return 100 - (100 / (1 + average_gain / average_loss))
-
-
-def _zscore(values: list[float]) -> float:
-    if len(values) < 2:
-        return 0.0
-    deviation = stdev(values)
-    return (values[-1] - mean(values)) / deviation if deviation > 0 else 0.0
+    # Set instead of top_features when importance is deferred; see
+    # state_top_features.
+    pending_importance: Callable[[], list[dict[str, Any]]] | None = None
 
 
 def _volume_features(volumes: list[float | None]) -> tuple[float, float, float, float]:
@@ -261,13 +248,13 @@ def _volume_features(volumes: list[float | None]) -> tuple[float, float, float,
     recent_7 = valid[-7:]
     long_average = mean(valid)
     ratio = mean(recent_7) / long_average if long_average > 0 else 1.0
-    zscore = _zscore(valid[-20:])
+    volume_zscore = zscore(valid[-20:])
     reference = valid[-8] if len(valid) >= 8 else valid[0]
     change = ((valid[-1] / reference) - 1) * 100 if reference > 0 else 0.0
     return (
-        _clamp(ratio, 0.2, 5.0),
-        _clamp(zscore, -6.0, 6.0),
-        _clamp(change, -95.0, 400.0),
+        clamp(ratio, 0.2, 5.0),
+        clamp(volume_zscore, -6.0, 6.0),
+        clamp(change, -95.0, 400.0),
         availability,
     )
 
@@ -287,23 +274,16 @@ def _funding_features(
     latest = valid[-1]
     seven_day = mean(valid[-7:])
     thirty_day = mean(valid)
-    zscore = _zscore(valid) if len(valid) > 1 else 0.0
+    funding_zscore = zscore(valid) if len(valid) > 1 else 0.0
     return (
-        _clamp(latest, -5.0, 5.0),
-        _clamp(seven_day, -5.0, 5.0),
-        _clamp(thirty_day, -5.0, 5.0),
-        _clamp(zscore, -6.0, 6.0),
+        clamp(latest, -5.0, 5.0),
+        clamp(seven_day, -5.0, 5.0),
+        clamp(thirty_day, -5.0, 5.0),
+        clamp(funding_zscore, -6.0, 6.0),
         availability,
     )
 
 
-def _aligned_series(values: list[float], fallback: list[float]) -> list[float]:
-    aligned = [float(value) for value in values[: len(fallback)] if float(value) > 0]
-    if len(aligned) != len(fallback):
-        return list(fallback)
-    return aligned
-
-
 def build_probability_feature_vector(
     values: list[float],
     volumes: list[float | None],
@@ -313,17 +293,17 @@ def build_probability_feature_vector(
     if len(values) < FEATURE_LOOKBACK_DAYS:
         raise ValueError("Legalább 201 napi adat szükséges a valószínűségi modellhez.")
 
-    market_values = _aligned_series(market_values, values)
-    daily_returns = _returns(values)
+    market_values = matched_or_fallback(market_values, values)
+    daily_returns = pct_returns(values)
     recent_7 = daily_returns[-7:]
     recent_30 = daily_returns[-30:]
     downside = [value for value in recent_30 if value < 0]
-    ema20 = _ema_last(values, 20)
-    ema50 = _ema_last(values, 50)
+    ema20 = ema_last(values, 20)
+    ema50 = ema_last(values, 50)
     sma200 = mean(values[-200:])
     rolling_high = max(values[-30:])
-    market_ema20 = _ema_last(market_values, 20)
-    market_ema50 = _ema_last(market_values, 50)
+    market_ema20 = ema_last(market_values, 20)
+    market_ema50 = ema_last(market_values, 50)
     market_sma200 = mean(market_values[-200:])
     volume_ratio, volume_zscore, volume_change, volume_available = _volume_features(
         volumes
@@ -331,26 +311,26 @@ def build_probability_feature_vector(
     funding_rate, funding_7d, funding_30d, funding_zscore, funding_available = (
         _funding_features(funding_rates or [])
     )
-    return_7 = _return_pct(values, 7)
-    return_30 = _return_pct(values, 30)
-    market_return_7 = _return_pct(market_values, 7)
-    market_return_30 = _return_pct(market_values, 30)
+    return_7 = return_pct(values, 7)
+    return_30 = return_pct(values, 30)
+    market_return_7 = return_pct(market_values, 7)
+    market_return_30 = return_pct(market_values, 30)
 
     features = [
-        _return_pct(values, 1),
-        _return_pct(values, 3),
+        return_pct(values, 1),
+        return_pct(values, 3),
         return_7,
-        _return_pct(values, 14),
+        return_pct(values, 14),
         return_30,
-        _return_pct(values, 60),
+        return_pct(values, 60),
         *(daily_returns[-lag] if len(daily_returns) >= lag else 0.0 for lag in range(2, 8)),
         stdev(recent_7) if len(recent_7) > 1 else 0.0,
         stdev(recent_30) if len(recent_30) > 1 else 0.0,
         stdev(downside) if len(downside) > 1 else 0.0,
         ((ema20 / ema50) - 1) * 100 if ema50 > 0 else 0.0,
         ((values[-1] / sma200) - 1) * 100 if sma200 > 0 else 0.0,
-        _rsi(values),
-        _zscore(values[-20:]),
+        mean_rsi(values),
+        zscore(values[-20:]),
         ((values[-1] / rolling_high) - 1) * 100 if rolling_high > 0 else 0.0,
         volume_ratio,
         volume_zscore,
@@ -368,7 +348,244 @@ def build_probability_feature_vector(
         funding_zscore,
         funding_available,
     ]
-    return [_finite(value) for value in features]
+    return [finite(value) for value in features]
+
+
+def _row_stats(
+    matrix: np.ndarray,
+    mask: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row means, sample deviations and counts, honouring an optional mask.
+
+    Rows whose selected values are all identical get an exact zero deviation,
+    like ``statistics.stdev`` does, instead of rounding noise from the mean.
+    """
+    if mask is None:
+        mask = np.ones(matrix.shape, dtype=bool)
+    counts = mask.sum(axis=1)
+    means = np.where(mask, matrix, 0.0).sum(axis=1) / np.maximum(counts, 1)
+    squared = np.where(mask, matrix - means[:, None], 0.0) ** 2
+    deviations = np.sqrt(squared.sum(axis=1) / np.maximum(counts - 1, 1))
+    constant = (
+        np.where(mask, matrix, -np.inf).max(axis=1)
+        == np.where(mask, matrix, np.inf).min(axis=1)
+    )
+    deviations = np.where((counts > 1) & ~constant, deviations, 0.0)
+    return means, deviations, counts
+
+
+def _compacted_windows(
+    values: np.ndarray,
+    valid: np.ndarray,
+    ends: np.ndarray,
+    window: int,
+    width: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Last ``width`` valid values inside each trailing ``window`` of rows."""
+    positions = np.flatnonzero(valid)
+    compacted = values[positions]
+    low = np.searchsorted(positions, ends - window + 1, side="left")
+    high = np.searchsorted(positions, ends, side="right")
+    indexes = high[:, None] + np.arange(-width, 0)[None, :]
+    mask = indexes >= low[:, None]
+    if not len(compacted):
+        return np.zeros(indexes.shape), mask, low, high
+    return compacted[np.clip(indexes, 0, len(compacted) - 1)], mask, low, high
+
+
+def _probability_feature_matrix(
+    values: list[float],
+    volumes: list[float | None],
+    market_values: list[float],
+    funding_rates: list[float | None],
+) -> np.ndarray:
+    frame = feature_frame(values)
+    market_frame = feature_frame(market_values)
+    prices = frame.prices
+    market = market_frame.prices
+    origins = np.arange(FEATURE_LOOKBACK_DAYS - 1, len(prices))
+    daily_returns = (prices[1:] / prices[:-1] - 1) * 100
+    shared = frame.select(SHARED_COLUMNS, origins)
+    market_shared = market_frame.select(MARKET_COLUMNS, origins)
+
+    recent_7 = trailing(daily_returns, origins - 1, 7)
+    recent_30 = trailing(daily_returns, origins - 1, 30)
+    _, volatility_7, _ = _row_stats(recent_7)
+    _, volatility_30, _ = _row_stats(recent_30)
+    _, downside_volatility, _ = _row_stats(recent_30, recent_30 < 0)
+    price_mean_20, price_deviation_20, _ = _row_stats(trailing(prices, origins, 20))
+
+    volume_array = np.asarray(
+        [np.nan if value is None else float(value) for value in volumes],
+        dtype=np.float64,
+    )
+    with np.errstate(invalid="ignore"):
+        volume_valid = np.isfinite(volume_array) & (volume_array > 0)
+    volume_window, volume_mask, volume_low, volume_high = _compacted_windows(
+        volume_array,
+        volume_valid,
+        origins,
+        30,
+        30,
+    )
+    volume_counts = volume_high - volume_low
+    volume_available = volume_counts / 30
+    volume_long, _, _ = _row_stats(volume_window, volume_mask)
+    volume_short, _, _ = _row_stats(volume_window[:, -7:], volume_mask[:, -7:])
+    volume_mean_20, volume_deviation_20, _ = _row_stats(
+        volume_window[:, -20:],
+        volume_mask[:, -20:],
+    )
+    volume_latest = volume_window[:, -1]
+    volume_reference = volume_window[:, -8]
+    enough_volume = volume_counts >= 14
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_ratio = np.where(
+            enough_volume,
+            np.clip(volume_short / volume_long, 0.2, 5.0),
+            1.0,
+        )
+        volume_zscore = np.where(
+            enough_volume & (volume_deviation_20 > 0),
+            np.clip((volume_latest - volume_mean_20) / volume_deviation_20, -6.0, 6.0),
+            0.0,
+        )
+        volume_change = np.where(
+            enough_volume,
+            np.clip((volume_latest / volume_reference - 1) * 100, -95.0, 400.0),
+            0.0,
+        )
+
+    funding_array = np.asarray(
+        [np.nan if value is None else float(value) for value in funding_rates],
+        dtype=np.float64,
+    )
+    funding_window, funding_mask, funding_low, funding_high = _compacted_windows(
+        funding_array,
+        np.isfinite(funding_array),
+        origins,
+        30,
+        30,
+    )
+    funding_counts = funding_high - funding_low
+    has_funding = funding_counts > 0
+    funding_30, funding_deviation, _ = _row_stats(funding_window, funding_mask)
+    funding_7, _, _ = _row_stats(funding_window[:, -7:], funding_mask[:, -7:])
+    funding_latest = funding_window[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        funding_zscore = np.where(
+            funding_deviation > 0,
+            (funding_latest - funding_30) / funding_deviation,
+            0.0,
+        )
+
+    ema20 = shared["ema_20"]
+    ema50 = shared["ema_50"]
+    sma200 = shared["sma_200"]
+    rolling_high = shared["high_30"]
+    market_ema20 = market_shared["ema_20"]
+    market_ema50 = market_shared["ema_50"]
+    market_sma200 = market_shared["sma_200"]
+    return_7 = shared["return_7"]
+    return_30 = shared["return_30"]
+    market_return_7 = market_shared["return_7"]
+    market_return_30 = market_shared["return_30"]
+    current = prices[origins]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns = [
+            shared["return_1"],
+            shared["return_3"],
+            return_7,
+            shared["return_14"],
+            return_30,
+            shared["return_60"],
+            *(daily_returns[origins - lag] for lag in range(2, 8)),
+            volatility_7,
+            volatility_30,
+            downside_volatility,
+            np.where(ema50 > 0, (ema20 / ema50 - 1) * 100, 0.0),
+            np.where(sma200 > 0, (current / sma200 - 1) * 100, 0.0),
+            shared["rsi_14"],
+            np.where(
+                price_deviation_20 > 0,
+                (current - price_mean_20) / price_deviation_20,
+                0.0,
+            ),
+            np.where(rolling_high > 0, (current / rolling_high - 1) * 100, 0.0),
+            volume_ratio,
+            volume_zscore,
+            volume_change,
+            volume_available,
+            market_return_7,
+            market_return_30,
+            np.where(market_ema50 > 0, (market_ema20 / market_ema50 - 1) * 100, 0.0),
+            np.where(
+                market_sma200 > 0,
+                (market[origins] / market_sma200 - 1) * 100,
+                0.0,
+            ),
+            return_7 - market_return_7,
+            return_30 - market_return_30,
+            np.where(has_funding, np.clip(funding_latest, -5.0, 5.0), 0.0),
+            np.where(has_funding, np.clip(funding_7, -5.0, 5.0), 0.0),
+            np.where(has_funding, np.clip(funding_30, -5.0, 5.0), 0.0),
+            np.where(has_funding, np.clip(funding_zscore, -6.0, 6.0), 0.0),
+            funding_counts / 30,
+        ]
+    matrix = np.column_stack(columns)
+    return np.where(np.isfinite(matrix), matrix, 0.0)
+
+
+def build_probability_feature_matrix(
+    values: list[float],
+    volumes: list[float | None],
+    market_values: list[float],
+    funding_rates: list[float | None] | None = None,
+) -> dict[int, list[float]]:
+    """Feature vectors for every origin with a full lookback, in one pass.
+
+    Rows match ``build_probability_feature_vector`` on the matching prefix
+    up to floating-point rounding. The features do not depend on the
+    horizon, so the matrix is cached by the data it was built from and
+    shared by every horizon; it must not be modified.
+    """
+    if len(values) < FEATURE_LOOKBACK_DAYS:
+        return {}
+    aligned_volumes = list(volumes[: len(values)])
+    aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
+    aligned_market = matched_or_fallback(market_values, values)
+    aligned_funding = list((funding_rates or [])[: len(values)])
+    aligned_funding.extend([None] * (len(values) - len(aligned_funding)))
+    first_origin = FEATURE_LOOKBACK_DAYS - 1
+
+    key = data_fingerprint(values, aligned_volumes, aligned_market, aligned_funding)
+    features = _FEATURE_MATRIX_CACHE.get(key)
+    if features is not None:
+        return features
+
+    if min(values) <= 0:
+        features = {
+            origin: build_probability_feature_vector(
+                values[: origin + 1],
+                aligned_volumes[: origin + 1],
+                aligned_market[: origin + 1],
+                aligned_funding[: origin + 1],
+            )
+            for origin in range(first_origin, len(values))
+        }
+    else:
+        matrix = _probability_feature_matrix(
+            values,
+            aligned_volumes,
+            aligned_market,
+            aligned_funding,
+        )
+        features = {
+            origin: row
+            for origin, row in enumerate(matrix.tolist(), start=first_origin)
+        }
+    return _FEATURE_MATRIX_CACHE.put(key, features)
 
 
 def prepare_probability_data(
@@ -381,25 +598,17 @@ def prepare_probability_data(
     if horizon_days not in PROBABILITY_REGISTRY:
         raise ValueError("Az időtáv 1, 7 vagy 30 nap lehet.")
 
-    aligned_volumes = list(volumes[: len(values)])
-    if len(aligned_volumes) < len(values):
-        aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
-    aligned_market = _aligned_series(market_values, values)
-    aligned_funding = list((funding_rates or [])[: len(values)])
-    if len(aligned_funding) < len(values):
-        aligned_funding.extend([None] * (len(values) - len(aligned_funding)))
     threshold = PROBABILITY_REGISTRY[horizon_days].target_return_pct
-    features_by_origin: dict[int, list[float]] = {}
+    features_by_origin = build_probability_feature_matrix(
+        values,
+        volumes,
+        market_values,
+        funding_rates,
+    )
     targets_by_origin: dict[int, int] = {}
     returns_by_origin: dict[int, float] = {}
 
-    for origin in range(FEATURE_LOOKBACK_DAYS - 1, len(values)):
-        features_by_origin[origin] = build_probability_feature_vector(
-            values[: origin + 1],
-            aligned_volumes[: origin + 1],
-            aligned_market[: origin + 1],
-            aligned_funding[: origin + 1],
-        )
+    for origin in features_by_origin:
         if origin + horizon_days < len(values):
             future_return = (
                 (values[origin + horizon_days] / values[origin]) - 1
@@ -475,13 +684,13 @@ def _fit_estimator(estimator, features: list[list[float]], targets: list[int]):
 
 def _raw_probabilities(estimator, features: list[list[float]]) -> list[float]:
     return [
-        _clamp(float(value), 0.0001, 0.9999)
+        clamp(float(value), 0.0001, 0.9999)
         for value in estimator.predict_proba(features)[:, 1]
     ]
 
 
 def _logit(probability: float) -> float:
-    value = _clamp(probability, 0.0001, 0.9999)
+    value = clamp(probability, 0.0001, 0.9999)
     return log(value / (1 - value))
 
 
@@ -506,7 +715,7 @@ def _apply_calibrator(calibrator, probabilities: list[float]) -> list[float]:
     if calibrator is None:
         return probabilities
     return [
-        _clamp(float(value), 0.0001, 0.9999)
+        clamp(float(value), 0.0001, 0.9999)
         for value in calibrator.predict_proba(
             [[_logit(probability)] for probability in probabilities]
         )[:, 1]
@@ -523,7 +732,7 @@ def _shrink_probabilities(
     shrinkage: float,
 ) -> list[float]:
     return [
-        _clamp(baseline + shrinkage * (probability - baseline), 0.0001, 0.9999)
+        clamp(baseline + shrinkage * (probability - baseline), 0.0001, 0.9999)
         for probability in probabilities
     ]
 
@@ -541,8 +750,8 @@ def binary_log_loss(actual: list[int], probabilities: list[float]) -> float:
     if not actual:
         return 0.0
     return -mean(
-        target * log(_clamp(probability, 0.0001, 0.9999))
-        + (1 - target) * log(_clamp(1 - probability, 0.0001, 0.9999))
+        target * log(clamp(probability, 0.0001, 0.9999))
+        + (1 - target) * log(clamp(1 - probability, 0.0001, 0.9999))
         for target, probability in zip(actual, probabilities)
     )
 
@@ -657,7 +866,7 @@ def _choose_buy_threshold(
             choices.append((score, threshold))
     if choices:
         return max(choices)[1]
-    return _clamp(max(0.60, baseline + 0.10), 0.55, 0.75)
+    return clamp(max(0.60, baseline + 0.10), 0.55, 0.75)
 
 
 def _signal_metrics(
@@ -751,30 +960,37 @@ def _permutation_importance(
 ) -> list[dict[str, Any]]:
     if not features:
         return []
-    reference = brier_score(
-        targets,
-        _shrink_probabilities(
-            calibrated_probabilities(estimator, calibrator, features),
-            baseline,
-            shrinkage,
-        ),
+    matrix = np.asarray(features, dtype=np.float64)
+    rows, columns = matrix.shape
+    # Block 0 is the untouched holdout, block 1 + i has column i permuted.
+    # Random(seed).shuffle moves positions independently of the values, so
+    # shuffling row indexes reproduces the per-column shuffle exactly.
+    stacked = np.repeat(matrix[None, :, :], columns + 1, axis=0)
+    for feature_index in range(columns):
+        order = list(range(rows))
+        Random(42 + feature_index).shuffle(order)
+        stacked[feature_index + 1, :, feature_index] = matrix[order, feature_index]
+    probabilities = calibrated_probabilities(
+        estimator,
+        calibrator,
+        stacked.reshape(-1, columns),
     )
-    importances = []
-    for feature_index, name in enumerate(FEATURE_NAMES):
-        shuffled = [list(row) for row in features]
-        column = [row[feature_index] for row in shuffled]
-        Random(42 + feature_index).shuffle(column)
-        for row, value in zip(shuffled, column):
-            row[feature_index] = value
-        shuffled_score = brier_score(
+    scores = [
+        brier_score(
             targets,
             _shrink_probabilities(
-                calibrated_probabilities(estimator, calibrator, shuffled),
+                probabilities[block * rows : (block + 1) * rows],
                 baseline,
                 shrinkage,
             ),
         )
-        importances.append((name, max(0.0, shuffled_score - reference)))
+        for block in range(columns + 1)
+    ]
+    reference = scores[0]
+    importances = [
+        (name, max(0.0, shuffled_score - reference))
+        for name, shuffled_score in zip(FEATURE_NAMES, scores[1:])
+    ]
 
     positive_total = sum(value for _name, value in importances)
     if positive_total <= 0:
@@ -791,6 +1007,15 @@ def _permutation_importance(
     ]
 
 
+def state_top_features(state: ProbabilityState) -> list[dict[str, Any]]:
+    """Permutation importance of a state, computed on first request when deferred."""
+    if state.top_features is None:
+        pending = state.pending_importance
+        state.top_features = pending() if pending is not None else []
+        state.pending_importance = None
+    return state.top_features
+
+
 def _empty_state(
     spec: ProbabilitySpec,
     targets: list[int],
@@ -807,8 +1032,8 @@ def _empty_state(
         active=False,
         baseline_probability=baseline,
         shrinkage=0.0,
-        buy_threshold=_clamp(max(0.60, baseline + 0.10), 0.55, 0.75),
-        sell_threshold=_clamp(min(0.45, baseline - 0.10), 0.25, 0.45),
+        buy_threshold=clamp(max(0.60, baseline + 0.10), 0.55, 0.75),
+        sell_threshold=clamp(min(0.45, baseline - 0.10), 0.25, 0.45),
         training_samples=len(targets),
         holdout_samples=0,
         validation_brier_skill_pct=0.0,
@@ -838,10 +1063,59 @@ def _empty_state(
     )
 
 
+def _validate_candidate(
+    candidate_key: str,
+    training_features: list[list[float]],
+    training_labels: list[int],
+    calibration_features: list[list[float]],
+    calibration_labels: list[int],
+    validation_features: list[list[float]],
+    validation_actual: list[int],
+    validation_baseline: float,
+) -> tuple[Any, Any, float, list[float], float, float, float]:
+    estimator = _fit_estimator(
+        _make_estimator(candidate_key),
+        training_features,
+        training_labels,
+    )
+    calibrator = _fit_calibrator(
+        _raw_probabilities(estimator, calibration_features),
+        calibration_labels,
+    )
+    calibrated = calibrated_probabilities(
+        estimator,
+        calibrator,
+        validation_features,
+    )
+    shrinkage = min(
+        CALIBRATION_SHRINKAGE,
+        key=lambda candidate: brier_score(
+            validation_actual,
+            _shrink_probabilities(
+                calibrated,
+                validation_baseline,
+                candidate,
+            ),
+        ),
+    )
+    probabilities = _shrink_probabilities(
+        calibrated,
+        validation_baseline,
+        shrinkage,
+    )
+    score, baseline_score, skill = _brier_skill(
+        validation_actual,
+        probabilities,
+        validation_baseline,
+    )
+    return estimator, calibrator, shrinkage, probabilities, score, baseline_score, skill
+
+
 def train_probability_model(
     prepared: PreparedProbabilityData,
     known_through_origin: int,
     verify_history: bool = True,
+    lazy_importance: bool = False,
 ) -> ProbabilityState:
     spec = PROBABILITY_REGISTRY[prepared.horizon_days]
     origins = sorted(
@@ -894,42 +1168,25 @@ def train_probability_model(
     validation_baseline = _event_rate(labels(training + calibration))
     validation_actual = labels(validation)
 
-    for candidate_key in HORIZON_CANDIDATES[prepared.horizon_days]:
-        estimator = _fit_estimator(
-            _make_estimator(candidate_key),
-            features(training),
-            labels(training),
-        )
-        calibrator = _fit_calibrator(
-            _raw_probabilities(estimator, features(calibration)),
-            labels(calibration),
-        )
-        calibrated = calibrated_probabilities(
-            estimator,
-            calibrator,
-            features(validation),
-        )
-        shrinkage = min(
-            CALIBRATION_SHRINKAGE,
-            key=lambda candidate: brier_score(
+    candidate_keys = HORIZON_CANDIDATES[prepared.horizon_days]
+    fits = fit_candidates(
+        [
+            partial(
+                _validate_candidate,
+                candidate_key,
+                features(training),
+                labels(training),
+                features(calibration),
+                labels(calibration),
+                features(validation),
                 validation_actual,
-                _shrink_probabilities(
-                    calibrated,
-                    validation_baseline,
-                    candidate,
-                ),
-            ),
-        )
-        probabilities = _shrink_probabilities(
-            calibrated,
-            validation_baseline,
-            shrinkage,
-        )
-        score, baseline_score, skill = _brier_skill(
-            validation_actual,
-            probabilities,
-            validation_baseline,
-        )
+                validation_baseline,
+            )
+            for candidate_key in candidate_keys
+        ]
+    )
+    for candidate_key, fit in zip(candidate_keys, fits):
+        estimator, calibrator, shrinkage, probabilities, score, baseline_score, skill = fit
         validation_candidates[candidate_key] = {
             "brier_score": round(score, 5),
             "baseline_brier_score": round(baseline_score, 5),
@@ -1045,6 +1302,7 @@ def train_probability_model(
                     prepared,
                     known_through_origin=earlier_origin,
                     verify_history=False,
+                    lazy_importance=True,
                 )
             )
     historical_positive_checks = sum(state.active for state in historical_states)
@@ -1086,6 +1344,15 @@ def train_probability_model(
             labels(final_calibration_origins),
         )
     live_baseline_probability = _event_rate(targets)
+    importance = partial(
+        _permutation_importance,
+        evaluation_estimator,
+        evaluation_calibrator,
+        holdout_features,
+        holdout_actual,
+        baseline_probability,
+        selected_shrinkage,
+    )
 
     return ProbabilityState(
         spec=spec,
@@ -1098,7 +1365,7 @@ def train_probability_model(
         baseline_probability=live_baseline_probability,
         shrinkage=selected_shrinkage,
         buy_threshold=buy_threshold,
-        sell_threshold=_clamp(
+        sell_threshold=clamp(
             min(0.45, live_baseline_probability - 0.10),
             0.25,
             0.45,
@@ -1126,16 +1393,10 @@ def train_probability_model(
         drift_status=drift_status,
         drift_features=drift_features,
         reliability_bins=reliability_bins(holdout_actual, holdout_probabilities),
-        top_features=_permutation_importance(
-            evaluation_estimator,
-            evaluation_calibrator,
-            holdout_features,
-            holdout_actual,
-            baseline_probability,
-            selected_shrinkage,
-        ),
+        top_features=None if lazy_importance else importance(),
         validation_candidates=validation_candidates,
         reason=reason,
+        pending_importance=importance if lazy_importance else None,
     )
 
 
@@ -1143,50 +1404,71 @@ def probability_from_state(
     state: ProbabilityState,
     current_features: list[float] | None,
 ) -> dict[str, Any]:
-    candidate_probability = None
-    if state.estimator is not None and current_features is not None:
-        candidate_probability = _shrink_probabilities(
+    return probabilities_from_state(state, [current_features])[0]
+
+
+def probabilities_from_state(
+    state: ProbabilityState,
+    features: list[list[float] | None],
+) -> list[dict[str, Any]]:
+    """Published probabilities of one fitted state for many feature rows."""
+    candidates: list[float | None] = [None] * len(features)
+    present = [index for index, row in enumerate(features) if row is not None]
+    if state.estimator is not None and present:
+        probabilities = _shrink_probabilities(
             calibrated_probabilities(
                 state.estimator,
                 state.calibrator,
-                [current_features],
+                [features[index] for index in present],
             ),
             state.baseline_probability,
             state.shrinkage,
-        )[0]
+        )
+        for index, probability in zip(present, probabilities):
+            candidates[index] = probability
+    return [_published_probability(state, candidate) for candidate in candidates]
+
+
+def _published_probability(
+    state: ProbabilityState,
+    candidate_probability: float | None,
+) -> dict[str, Any]:
     published_probability = (
         candidate_probability
         if state.active and candidate_probability is not None
         else state.baseline_probability
     )
     return {
-        "probability": _clamp(published_probability, 0.0, 1.0),
+        "probability": clamp(published_probability, 0.0, 1.0),
         "candidate_probability": candidate_probability,
-        "baseline_probability": _clamp(state.baseline_probability, 0.0, 1.0),
+        "baseline_probability": clamp(state.baseline_probability, 0.0, 1.0),
         "active": state.active,
         "available": state.available,
     }
 
 
-@lru_cache(maxsize=48)
-def _cached_live_state(
-    closed_values: tuple[float, ...],
-    closed_volumes: tuple[float | None, ...],
-    closed_market_values: tuple[float, ...],
-    closed_funding_rates: tuple[float | None, ...],
+def _train_live_state(
+    closed_values: list[float],
+    closed_volumes: list[float | None],
+    closed_market_values: list[float],
+    closed_funding_rates: list[float | None],
     horizon_days: int,
 ) -> ProbabilityState:
-    values = list(closed_values)
+    values = [float(value) for value in closed_values]
     prepared = prepare_probability_data(
         values,
-        list(closed_volumes),
-        list(closed_market_values),
+        [float(value) if value is not None else None for value in closed_volumes],
+        [float(value) for value in closed_market_values],
         horizon_days,
-        list(closed_funding_rates),
+        [
+            float(value) if value is not None else None
+            for value in closed_funding_rates
+        ],
     )
     return train_probability_model(
         prepared,
         known_through_origin=len(values) - horizon_days - 1,
+        lazy_importance=True,
     )
 
 
@@ -1204,49 +1486,105 @@ def _historical_event_rate(
     return _event_rate(events)
 
 
-def build_probability_forecast(
+def _aligned_inputs(
     values: list[float],
     volumes: list[float | None],
     market_values: list[float],
-    horizon_days: int,
-    snapshot: dict[str, Any],
-    lower_change_pct: float,
-    upper_change_pct: float,
-    market_context_available: bool,
-    funding_rates: list[float | None] | None = None,
-) -> dict[str, Any]:
-    spec = PROBABILITY_REGISTRY[horizon_days]
-    aligned_market = _aligned_series(market_values, values)
+    funding_rates: list[float | None] | None,
+) -> tuple[list[float | None], list[float], list[float | None]]:
+    aligned_market = matched_or_fallback(market_values, values)
     aligned_volumes = list(volumes[: len(values)])
     if len(aligned_volumes) < len(values):
         aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
     aligned_funding = list((funding_rates or [])[: len(values)])
     if len(aligned_funding) < len(values):
         aligned_funding.extend([None] * (len(values) - len(aligned_funding)))
+    return aligned_volumes, aligned_market, aligned_funding
 
-    closed_values = tuple(float(value) for value in values[:-1])
-    closed_volumes = tuple(
-        float(value) if value is not None else None
-        for value in aligned_volumes[:-1]
-    )
-    closed_market = tuple(float(value) for value in aligned_market[:-1])
-    closed_funding = tuple(
-        float(value) if value is not None else None
-        for value in aligned_funding[:-1]
+
+def live_probability_state(
+    values: list[float],
+    volumes: list[float | None],
+    market_values: list[float],
+    horizon_days: int,
+    funding_rates: list[float | None] | None = None,
+    state_key: str = "",
+    data_version: str = "",
+) -> ProbabilityState:
+    """The live state fitted on the closed days of ``values``."""
+    spec = PROBABILITY_REGISTRY[horizon_days]
+    aligned_volumes, aligned_market, aligned_funding = _aligned_inputs(
+        values,
+        volumes,
+        market_values,
+        funding_rates,
     )
-    state = _cached_live_state(
+    closed_values = values[:-1]
+    closed_volumes = aligned_volumes[:-1]
+    closed_market = aligned_market[:-1]
+    closed_funding = aligned_funding[:-1]
+    version = data_version or data_fingerprint(
         closed_values,
         closed_volumes,
         closed_market,
         closed_funding,
+    )
+    signature = data_fingerprint(version, horizon_days)
+    state = LIVE_STATES.resolve(
+        "probability",
+        state_key,
         horizon_days,
+        closed_values,
+        signature,
+        lambda: _LIVE_STATE_CACHE.get_or_build(
+            signature,
+            lambda: _train_live_state(
+                closed_values,
+                closed_volumes,
+                closed_market,
+                closed_funding,
+                horizon_days,
+            ),
+        ),
     )
     if not state.training_samples:
         state.baseline_probability = _historical_event_rate(
-            list(closed_values),
+            [float(value) for value in closed_values],
             horizon_days,
             spec.target_return_pct,
         )
+    return state
+
+
+def build_probability_forecast(
+    values: list[float],
+    volumes: list[float | None],
+    market_values: list[float],
+    horizon_days: int,
+    snapshot: dict[str, Any],
+    lower_change_pct: float,
+    upper_change_pct: float,
+    market_context_available: bool,
+    funding_rates: list[float | None] | None = None,
+    state_key: str = "",
+    data_version: str = "",
+) -> dict[str, Any]:
+    spec = PROBABILITY_REGISTRY[horizon_days]
+    state = live_probability_state(
+        values,
+        volumes,
+        market_values,
+        horizon_days,
+        funding_rates,
+        state_key,
+        data_version,
+    )
+    aligned_volumes, aligned_market, aligned_funding = _aligned_inputs(
+        values,
+        volumes,
+        market_values,
+        funding_rates,
+    )
 
     current_features = None
     if len(values) >= FEATURE_LOOKBACK_DAYS:
@@ -1262,8 +1600,8 @@ def build_probability_forecast(
     price_above_sma200 = values[-1] > sma200
     ema_alignment = float(snapshot["ema20"]) > float(snapshot["ema50"])
     rsi_in_band = 45 <= float(snapshot["rsi"]) <= 70
-    market_ema20 = _ema_last(aligned_market, 20)
-    market_ema50 = _ema_last(aligned_market, 50)
+    market_ema20 = ema_last(aligned_market, 20)
+    market_ema50 = ema_last(aligned_market, 50)
     market_sma200 = mean(aligned_market[-min(200, len(aligned_market)) :])
     market_trend = (
         aligned_market[-1] > market_sma200 and market_ema20 > market_ema50
@@ -1373,7 +1711,7 @@ def build_probability_forecast(
             "uncertainty_passed": uncertainty_passed,
             "prediction_interval_width_pct": round(interval_width, 2),
         },
-        "top_features": state.top_features,
+        "top_features": state_top_features(state),
         "reason": state.reason,
         "methodology": (
             "Időrendi train, kalibráció, validáció és érintetlen holdout; "
@@ -1,17 +1,52 @@
 from dataclasses import dataclass
-from functools import lru_cache
+from functools import partial
 from math import isfinite
 from statistics import mean, stdev
 from typing import Any
 
+import numpy as np
 from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor
 from sklearn.linear_model import HuberRegressor, Ridge
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+from app.cache import LRUCache, WindowCache, WindowMatch, data_fingerprint
+from app.candidate_fits import fit_candidates
+from app.features import (
+    clamp,
+    ema_last,
+    feature_frame,
+    mean_rsi,
+    normalized_slope,
+    pct_returns,
+    return_pct,
+    sample_deviation,
+    trailing,
+    trailing_slope,
+)
+from app.live_states import LIVE_STATES
+
 
 FEATURE_LOOKBACK_DAYS = 61
 SHRINKAGE_CANDIDATES = (0.0, 0.25, 0.5, 0.75, 1.0)
+MAX_FEATURE_MATRIX_ENTRIES = 16
+MAX_LIVE_CACHE_ENTRIES = 48
+SHARED_COLUMNS = (
+    "return_1",
+    "return_3",
+    "return_7",
+    "return_14",
+    "return_30",
+    "return_60",
+    "ema_5",
+    "ema_20",
+    "ema_50",
+    "rsi_14",
+    "high_30",
+)
+
+_FEATURE_MATRIX_CACHE = WindowCache(MAX_FEATURE_MATRIX_ENTRIES)
+_LIVE_STATE_CACHE = LRUCache(MAX_LIVE_CACHE_ENTRIES)
 
 
 @dataclass(frozen=True)
@@ -153,53 +188,6 @@ class SpecialistState:
     reason: str
 
 
-def _clamp(value: float, lower: float, upper: float) -> float:
-    return max(lower, min(upper, value))
-
-
-def _return_pct(values: list[float], days: int) -> float:
-    return ((values[-1] / values[-days - 1]) - 1) * 100
-
-
-def _returns(values: list[float]) -> list[float]:
-    return [((current / previous) - 1) * 100 for previous, current in zip(values, values[1:])]
-
-
-def _ema_last(values: list[float], span: int) -> float:
-    alpha = 2 / (span + 1)
-    result = values[0]
-    for value in values[1:]:
-        result = alpha * value + (1 - alpha) * result
-    return result
-
-
-def _rsi(values: list[float], window: int = 14) -> float:
-    recent = _returns(values[-(window + 1) :])
-    gains = [max(value, 0.0) for value in recent]
-    losses = [max(-value, 0.0) for value in recent]
-    average_gain = mean(gains) if gains else 0.0
-    average_loss = mean(losses) if losses else 0.0
-    if average_gain == 0 and average_loss == 0:
-        return 50.0
-    if average_loss == 0:
-        return 100.0
-    return 100 - (100 / (1 + average_gain / average_loss))
-
-
-def _normalized_slope(values: list[float], window: int) -> float:
-    recent = values[-window:]
-    x_middle = (len(recent) - 1) / 2
-    y_middle = mean(recent)
-    denominator = sum((index - x_middle) ** 2 for index in range(len(recent)))
-    if denominator == 0 or y_middle == 0:
-        return 0.0
-    numerator = sum(
-        (index - x_middle) * (value - y_middle)
-        for index, value in enumerate(recent)
-    )
-    return numerator / denominator / y_middle * 100
-
-
 def _volume_features(volumes: list[float | None]) -> tuple[float, float, float]:
     recent_30 = [
         float(value)
@@ -215,7 +203,7 @@ def _volume_features(volumes: list[float | None]) -> tuple[float, float, float]:
     ratio = mean(recent_7) / long_average if long_average > 0 else 1.0
     reference = recent_30[-8] if len(recent_30) >= 8 else recent_30[0]
     change = ((recent_30[-1] / reference) - 1) * 100 if reference > 0 else 0.0
-    return _clamp(ratio, 0.2, 5.0), _clamp(change, -95.0, 400.0), availability
+    return clamp(ratio, 0.2, 5.0), clamp(change, -95.0, 400.0), availability
 
 
 def build_feature_vector(
@@ -225,12 +213,12 @@ def build_feature_vector(
     if len(values) < FEATURE_LOOKBACK_DAYS:
         raise ValueError("Legalább 61 napi adat szükséges a specialista modellhez.")
 
-    daily_returns = _returns(values)
+    daily_returns = pct_returns(values)
     recent_7 = daily_returns[-7:]
     recent_30 = daily_returns[-30:]
-    ema5 = _ema_last(values, 5)
-    ema20 = _ema_last(values, 20)
-    ema50 = _ema_last(values, 50)
+    ema5 = ema_last(values, 5)
+    ema20 = ema_last(values, 20)
+    ema50 = ema_last(values, 50)
     recent_prices = values[-20:]
     price_average = mean(recent_prices)
     price_deviation = stdev(recent_prices) if len(recent_prices) > 1 else 0.0
@@ -238,19 +226,19 @@ def build_feature_vector(
     volume_ratio, volume_change, volume_available = _volume_features(volumes)
 
     return [
-        _return_pct(values, 1),
-        _return_pct(values, 3),
-        _return_pct(values, 7),
-        _return_pct(values, 14),
-        _return_pct(values, 30),
-        _return_pct(values, 60),
+        return_pct(values, 1),
+        return_pct(values, 3),
+        return_pct(values, 7),
+        return_pct(values, 14),
+        return_pct(values, 30),
+        return_pct(values, 60),
         stdev(recent_7) if len(recent_7) > 1 else 0.0,
         stdev(recent_30) if len(recent_30) > 1 else 0.0,
-        _normalized_slope(values, 20),
-        _normalized_slope(values, 60),
+        normalized_slope(values, 20),
+        normalized_slope(values, 60),
         ((ema5 / ema20) - 1) * 100 if ema20 else 0.0,
         ((ema20 / ema50) - 1) * 100 if ema50 else 0.0,
-        _rsi(values),
+        mean_rsi(values),
         (values[-1] - price_average) / price_deviation if price_deviation else 0.0,
         ((values[-1] / rolling_high) - 1) * 100 if rolling_high else 0.0,
         volume_ratio,
@@ -259,6 +247,162 @@ def build_feature_vector(
     ]
 
 
+def _volume_matrix(
+    volumes: np.ndarray,
+    origins: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(volumes) & (volumes > 0)
+    positions = np.flatnonzero(valid)
+    compacted = volumes[positions]
+    low = np.searchsorted(positions, origins - 29, side="left")
+    high = np.searchsorted(positions, origins, side="right")
+    counts = high - low
+    availability = counts / 30
+    ratio = np.ones(len(origins))
+    change = np.zeros(len(origins))
+    enough = counts >= 14
+    if not enough.any():
+        return ratio, change, availability
+
+    indexes = high[:, None] + np.arange(-30, 0)[None, :]
+    mask = indexes >= low[:, None]
+    windows = np.where(mask, compacted[np.clip(indexes, 0, len(compacted) - 1)], 0.0)
+    long_average = windows.sum(axis=1) / np.maximum(counts, 1)
+    short_average = windows[:, -7:].sum(axis=1) / 7
+    latest = windows[:, -1]
+    reference = windows[:, -8]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(enough, np.clip(short_average / long_average, 0.2, 5.0), 1.0)
+        change = np.where(
+            enough,
+            np.clip((latest / reference - 1) * 100, -95.0, 400.0),
+            0.0,
+        )
+    return ratio, change, availability
+
+
+def build_feature_matrix(
+    values: list[float],
+    volumes: list[float | None],
+) -> list[list[float]]:
+    """Feature rows for every origin from day 61 on, computed in one pass.
+
+    Row ``k`` equals ``build_feature_vector`` on the first ``61 + k`` days up
+    to floating-point rounding.
+    """
+    first_origin = FEATURE_LOOKBACK_DAYS - 1
+    if len(values) < FEATURE_LOOKBACK_DAYS:
+        return []
+    aligned_volumes = list(volumes[: len(values)])
+    aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
+    if min(values) <= 0:
+        return [
+            build_feature_vector(values[: origin + 1], aligned_volumes[: origin + 1])
+            for origin in range(first_origin, len(values))
+        ]
+
+    frame = feature_frame(values)
+    prices = frame.prices
+    origins = np.arange(first_origin, len(prices))
+    current = prices[origins]
+    daily_returns = (prices[1:] / prices[:-1] - 1) * 100
+    shared = frame.select(SHARED_COLUMNS, origins)
+    recent_prices = trailing(prices, origins, 20)
+    price_deviation = sample_deviation(recent_prices)
+    volume_ratio, volume_change, volume_available = _volume_matrix(
+        np.asarray(
+            [np.nan if value is None else float(value) for value in aligned_volumes],
+            dtype=np.float64,
+        ),
+        origins,
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        matrix = np.column_stack(
+            [
+                shared["return_1"],
+                shared["return_3"],
+                shared["return_7"],
+                shared["return_14"],
+                shared["return_30"],
+                shared["return_60"],
+                sample_deviation(trailing(daily_returns, origins - 1, 7)),
+                sample_deviation(trailing(daily_returns, origins - 1, 30)),
+                trailing_slope(prices, origins, 20),
+                trailing_slope(prices, origins, 60),
+                (shared["ema_5"] / shared["ema_20"] - 1) * 100,
+                (shared["ema_20"] / shared["ema_50"] - 1) * 100,
+                shared["rsi_14"],
+                np.where(
+                    price_deviation > 0,
+                    (current - recent_prices.mean(axis=1)) / price_deviation,
+                    0.0,
+                ),
+                (current / shared["high_30"] - 1) * 100,
+                volume_ratio,
+                volume_change,
+                volume_available,
+            ]
+        )
+    return matrix.tolist()
+
+
+def _continued_rows(
+    values: list[float],
+    volumes: list[float | None],
+    match: WindowMatch,
+) -> list[list[float]] | None:
+    # Rows keep their values when the window slides, except the EMA ratios,
+    # whose averages start at the first day of the window.
+    kept = match.earlier[match.dropped :]
+    if len(kept) + match.added != len(values) - FEATURE_LOOKBACK_DAYS + 1:
+        return None
+    if match.dropped:
+        if min(values) <= 0:
+            return None
+        origins = np.arange(FEATURE_LOOKBACK_DAYS - 1, FEATURE_LOOKBACK_DAYS - 1 + len(kept))
+        ema = feature_frame(values).select(("ema_5", "ema_20", "ema_50"), origins)
+        short_ratio = (ema["ema_5"] / ema["ema_20"] - 1) * 100
+        long_ratio = (ema["ema_20"] / ema["ema_50"] - 1) * 100
+        kept = [
+            [*row[:10], float(short), float(long), *row[12:]]
+            for row, short, long in zip(kept, short_ratio, long_ratio)
+        ]
+    return [
+        *kept,
+        *(
+            build_feature_vector(values[: origin + 1], volumes[: origin + 1])
+            for origin in range(len(values) - match.added, len(values))
+        ),
+    ]
+
+
+def specialist_feature_rows(
+    values: list[float],
+    volumes: list[float | None],
+) -> list[list[float]]:
+    """Feature rows for ``values``, continuing the rows of an earlier window.
+
+    When the history gained a few closed days since the last call, or a
+    capped history slid forward by a few days, the cached rows are reused
+    and only the rows of the new origins are built. The returned rows are
+    shared and must not be modified.
+    """
+    aligned_volumes = list(volumes[: len(values)])
+    aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
+    match = _FEATURE_MATRIX_CACHE.find(values, aligned_volumes)
+    if match.value is not None:
+        return match.value
+
+    rows = None
+    if match.earlier is not None and len(values) > FEATURE_LOOKBACK_DAYS:
+        rows = _continued_rows(values, aligned_volumes, match)
+    if rows is None:
+        rows = build_feature_matrix(values, aligned_volumes)
+    return _FEATURE_MATRIX_CACHE.put(match.key, (values, aligned_volumes), rows)
+
+
 def prepare_specialist_data(
     values: list[float],
     volumes: list[float | None],
@@ -267,17 +411,14 @@ def prepare_specialist_data(
     if horizon_days not in SPECIALIST_REGISTRY:
         raise ValueError("Az időtáv 1, 7 vagy 30 nap lehet.")
 
-    aligned_volumes = list(volumes[: len(values)])
-    if len(aligned_volumes) < len(values):
-        aligned_volumes.extend([None] * (len(values) - len(aligned_volumes)))
-
-    features_by_origin = {}
-    targets_by_origin = {}
-    for origin in range(FEATURE_LOOKBACK_DAYS - 1, len(values)):
-        features_by_origin[origin] = build_feature_vector(
-            values[: origin + 1],
-            aligned_volumes[: origin + 1],
+    features_by_origin = dict(
+        enumerate(
+            specialist_feature_rows(values, volumes),
+            start=FEATURE_LOOKBACK_DAYS - 1,
         )
+    )
+    targets_by_origin = {}
+    for origin in features_by_origin:
         if origin + horizon_days < len(values):
             targets_by_origin[origin] = (
                 (values[origin + horizon_days] / values[origin]) - 1
@@ -346,7 +487,7 @@ def _fit_estimator(estimator, features: list[list[float]], targets: list[float])
 
 def _predict(estimator, features: list[list[float]], spec: SpecialistSpec) -> list[float]:
     return [
-        _clamp(float(value), -spec.point_limit, spec.point_limit)
+        clamp(float(value), -spec.point_limit, spec.point_limit)
         for value in estimator.predict(features)
     ]
 
@@ -413,6 +554,54 @@ def _empty_state(
     )
 
 
+def _validate_candidate(
+    candidate_key: str,
+    spec: SpecialistSpec,
+    horizon_days: int,
+    training_features: list[list[float]],
+    training_targets: list[float],
+    calibration_features: list[list[float]],
+    calibration_actual: list[float],
+    calibration_baseline_mae: float,
+) -> dict[str, Any]:
+    calibration_model = _fit_estimator(
+        _make_estimator(candidate_key, horizon_days),
+        training_features,
+        training_targets,
+    )
+    calibration_predictions = _predict(
+        calibration_model,
+        calibration_features,
+        spec,
+    )
+    candidate_shrinkage = min(
+        SHRINKAGE_CANDIDATES,
+        key=lambda candidate: _mae(
+            calibration_actual,
+            [prediction * candidate for prediction in calibration_predictions],
+        ),
+    )
+    candidate_mae = _mae(
+        calibration_actual,
+        [prediction * candidate_shrinkage for prediction in calibration_predictions],
+    )
+    candidate_skill = (
+        (calibration_baseline_mae - candidate_mae)
+        / calibration_baseline_mae
+        * 100
+        if calibration_baseline_mae > 0
+        else 0.0
+    )
+    return {
+        "key": candidate_key,
+        "family": CANDIDATE_FAMILIES[candidate_key],
+        "mae_pct": candidate_mae,
+        "baseline_mae_pct": calibration_baseline_mae,
+        "skill_vs_baseline_pct": candidate_skill,
+        "shrinkage": candidate_shrinkage,
+    }
+
+
 def train_specialist(
     prepared: PreparedSpecialistData,
     known_through_origin: int,
@@ -434,7 +623,7 @@ def train_specialist(
     features = [prepared.features_by_origin[origin] for origin in origins]
     actual_targets = [prepared.targets_by_origin[origin] for origin in origins]
     fit_targets = [
-        _clamp(value, -spec.target_clip, spec.target_clip)
+        clamp(value, -spec.target_clip, spec.target_clip)
         for value in actual_targets
     ]
 
@@ -450,46 +639,22 @@ def train_specialist(
         calibration_actual,
         [0.0] * len(calibration_actual),
     )
-    candidate_results = []
-    for candidate_key in spec.candidates:
-        calibration_model = _fit_estimator(
-            _make_estimator(candidate_key, prepared.horizon_days),
-            features[:core_end],
-            fit_targets[:core_end],
-        )
-        calibration_predictions = _predict(
-            calibration_model,
-            features[core_end:training_end],
-            spec,
-        )
-        candidate_shrinkage = min(
-            SHRINKAGE_CANDIDATES,
-            key=lambda candidate: _mae(
+    candidate_results = fit_candidates(
+        [
+            partial(
+                _validate_candidate,
+                candidate_key,
+                spec,
+                prepared.horizon_days,
+                features[:core_end],
+                fit_targets[:core_end],
+                features[core_end:training_end],
                 calibration_actual,
-                [prediction * candidate for prediction in calibration_predictions],
-            ),
-        )
-        candidate_mae = _mae(
-            calibration_actual,
-            [prediction * candidate_shrinkage for prediction in calibration_predictions],
-        )
-        candidate_skill = (
-            (calibration_baseline_mae - candidate_mae)
-            / calibration_baseline_mae
-            * 100
-            if calibration_baseline_mae > 0
-            else 0.0
-        )
-        candidate_results.append(
-            {
-                "key": candidate_key,
-                "family": CANDIDATE_FAMILIES[candidate_key],
-                "mae_pct": candidate_mae,
-                "baseline_mae_pct": calibration_baseline_mae,
-                "skill_vs_baseline_pct": candidate_skill,
-                "shrinkage": candidate_shrinkage,
-            }
-        )
+                calibration_baseline_mae,
+            )
+            for candidate_key in spec.candidates
+        ]
+    )
 
     selected_candidate = min(candidate_results, key=lambda item: item["mae_pct"])
     selected_model_key = str(selected_candidate["key"])
@@ -614,15 +779,28 @@ def specialist_estimate_from_state(
     state: SpecialistState,
     current_features: list[float],
 ) -> dict[str, Any]:
-    raw_prediction = 0.0
-    if state.active and state.estimator is not None:
-        raw_prediction = _predict(
-            state.estimator,
-            [current_features],
-            state.spec,
-        )[0] * state.shrinkage
-
-    prediction = _clamp(
+    return specialist_estimates_from_state(state, [current_features])[0]
+
+
+def specialist_estimates_from_state(
+    state: SpecialistState,
+    features: list[list[float]],
+) -> list[dict[str, Any]]:
+    """Estimates of one fitted state for many feature rows, in one predict call."""
+    raw_predictions = [0.0] * len(features)
+    if state.active and state.estimator is not None and features:
+        raw_predictions = [
+            prediction * state.shrinkage
+            for prediction in _predict(state.estimator, features, state.spec)
+        ]
+    return [
+        _specialist_estimate(state, raw_prediction)
+        for raw_prediction in raw_predictions
+    ]
+
+
+def _specialist_estimate(state: SpecialistState, raw_prediction: float) -> dict[str, Any]:
+    prediction = clamp(
         raw_prediction,
         -state.spec.point_limit,
         state.spec.point_limit,
@@ -655,25 +833,57 @@ def specialist_estimate_from_state(
     }
 
 
+def live_specialist_state(
+    values: list[float],
+    volumes: list[float | None],
+    horizon_days: int,
+    direction_threshold: float,
+    state_key: str = "",
+    data_version: str = "",
+) -> SpecialistState:
+    """The live state fitted on the closed days of ``values``."""
+    closed_values = values[:-1]
+    closed_volumes = volumes[:-1]
+    # The market-data version names the closed candles, so the cache key no
+    # longer depends on the history length; hash the data only without it.
+    version = data_version or data_fingerprint(closed_values, closed_volumes)
+    signature = data_fingerprint(version, horizon_days, direction_threshold)
+    return LIVE_STATES.resolve(
+        "specialist",
+        state_key,
+        horizon_days,
+        closed_values,
+        signature,
+        lambda: _LIVE_STATE_CACHE.get_or_build(
+            signature,
+            lambda: _train_live_state(
+                closed_values,
+                closed_volumes,
+                horizon_days,
+                direction_threshold,
+            ),
+        ),
+    )
+
+
 def build_specialist_estimate(
     values: list[float],
     volumes: list[float | None],
     horizon_days: int,
     direction_threshold: float,
+    state_key: str = "",
+    data_version: str = "",
 ) -> dict[str, Any]:
     if len(values) < FEATURE_LOOKBACK_DAYS:
         raise ValueError("Legalább 61 napi adat szükséges a specialista modellhez.")
 
-    closed_values = tuple(float(value) for value in values[:-1])
-    closed_volumes = tuple(
-        float(value) if value is not None else None
-        for value in volumes[:-1]
-    )
-    state = _cached_live_state(
-        closed_values,
-        closed_volumes,
+    state = live_specialist_state(
+        values,
+        volumes,
         horizon_days,
         direction_threshold,
+        state_key,
+        data_version,
     )
     return specialist_estimate_from_state(
         state,
@@ -681,15 +891,17 @@ def build_specialist_estimate(
     )
 
 
-@lru_cache(maxsize=48)
-def _cached_live_state(
-    closed_values: tuple[float, ...],
-    closed_volumes: tuple[float | None, ...],
+def _train_live_state(
+    closed_values: list[float],
+    closed_volumes: list[float | None],
     horizon_days: int,
     direction_threshold: float,
 ) -> SpecialistState:
-    values = list(closed_values)
-    volumes = list(closed_volumes)
+    values = [float(value) for value in closed_values]
+    volumes = [
+        float(value) if value is not None else None
+        for value in closed_volumes
+    ]
     prepared = prepare_specialist_data(values, volumes, horizon_days)
     closed_origin = len(values) - 1
     return train_specialist(
@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Union
+
+import numpy as np
+
+
+DAY_MS = 86_400_000
+
+
+@dataclass(frozen=True)
+class TimeSeries:
+    """Epoch-millisecond timestamps with float values in two flat arrays.
+
+    Slicing returns read-only views, so sharing a series between requests,
+    caches and worker threads never copies the underlying buffers.
+    """
+
+    timestamps: np.ndarray
+    values: np.ndarray
+
+    def __post_init__(self) -> None:
+        if self.timestamps.shape != self.values.shape:
+            raise ValueError("Timestamps and values must have the same length")
+        self.timestamps.flags.writeable = False
+        self.values.flags.writeable = False
+
+    @classmethod
+    def empty(cls) -> "TimeSeries":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def from_arrays(cls, timestamps: Any, values: Any) -> "TimeSeries":
+        return cls(
+            np.asarray(timestamps, dtype=np.int64),
+            np.asarray(values, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_points(cls, series: "SeriesLike | None") -> "TimeSeries":
+        if isinstance(series, TimeSeries):
+            return series
+        timestamps = []
+        values = []
+        for item in series or []:
+            if not isinstance(item, (list, tuple)) or len(item) < 2:
+                continue
+            try:
+                timestamp = int(float(item[0]))
+                value = float(item[1])
+            except (TypeError, ValueError, OverflowError):
+                continue
+            timestamps.append(timestamp)
+            values.append(value)
+        return cls.from_arrays(timestamps, values)
+
+    def __len__(self) -> int:
+        return int(self.values.shape[0])
+
+    def __getitem__(self, index: slice) -> "TimeSeries":
+        if not isinstance(index, slice):
+            raise TypeError("TimeSeries only supports slice indexing")
+        return TimeSeries(self.timestamps[index], self.values[index])
+
+    @property
+    def days(self) -> np.ndarray:
+        return self.timestamps // DAY_MS
+
+    def daily(self) -> "TimeSeries":
+        """Last finite, non-negative observation of every UTC day, in day order."""
+        valid = np.isfinite(self.values) & (self.values >= 0)
+        timestamps = self.timestamps[valid]
+        values = self.values[valid]
+        if not len(values):
+            return TimeSeries.empty()
+        days = timestamps // DAY_MS
+        order = np.argsort(days, kind="stable")
+        ordered_days = days[order]
+        last_of_day = np.append(ordered_days[1:] != ordered_days[:-1], True)
+        keep = order[last_of_day]
+        return TimeSeries(timestamps[keep], values[keep])
+
+    def isoformat(self, index: int) -> str:
+        return datetime.fromtimestamp(
+            int(self.timestamps[index]) / 1000,
+            timezone.utc,
+        ).isoformat()
+
+    def to_points(self) -> list[list[float]]:
+        return [
+            [timestamp, value]
+            for timestamp, value in zip(self.timestamps.tolist(), self.values.tolist())
+        ]
+
+
+SeriesLike = Union[TimeSeries, Iterable[Any]]
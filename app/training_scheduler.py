@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any
+
+from app.assets import ANALYSIS_ASSETS
+from app.dashboard import load_forecast_history, refit_from_history
+from app.forecast import DIRECTION_THRESHOLDS
+from app.governor import BACKGROUND, ComputeGovernor
+from app.intraday_models import INTRADAY_HORIZON_HOURS
+from app.live_states import LIVE_STATES, REFRESHING
+from app.market_data import MarketDataService
+from app.model_lab import refit_intraday_state
+
+
+DAILY_HORIZONS = (1, 7, 30)
+DAILY_FAMILIES = ("specialist", "probability")
+INTRADAY_FAMILIES = ("intraday_direction", "intraday_risk")
+INTRADAY_HISTORY_HOURS = 6480
+
+
+def _closed_marker(points: list[Any]) -> Any:
+    if len(points) < 2:
+        return None
+    closed = points[-2]
+    return closed.get("timestamp") if isinstance(closed, dict) else closed[0]
+
+
+def _refits(
+    marker_moved: bool,
+    stale: set[tuple[str, int]],
+    families: tuple[str, ...],
+    horizons: Any,
+) -> list[tuple[str, int]]:
+    # A new close moves every state of the asset; otherwise only the slots
+    # requests served from an outdated state are refit.
+    if marker_moved:
+        return [(family, horizon) for horizon in horizons for family in families]
+    return sorted(slot for slot in stale if slot[0] in families)
+
+
+class TrainingScheduler:
+    """Refits every live model state after a candle closes, off the request path.
+
+    Each poll compares the last closed daily and hourly candle of every asset
+    with the one its states were trained on and refits only what moved, one
+    model family and horizon per fit; between closes it only refits the
+    slots requests marked stale. Fits
+    run in worker threads, at most ``workers`` at a time, while requests keep
+    answering from the previous ready state. With a governor, fits also queue
+    behind interactive work at background priority.
+    """
+
+    def __init__(
+        self,
+        service: MarketDataService,
+        workers: int = 1,
+        poll_seconds: float = 60.0,
+        start_delay_seconds: float = 30.0,
+        intraday: bool = True,
+        governor: ComputeGovernor | None = None,
+    ):
+        self._service = service
+        self._governor = governor
+        self._workers = max(1, workers)
+        self._semaphore = asyncio.Semaphore(self._workers)
+        self._poll_seconds = poll_seconds
+        self._start_delay_seconds = start_delay_seconds
+        self._intraday = intraday
+        self._trained: dict[tuple[str, str], Any] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._runs = 0
+        self._fits = 0
+        self._errors = 0
+        self._last_error: str | None = None
+        self._last_run_at: str | None = None
+
+    async def start(self) -> None:
+        LIVE_STATES.background = True
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        LIVE_STATES.background = False
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        await asyncio.sleep(self._start_delay_seconds)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self._poll_seconds)
+
+    async def run_once(self) -> int:
+        stale: dict[str, set[tuple[str, int]]] = {}
+        for family, key, horizon in LIVE_STATES.stale_slots():
+            stale.setdefault(key, set()).add((family, horizon))
+        jobs = []
+        for coin in ANALYSIS_ASSETS:
+            jobs.append(self._refresh_daily(coin, stale.get(coin, set())))
+            if self._intraday:
+                jobs.append(self._refresh_intraday(coin, stale.get(coin, set())))
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        fits = 0
+        for result in results:
+            if isinstance(result, Exception):
+                self._errors += 1
+                self._last_error = f"{type(result).__name__}: {result}"
+            else:
+                fits += result
+        self._runs += 1
+        self._fits += fits
+        self._last_run_at = datetime.now(timezone.utc).isoformat()
+        return fits
+
+    async def _fit(self, function, *args) -> Any:
+        async with self._semaphore:
+            token = REFRESHING.set(True)
+            try:
+                if self._governor is not None:
+                    return await self._governor.run(BACKGROUND, function, *args)
+                return await asyncio.to_thread(function, *args)
+            finally:
+                REFRESHING.reset(token)
+
+    async def _refresh_daily(self, coin: str, stale: set[tuple[str, int]]) -> int:
+        chart = await load_forecast_history(self._service, coin)
+        benchmark = (
+            chart
+            if coin == "bitcoin"
+            else await load_forecast_history(self._service, "bitcoin")
+        )
+        marker = (
+            _closed_marker(chart.get("prices", [])),
+            _closed_marker(benchmark.get("prices", [])),
+        )
+        if marker[0] is None:
+            return 0
+
+        fits = 0
+        moved = self._trained.get(("daily", coin)) != marker
+        for family, horizon in _refits(moved, stale, DAILY_FAMILIES, DAILY_HORIZONS):
+            try:
+                await self._fit(
+                    refit_from_history,
+                    chart,
+                    benchmark,
+                    family,
+                    horizon,
+                    coin,
+                )
+            except ValueError:
+                continue
+            fits += 1
+        self._trained[("daily", coin)] = marker
+        return fits
+
+    async def _refresh_intraday(self, coin: str, stale: set[tuple[str, int]]) -> int:
+        history = await self._service.forecast_intraday_history(
+            coin,
+            hours=INTRADAY_HISTORY_HOURS,
+        )
+        candles = history.get("candles", [])
+        marker = _closed_marker(candles)
+        if marker is None:
+            return 0
+
+        fits = 0
+        moved = self._trained.get(("intraday", coin)) != marker
+        refits = _refits(moved, stale, INTRADAY_FAMILIES, INTRADAY_HORIZON_HOURS)
+        for family, horizon in refits:
+            try:
+                await self._fit(
+                    refit_intraday_state,
+                    family,
+                    candles,
+                    horizon,
+                    DIRECTION_THRESHOLDS[horizon],
+                    coin,
+                )
+            except ValueError:
+                continue
+            fits += 1
+        self._trained[("intraday", coin)] = marker
+        return fits
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "enabled": self._task is not None,
+            "workers": self._workers,
+            "runs": self._runs,
+            "fits": self._fits,
+            "errors": self._errors,
+            "last_error": self._last_error,
+            "last_run_at": self._last_run_at,
+            **LIVE_STATES.status(),
+        }
@@ -1,6 +1,7 @@
 import asyncio
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+import json
 import secrets
 
 from fastapi import (
@@ -14,17 +15,26 @@ from fastapi import (
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.async_jobs import AsyncJobCache
 from app.assets import ANALYSIS_LIMIT, analysis_asset_list
-from app.backtest import evaluate_journal, walk_forward_backtest
+from app.backtest import MAX_BACKTEST_SAMPLES, evaluate_journal
+from app.backtest_store import BacktestStore, incremental_backtest
+from app.batch_backtest import load_batch_inputs, stream_batch_backtest
 from app.cache import AsyncTTLCache
+from app.candle_store import CandleStore
+from app.compute import ComputePool
 from app.config import settings
 from app.dashboard import (
+    DASHBOARD_CACHE_SECONDS,
+    FORECAST_HISTORY_DAYS,
+    MAX_DASHBOARD_ENTRIES,
     SUPPORTED_COINS,
     build_dashboard,
     build_indicator_summary,
+    forecast_data_version,
+    history_series,
     load_forecast_history,
     normalize_market_rows,
     normalize_news,
@@ -32,33 +42,89 @@ from app.dashboard import (
 from app.data_health import build_data_health_payload
 from app.forecast import DIRECTION_THRESHOLDS, MODEL_VERSION
 from app.forecast_store import ForecastStore
+from app.governor import ANALYTICS, ComputeGovernor, limit_blas_threads
+from app.live_states import LIVE_STATES, REFRESHING
 from app.market_data import MarketDataService, UpstreamServiceError
 from app.model_lab import build_model_lab
+from app.model_state_store import ModelStateStore
 from app.news import aggregate_news_sentiment
 from app.probability_models import probability_registry_payload
 from app.publication_schedule import publication_schedule_payload
 from app.snapshot_schedule import scheduled_snapshot_target
 from app.specialist_models import specialist_registry_payload
+from app.timeseries import TimeSeries
 from app.training_readiness import build_training_readiness
+from app.training_scheduler import TrainingScheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    service = MarketDataService()
     forecast_store = ForecastStore(
         settings.forecast_db_path,
         settings.forecast_database_url,
     )
+    candle_store = CandleStore(
+        settings.forecast_db_path,
+        settings.forecast_database_url,
+    )
+    model_state_store = ModelStateStore(
+        settings.forecast_db_path,
+        MODEL_VERSION,
+        settings.forecast_database_url,
+    )
+    backtest_store = BacktestStore(
+        settings.forecast_db_path,
+        MODEL_VERSION,
+        settings.forecast_database_url,
+    )
     await asyncio.to_thread(forecast_store.initialize)
+    await asyncio.to_thread(candle_store.initialize)
+    await asyncio.to_thread(model_state_store.initialize)
+    await asyncio.to_thread(backtest_store.initialize)
+    LIVE_STATES.store = model_state_store
+    service = MarketDataService(candle_store)
     await service.start()
     app.state.market_data = service
     app.state.forecast_store = forecast_store
-    app.state.analytics_cache = AsyncTTLCache(settings.stale_cache_seconds)
+    app.state.backtest_store = backtest_store
+    app.state.analytics_cache = AsyncTTLCache(
+        settings.stale_cache_seconds,
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_mb * 1024 * 1024,
+    )
     app.state.analytics_jobs = AsyncJobCache()
+    app.state.dashboard_cache = AsyncTTLCache(
+        DASHBOARD_CACHE_SECONDS,
+        max_entries=MAX_DASHBOARD_ENTRIES,
+        max_bytes=settings.cache_max_mb * 1024 * 1024,
+    )
+    governor = ComputeGovernor(
+        settings.compute_slots,
+        settings.model_thread_budget,
+        admission_wait_seconds=settings.forecast_admission_wait_seconds,
+    )
+    app.state.governor = governor
+    limit_blas_threads(governor.threads_per_job)
+    app.state.compute = ComputePool(settings.compute_workers, governor=governor)
     app.state.snapshot_lock = asyncio.Lock()
+    app.state.batch_backtest_lock = asyncio.Lock()
+    scheduler = TrainingScheduler(
+        service,
+        workers=settings.training_workers,
+        poll_seconds=settings.training_poll_seconds,
+        start_delay_seconds=settings.training_start_delay_seconds,
+        intraday=settings.training_intraday,
+        governor=governor,
+    )
+    app.state.training_scheduler = scheduler
+    if settings.training_scheduler_enabled:
+        await scheduler.start()
     try:
         yield
     finally:
+        await scheduler.close()
+        LIVE_STATES.store = None
+        app.state.compute.close()
         await service.close()
 
 
@@ -98,6 +164,19 @@ def journal_store(request: Request) -> ForecastStore:
     return request.app.state.forecast_store
 
 
+def journaled_forecast_loader(request: Request, coin: str, horizon: int):
+    async def load() -> dict | None:
+        return await asyncio.to_thread(
+            journal_store(request).latest_forecast,
+            coin,
+            horizon,
+            MODEL_VERSION,
+            settings.snapshot_stale_after_minutes,
+        )
+
+    return load
+
+
 async def record_dashboard_forecast(
     request: Request,
     payload: dict,
@@ -105,6 +184,9 @@ async def record_dashboard_forecast(
     selected = payload["selected"]
     forecast = selected["forecast"]
     store = journal_store(request)
+    if forecast.get("stale"):
+        # A replayed journal entry is not a new forecast.
+        return {"forecast": False, "feature_snapshot": False, "outcomes_settled": 0}
 
     def persist() -> dict[str, bool]:
         forecast_created = store.record(
@@ -180,22 +262,26 @@ async def health(request: Request):
         "status": "ok",
         "version": MODEL_VERSION,
         "storage": journal_store(request).storage_status(),
+        "cache": {
+            "market": market_service(request).cache_stats(),
+            "analytics": request.app.state.analytics_cache.stats(),
+            "dashboard": request.app.state.dashboard_cache.stats(),
+        },
+        "training": request.app.state.training_scheduler.status(),
+        "compute": {
+            **request.app.state.compute.status(),
+            "governor": request.app.state.governor.status(),
+        },
     }
 
 
-@app.post("/api/v1/internal/snapshots/collect")
-async def collect_snapshot(
-    request: Request,
-    coin: str | None = Query(default=None),
-    horizon: int | None = Query(default=None),
-    snapshot_token: str | None = Header(default=None, alias="X-Snapshot-Token"),
-):
+def internal_token_error(
+    snapshot_token: str | None,
+    disabled_detail: str,
+) -> JSONResponse | None:
     configured_token = settings.snapshot_token
     if not configured_token:
-        return JSONResponse(
-            status_code=503,
-            content={"detail": "A snapshot gyujto nincs aktivalva."},
-        )
+        return JSONResponse(status_code=503, content={"detail": disabled_detail})
     if snapshot_token is None or not secrets.compare_digest(
         snapshot_token,
         configured_token,
@@ -204,6 +290,22 @@ async def collect_snapshot(
             status_code=401,
             content={"detail": "Ervenytelen snapshot token."},
         )
+    return None
+
+
+@app.post("/api/v1/internal/snapshots/collect")
+async def collect_snapshot(
+    request: Request,
+    coin: str | None = Query(default=None),
+    horizon: int | None = Query(default=None),
+    snapshot_token: str | None = Header(default=None, alias="X-Snapshot-Token"),
+):
+    token_error = internal_token_error(
+        snapshot_token,
+        "A snapshot gyujto nincs aktivalva.",
+    )
+    if token_error is not None:
+        return token_error
     if (coin is None) != (horizon is None):
         return JSONResponse(
             status_code=422,
@@ -235,11 +337,18 @@ async def collect_snapshot(
         )
 
     async with lock:
-        payload = await build_dashboard(
-            market_service(request),
-            selected_coin,
-            selected_horizon,
-        )
+        # Journaled forecasts must come from states fitted on every closed
+        # candle, never from the previous state a live request may reuse.
+        refreshing = REFRESHING.set(True)
+        try:
+            payload = await build_dashboard(
+                market_service(request),
+                selected_coin,
+                selected_horizon,
+                governor=request.app.state.governor,
+            )
+        finally:
+            REFRESHING.reset(refreshing)
         persistence = await record_dashboard_forecast(request, payload)
         created = {
             "forecast": bool(persistence["forecast"]),
@@ -272,6 +381,62 @@ async def collect_snapshot(
     }
 
 
+@app.post("/api/v1/internal/backtests/batch")
+async def batch_backtest(
+    request: Request,
+    coins: list[str] | None = Query(default=None),
+    horizons: list[int] = Query(default=[1, 7, 30]),
+    samples: int = Query(default=MAX_BACKTEST_SAMPLES, ge=1, le=FORECAST_HISTORY_DAYS),
+    minimum_refit_days: int | None = Query(default=None, ge=1),
+    snapshot_token: str | None = Header(default=None, alias="X-Snapshot-Token"),
+):
+    token_error = internal_token_error(
+        snapshot_token,
+        "A batch visszameres nincs aktivalva.",
+    )
+    if token_error is not None:
+        return token_error
+    try:
+        selected_coins = [validate_coin(coin) for coin in coins or SUPPORTED_COINS]
+    except ValueError as exc:
+        return JSONResponse(status_code=422, content={"detail": str(exc)})
+    selected_horizons = sorted(set(horizons))
+    if not set(selected_horizons) <= {1, 7, 30}:
+        return JSONResponse(
+            status_code=422,
+            content={"detail": "Az idotav 1, 7 vagy 30 nap lehet."},
+        )
+
+    lock: asyncio.Lock = request.app.state.batch_backtest_lock
+    if lock.locked():
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "Egy batch visszameres mar folyamatban van."},
+        )
+    inputs = await load_batch_inputs(market_service(request), selected_coins)
+
+    async def stream():
+        # The lock is taken by the stream itself, so it is released whenever
+        # the stream ends, also when the client disconnects mid-batch. A
+        # request that slipped past the check above waits for the running one.
+        async with lock:
+            async for record in stream_batch_backtest(
+                request.app.state.compute,
+                inputs,
+                selected_horizons,
+                max_samples=samples,
+                minimum_refit_days=minimum_refit_days,
+                refit_workers=settings.backtest_refit_workers,
+            ):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 @app.get("/api/v1/dashboard")
 async def dashboard(
     request: Request,
@@ -290,8 +455,19 @@ async def dashboard(
             content={"detail": "Az időtáv 1, 7 vagy 30 nap lehet."},
         )
 
-    response.headers["Cache-Control"] = "public, max-age=30, stale-while-revalidate=120"
-    payload = await build_dashboard(market_service(request), selected_coin, horizon)
+    payload = await build_dashboard(
+        market_service(request),
+        selected_coin,
+        horizon,
+        governor=request.app.state.governor,
+        stale_loader=journaled_forecast_loader(request, selected_coin, horizon),
+        cache=request.app.state.dashboard_cache,
+    )
+    response.headers["Cache-Control"] = (
+        "no-store"
+        if payload["selected"]["forecast"].get("stale")
+        else "public, max-age=30, stale-while-revalidate=120"
+    )
     await record_dashboard_forecast(request, payload)
     return payload
 
@@ -313,7 +489,14 @@ async def forecast(
             content={"detail": "Az időtáv 1, 7 vagy 30 nap lehet."},
         )
 
-    payload = await build_dashboard(market_service(request), selected_coin, horizon)
+    payload = await build_dashboard(
+        market_service(request),
+        selected_coin,
+        horizon,
+        governor=request.app.state.governor,
+        stale_loader=journaled_forecast_loader(request, selected_coin, horizon),
+        cache=request.app.state.dashboard_cache,
+    )
     await record_dashboard_forecast(request, payload)
     return {
         "generated_at": payload["generated_at"],
@@ -378,29 +561,40 @@ async def forecast_analytics(
         live_performance_task,
     )
     benchmark_chart = chart if benchmark_chart is None else benchmark_chart
+    series = history_series(chart)
     prices = chart.get("prices", [])
 
-    last_point = prices[-1] if prices else [0, 0]
     benchmark_prices = benchmark_chart.get("prices", [])
-    benchmark_last_point = benchmark_prices[-1] if benchmark_prices else [0, 0]
-    funding_rates = chart.get("funding_rates", [])
-    funding_last_point = funding_rates[-1] if funding_rates else [0, 0]
-    backtest_cache_key = (
-        f"{selected_coin}:{horizon}:{len(prices)}:{last_point[0]}:"
-        f"{last_point[1]}:{benchmark_last_point[0]}:{benchmark_last_point[1]}:"
-        f"{funding_last_point[0]}:{funding_last_point[1]}:{MODEL_VERSION}"
+    # The backtest only evaluates closed days, so live ticks keep the key.
+    closed_point = prices[-2] if len(prices) > 1 else [0, 0]
+    benchmark_closed_point = (
+        benchmark_prices[-2] if len(benchmark_prices) > 1 else [0, 0]
+    )
+    data_version = forecast_data_version(chart, benchmark_chart) or (
+        f"{len(prices)}:{closed_point[0]}:{closed_point[1]}:"
+        f"{benchmark_closed_point[0]}:{benchmark_closed_point[1]}"
     )
+    backtest_cache_key = f"{selected_coin}:{horizon}:{data_version}:{MODEL_VERSION}"
+
+    governor = request.app.state.governor
 
     async def calculate_backtest():
-        return await asyncio.to_thread(
-            walk_forward_backtest,
-            prices,
+        return await incremental_backtest(
+            request.app.state.backtest_store,
+            request.app.state.compute,
+            selected_coin,
             horizon,
-            chart.get("total_volumes", []),
+            series["prices"],
+            series["total_volumes"],
+            market_prices=(
+                series["prices"]
+                if benchmark_chart is chart
+                else TimeSeries.from_points(benchmark_prices)
+            ),
+            funding_rates=series["funding_rates"],
             max_samples=60,
-            market_prices=benchmark_chart.get("prices", []),
-            funding_rates=funding_rates,
             minimum_refit_days=60,
+            refit_workers=settings.backtest_refit_workers,
         )
 
     try:
@@ -410,7 +604,7 @@ async def forecast_analytics(
                 settings.chart_cache_seconds,
                 calculate_backtest,
             ),
-            asyncio.to_thread(evaluate_journal, history, prices),
+            governor.run(ANALYTICS, evaluate_journal, history, series["prices"]),
         )
         if job_status.state == "pending":
             job_status = await request.app.state.analytics_jobs.wait(
@@ -487,11 +681,13 @@ async def forecast_model_lab(
     )
 
     async def calculate_lab():
-        return await asyncio.to_thread(
+        return await request.app.state.governor.run(
+            ANALYTICS,
             build_model_lab,
             candles,
             horizon,
             DIRECTION_THRESHOLDS[horizon],
+            selected_coin,
         )
 
     try:
@@ -591,6 +787,11 @@ async def forecast_registry(
         "horizon_days": horizon,
         "probability_models": probability_registry_payload(),
         "specialist_models": specialist_registry_payload(),
+        "live_states": [
+            item
+            for item in LIVE_STATES.describe(selected_coin)
+            if item["horizon_days"] == horizon
+        ],
         "feature_store": feature_store,
         "storage": storage,
         "training_readiness": build_training_readiness(
@@ -674,7 +875,13 @@ async def search(request: Request, query: str = Query(min_length=2, max_length=4
 # Backward-compatible routes for the currently deployed frontend.
 @app.get("/market-overview")
 async def legacy_market_overview(request: Request):
-    payload = await build_dashboard(market_service(request), "bitcoin", 7)
+    payload = await build_dashboard(
+        market_service(request),
+        "bitcoin",
+        7,
+        governor=request.app.state.governor,
+        cache=request.app.state.dashboard_cache,
+    )
     market = payload["market"]
     forecast_data = payload["selected"]["forecast"]
     return {
@@ -717,7 +924,14 @@ async def websocket_endpoint(websocket: WebSocket):
     service: MarketDataService = websocket.app.state.market_data
     try:
         while True:
-            payload = await build_dashboard(service, "bitcoin", 7, include_news=False)
+            payload = await build_dashboard(
+                service,
+                "bitcoin",
+                7,
+                include_news=False,
+                governor=websocket.app.state.governor,
+                cache=websocket.app.state.dashboard_cache,
+            )
             await websocket.send_json(
                 {
                     "generated_at": payload["generated_at"],
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import json
+
+from app.backtest import MAX_BACKTEST_SAMPLES
+from app.batch_backtest import load_batch_inputs, stream_batch_backtest
+from app.compute import ComputePool
+from app.dashboard import SUPPORTED_COINS
+from app.governor import limit_blas_threads
+from app.market_data import MarketDataService
+
+
+async def run(
+    coins: list[str],
+    horizons: list[int],
+    samples: int,
+    minimum_refit_days: int | None,
+    workers: int,
+    refit_workers: int,
+) -> None:
+    service = MarketDataService()
+    compute = ComputePool(workers)
+    limit_blas_threads(compute.governor.threads_per_job)
+    await service.start()
+    try:
+        inputs = await load_batch_inputs(service, coins)
+        async for record in stream_batch_backtest(
+            compute,
+            inputs,
+            horizons,
+            max_samples=samples,
+            minimum_refit_days=minimum_refit_days,
+            refit_workers=refit_workers,
+        ):
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    finally:
+        compute.close()
+        await service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Walk-forward backtest every asset and horizon, printing one JSON "
+            "summary per dataset as it finishes."
+        )
+    )
+    parser.add_argument(
+        "--coins",
+        nargs="+",
+        choices=sorted(SUPPORTED_COINS),
+        default=list(SUPPORTED_COINS),
+    )
+    parser.add_argument(
+        "--horizons",
+        nargs="+",
+        type=int,
+        choices=(1, 7, 30),
+        default=[1, 7, 30],
+    )
+    parser.add_argument("--samples", type=int, default=MAX_BACKTEST_SAMPLES)
+    parser.add_argument("--minimum-refit-days", type=int, default=None)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Worker processes for the assets; 0 runs them on threads in-process.",
+    )
+    parser.add_argument(
+        "--refit-workers",
+        type=int,
+        default=1,
+        help="Threads training the refits of one dataset.",
+    )
+    arguments = parser.parse_args()
+    asyncio.run(
+        run(
+            arguments.coins,
+            sorted(set(arguments.horizons)),
+            max(1, arguments.samples),
+            arguments.minimum_refit_days,
+            arguments.workers,
+            arguments.refit_workers,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
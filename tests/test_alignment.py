@@ -0,0 +1,38 @@
+from app.alignment import align_daily, matched_or_fallback
+from app.timeseries import DAY_MS, TimeSeries
+
+
+def test_alignment_matches_days_and_forward_fills_market_prices():
+    prices = TimeSeries.from_points([[day * DAY_MS, 100.0 + day] for day in range(5)])
+    alignment = align_daily(
+        prices,
+        volumes=[[1 * DAY_MS + 60_000, 10.0], [3 * DAY_MS, 0.0]],
+        funding_rates=[[4 * DAY_MS, 0.01]],
+        market_prices=[[1 * DAY_MS, 50.0], [3 * DAY_MS, 55.0], [4 * DAY_MS, 0.0]],
+    )
+
+    assert alignment.volume_list() == [None, 10.0, None, 0.0, None]
+    assert alignment.funding_list() == [None, None, None, None, 0.01]
+    assert alignment.market_values.tolist() == [100.0, 50.0, 50.0, 55.0, 55.0]
+    assert alignment.market_observed.tolist() == [False, True, True, True, True]
+    assert alignment.market_matches == 2
+    assert alignment.market_provided is True
+
+
+def test_alignment_is_reused_for_unchanged_inputs():
+    prices = TimeSeries.from_points([[day * DAY_MS, 10.0] for day in range(3)])
+    volumes = [[day * DAY_MS, 1.0] for day in range(3)]
+
+    first = align_daily(prices, volumes)
+    second = align_daily(prices, [row[:] for row in volumes])
+    changed = align_daily(prices, volumes[:-1])
+
+    assert second is first
+    assert changed is not first
+    assert changed.volume_list() == [1.0, 1.0, None]
+
+
+def test_market_fallback_requires_full_positive_coverage():
+    assert matched_or_fallback([2.0, 3.0], [1.0, 1.0]) == [2.0, 3.0]
+    assert matched_or_fallback([2.0, 0.0], [1.0, 1.0]) == [1.0, 1.0]
+    assert matched_or_fallback([2.0], [1.0, 1.0]) == [1.0, 1.0]
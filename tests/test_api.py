@@ -1,9 +1,12 @@
+import json
 from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 
+import pytest
 from fastapi.testclient import TestClient
 
 import main
+from app.backtest_store import BacktestStore
 from app.forecast_store import ForecastStore
 from app.market_data import UpstreamServiceError
 from main import app
@@ -143,6 +146,20 @@ class HyperliquidMarketCatalogData(BinanceMarketCatalogData):
         return rows
 
 
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    # The app opens its stores on startup; keep them out of the repository.
+    monkeypatch.setattr(
+        main,
+        "settings",
+        replace(
+            main.settings,
+            forecast_db_path=str(tmp_path / "app.sqlite3"),
+            forecast_database_url="",
+        ),
+    )
+
+
 def test_health_endpoint():
     with TestClient(app) as client:
         response = client.get("/health")
@@ -249,6 +266,8 @@ def test_forecast_analytics_endpoint(tmp_path):
     with TestClient(app) as client:
         app.state.market_data = AnalyticsMarketData()
         app.state.forecast_store = store
+        app.state.backtest_store = BacktestStore(tmp_path / "forecast.sqlite3", "5.1.0")
+        app.state.backtest_store.initialize()
         response = client.get("/api/v1/forecast/analytics?coin=bitcoin&horizon=7")
 
     assert response.status_code == 200
@@ -417,6 +436,33 @@ def test_snapshot_collector_rejects_invalid_token(monkeypatch):
     assert response.status_code == 401
 
 
+def test_batch_backtest_streams_one_summary_per_dataset(monkeypatch):
+    monkeypatch.setattr(
+        main,
+        "settings",
+        replace(main.settings, snapshot_token="collector-secret"),
+    )
+
+    with TestClient(app) as client:
+        app.state.market_data = AnalyticsMarketData()
+        response = client.post(
+            "/api/v1/internal/backtests/batch"
+            "?coins=bitcoin&coins=ethereum&horizons=7&samples=5",
+            headers={"X-Snapshot-Token": "collector-secret"},
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    datasets = records[:-1]
+    assert sorted(record["coin"] for record in datasets) == ["bitcoin", "ethereum"]
+    assert {record["status"] for record in datasets} == {"ready"}
+    assert all(record["summary"]["samples"] == 5 for record in datasets)
+    assert records[-1]["status"] == "complete"
+    assert records[-1]["completed"] == 2
+    assert not app.state.batch_backtest_lock.locked()
+
+
 def test_snapshot_collector_persists_manual_target(tmp_path, monkeypatch):
     store = ForecastStore(tmp_path / "forecast.sqlite3")
     store.initialize()
@@ -426,7 +472,7 @@ def test_snapshot_collector_persists_manual_target(tmp_path, monkeypatch):
         replace(main.settings, snapshot_token="collector-secret"),
     )
 
-    async def build_test_dashboard(_service, coin, horizon):
+    async def build_test_dashboard(_service, coin, horizon, **_options):
         return snapshot_dashboard(coin, horizon)
 
     monkeypatch.setattr(main, "build_dashboard", build_test_dashboard)
@@ -467,7 +513,7 @@ def test_snapshot_collector_uses_scheduled_target(tmp_path, monkeypatch):
 
     monkeypatch.setattr(main, "scheduled_snapshot_target", lambda: Target())
 
-    async def build_test_dashboard(_service, coin, horizon):
+    async def build_test_dashboard(_service, coin, horizon, **_options):
         payload = snapshot_dashboard(coin, horizon)
         payload["selected"]["symbol"] = "ETH"
         return payload
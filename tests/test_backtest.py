@@ -1,7 +1,11 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 from math import pi, sin
 
-from app.backtest import evaluate_journal, walk_forward_backtest
+from app.backtest import evaluate_journal, extend_walk_forward, walk_forward_backtest
+from app.backtest_store import BacktestStore, incremental_backtest, matching_rows
+from app.compute import ComputePool
+from app.timeseries import TimeSeries
 
 
 def synthetic_prices(days: int = 180, daily_change: float = 0.003):
@@ -104,3 +108,99 @@ def test_backtest_reports_reserved_challenger_metrics():
     assert challenger["samples"] == 12
     assert 0 <= challenger["brier_score"] <= 1
     assert challenger["model_usage"]
+
+
+def test_incremental_backtest_only_adds_newly_closed_anchors(tmp_path):
+    prices = synthetic_prices(days=182)
+    store = BacktestStore(tmp_path / "forecast.sqlite3", "test")
+    store.initialize()
+    compute = ComputePool()
+
+    def run(points):
+        return asyncio.run(
+            incremental_backtest(
+                store,
+                compute,
+                "bitcoin",
+                7,
+                TimeSeries.from_points(points),
+                TimeSeries.empty(),
+                market_prices=TimeSeries.empty(),
+                funding_rates=TimeSeries.empty(),
+                max_samples=30,
+                minimum_refit_days=60,
+            )
+        )
+
+    first = run(prices[:181])
+    assert first == walk_forward_backtest(
+        prices[:180],
+        horizon_days=7,
+        max_samples=30,
+        minimum_refit_days=60,
+    )
+    first_fit_day = store.load("bitcoin", 7, 30).refits.specialist_day
+
+    second = run(prices)
+    stored = store.load("bitcoin", 7, 200)
+    assert len(stored.rows) == 31
+    assert stored.refits.specialist_day == first_fit_day
+    assert second["summary"]["samples"] == 30
+    assert second["recent_results"][1] == first["recent_results"][0]
+    assert run(prices) == second
+
+
+
+def test_incremental_backtest_recomputes_rows_after_a_revised_close(tmp_path):
+    prices = synthetic_prices(days=181)
+    store = BacktestStore(tmp_path / "forecast.sqlite3", "test")
+    store.initialize()
+
+    def run(points):
+        return asyncio.run(
+            incremental_backtest(
+                store,
+                ComputePool(),
+                "bitcoin",
+                7,
+                TimeSeries.from_points(points),
+                TimeSeries.empty(),
+                market_prices=TimeSeries.empty(),
+                funding_rates=TimeSeries.empty(),
+                max_samples=30,
+                minimum_refit_days=60,
+            )
+        )
+
+    run(prices)
+    before = store.load("bitcoin", 7, 200).rows
+    revised = [row[:] for row in prices]
+    revised[165][1] *= 1.02
+    kept = matching_rows(before, TimeSeries.from_points(revised))
+    run(revised)
+    after = store.load("bitcoin", 7, 200).rows
+
+    assert 0 < kept < len(before) == len(after)
+    assert after[:kept] == before[:kept]
+    assert after[kept]["forecast_at"] == before[kept]["forecast_at"]
+    assert after[kept] != before[kept]
+    assert matching_rows(after, TimeSeries.from_points(revised)) == len(after)
+
+
+def test_parallel_refits_match_serial_walk_forward():
+    prices = [
+        [timestamp, price * (1 + 0.04 * sin(offset * 2 * pi / 23))]
+        for offset, (timestamp, price) in enumerate(synthetic_prices(days=240))
+    ]
+    serial = extend_walk_forward(prices, 7, max_samples=40, minimum_refit_days=14)
+    parallel = extend_walk_forward(
+        prices,
+        7,
+        max_samples=40,
+        minimum_refit_days=14,
+        refit_workers=3,
+    )
+
+    assert parallel.rows == serial.rows
+    assert parallel.refits.specialist_day == serial.refits.specialist_day
+    assert parallel.refits.probability_day == serial.refits.probability_day
@@ -0,0 +1,150 @@
+import asyncio
+
+import numpy as np
+
+import app.cache as cache_module
+from app.cache import AsyncTTLCache, LRUCache, data_fingerprint
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_expired_entry_is_served_while_background_refresh_runs(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "monotonic", clock)
+    cache = AsyncTTLCache(stale_seconds=300, serve_stale=True)
+    release = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(clock.now)
+        if len(calls) > 1:
+            await release.wait()
+        return len(calls)
+
+    async def scenario():
+        assert await cache.get_or_set("prices", 60, loader) == 1
+        clock.now += 90
+        assert await cache.get_or_set("prices", 60, loader) == 1
+        assert await cache.get_or_set("prices", 60, loader) == 1
+        release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get_or_set("prices", 60, loader) == 2
+        clock.now += 400
+        assert await cache.get_or_set("prices", 60, loader) == 3
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 3
+
+
+def test_hot_key_is_reloaded_before_expiry_and_errors_keep_stale_value(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "monotonic", clock)
+    cache = AsyncTTLCache(stale_seconds=120, refresh_ahead_seconds=10)
+    results = iter([1, 2, RuntimeError("upstream down")])
+
+    async def loader():
+        result = next(results)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def scenario():
+        assert await cache.get_or_set("chart", 60, loader) == 1
+        clock.now += 55
+        assert await cache.get_or_set("chart", 60, loader) == 1
+        await asyncio.sleep(0)
+        assert await cache.get_or_set("chart", 60, loader) == 2
+        clock.now += 61
+        assert await cache.get_or_set("chart", 60, loader, stale_seconds=90) == 2
+        await cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_callers_waiting_on_a_failed_load_share_its_error():
+    cache = AsyncTTLCache()
+    calls = []
+
+    async def loader():
+        calls.append(len(calls))
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+        return "fresh"
+
+    async def scenario():
+        burst = await asyncio.gather(
+            *(cache.get_or_set("chart", 60, loader) for _ in range(4)),
+            return_exceptions=True,
+        )
+        return burst, await cache.get_or_set("chart", 60, loader)
+
+    burst, retried = asyncio.run(scenario())
+
+    assert [type(result) for result in burst] == [RuntimeError] * 4
+    assert retried == "fresh"
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used_and_sweeps_dead_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "monotonic", clock)
+    cache = AsyncTTLCache(stale_seconds=30, max_entries=2)
+
+    def load(value):
+        async def loader():
+            return value
+
+        return loader
+
+    async def scenario():
+        await cache.get_or_set("https://api.test/search?query=a", 60, load(["a"]))
+        await cache.get_or_set("https://api.test/search?query=b", 60, load(["b"]))
+        await cache.get_or_set("https://api.test/search?query=a", 60, load(["x"]))
+        await cache.get_or_set("post:https://api.test/info:{}", 10, load({"c": 1}))
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert set(stats["prefixes"]) == {"https://api.test/search", "post:https://api.test/info"}
+    assert stats["prefixes"]["https://api.test/search"]["bytes"] > 0
+
+    clock.now += 45
+    assert cache.sweep() == 1
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["locks"] == 1
+
+
+def test_lru_cache_evicts_least_recently_used_and_keeps_first_value():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.put("a", 10) == 1
+    assert cache.get_or_build("c", lambda: 30) == 3
+    assert cache.get_or_build("d", lambda: 4) == 4
+    assert len(cache) == 2
+
+
+def test_data_fingerprint_ignores_the_container_of_a_column():
+    values = [1.0, 2.5, None]
+
+    assert data_fingerprint(values, 7) == data_fingerprint(
+        np.array([1.0, 2.5, np.nan]),
+        7,
+    )
+    assert data_fingerprint(values, 7) == data_fingerprint(tuple(values), 7)
+    assert data_fingerprint(values, 7) != data_fingerprint(values, 30)
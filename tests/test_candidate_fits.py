@@ -0,0 +1,62 @@
+from dataclasses import replace
+from math import pi, sin
+
+from threadpoolctl import threadpool_limits
+
+import app.candidate_fits as candidate_fits
+from app.probability_models import prepare_probability_data, train_probability_model
+from app.specialist_models import prepare_specialist_data, train_specialist
+
+
+def cyclical_market(days: int = 700):
+    prices = [100.0]
+    market = [120.0]
+    for index in range(1, days):
+        cycle = sin(2 * pi * index / 42)
+        prices.append(prices[-1] * (1 + 0.001 + cycle * 0.0045 + sin(index / 21) * 0.0015))
+        market.append(market[-1] * (1 + 0.0008 + cycle * 0.0032))
+    volumes = [1_000_000 * (1.2 + abs(sin(2 * pi * index / 42)) * 0.8) for index in range(days)]
+    return prices, volumes, market
+
+
+def fitted_states():
+    prices, volumes, market = cyclical_market()
+    probability = train_probability_model(
+        prepare_probability_data(prices, volumes, market, horizon_days=1),
+        known_through_origin=len(prices) - 2,
+        verify_history=False,
+    )
+    specialist = train_specialist(
+        prepare_specialist_data(prices, volumes, horizon_days=7),
+        known_through_origin=len(prices) - 8,
+        direction_threshold=1.0,
+    )
+    return (
+        replace(probability, estimator=None, calibrator=None),
+        replace(specialist, estimator=None),
+    )
+
+
+def test_parallel_candidate_fits_match_serial_fits(monkeypatch):
+    serial = fitted_states()
+
+    monkeypatch.setattr(
+        candidate_fits,
+        "settings",
+        replace(candidate_fits.settings, candidate_fit_workers=3, model_thread_budget=2),
+    )
+    monkeypatch.setattr(candidate_fits, "_EXECUTOR", None)
+    # The fit workers cap the process-wide BLAS pools; leaving the block puts
+    # the limits the other tests run with back in place.
+    with threadpool_limits(limits=None):
+        try:
+            parallel = fitted_states()
+            assert candidate_fits._EXECUTOR is not None
+        finally:
+            executor = candidate_fits._EXECUTOR
+            if executor is not None:
+                executor.shutdown()
+
+    assert parallel == serial
+    assert len(serial[0].validation_candidates) == 2
+    assert len(serial[1].validation_candidates) == 3
@@ -0,0 +1,134 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.backtest import walk_forward_backtest
+from app.compute import ComputePool, SharedArrays, load_shared
+from app.governor import ComputeGovernor
+from app.timeseries import TimeSeries
+
+
+def daily_series(days: int = 240) -> TimeSeries:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return TimeSeries.from_points(
+        [
+            [
+                int((start + timedelta(days=offset)).timestamp() * 1000),
+                100 * 1.002**offset * (1 + 0.01 * ((offset * 7) % 5 - 2)),
+            ]
+            for offset in range(days)
+        ]
+    )
+
+
+def test_shared_arrays_round_trip_without_pickling_values():
+    arrays = {"a": np.arange(5, dtype=np.int64), "b": np.linspace(0.0, 1.0, 3)}
+    shared = SharedArrays(arrays)
+    try:
+        loaded = load_shared(shared.bundle)
+    finally:
+        shared.close()
+
+    assert loaded["a"].tolist() == [0, 1, 2, 3, 4]
+    assert loaded["b"].tolist() == [0.0, 0.5, 1.0]
+
+
+def test_process_pool_backtest_matches_in_process_result():
+    prices = daily_series()
+    empty = TimeSeries.empty()
+    pool = ComputePool(workers=1)
+
+    async def scenario():
+        return await pool.backtest(
+            prices,
+            7,
+            empty,
+            market_prices=prices,
+            funding_rates=empty,
+            max_samples=6,
+        )
+
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        pool.close()
+
+    expected = walk_forward_backtest(
+        prices,
+        7,
+        empty,
+        max_samples=6,
+        market_prices=prices,
+        funding_rates=empty,
+    )
+    assert result == expected
+
+
+def test_batch_backtest_shares_market_context_across_datasets():
+    prices = daily_series()
+    rising = TimeSeries(prices.timestamps, prices.values * 1.5)
+    empty = TimeSeries.empty()
+    pool = ComputePool(workers=1)
+
+    async def scenario():
+        return [
+            item
+            async for item in pool.backtest_batch(
+                prices,
+                {"bitcoin": (prices, empty, empty), "ethereum": (rising, empty, empty)},
+                [7, 1],
+                max_samples=4,
+            )
+        ]
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        pool.close()
+
+    assert sorted((asset, horizon) for asset, horizon, _ in results) == [
+        ("bitcoin", 1),
+        ("bitcoin", 7),
+        ("ethereum", 1),
+        ("ethereum", 7),
+    ]
+    for asset, horizon, result in results:
+        expected = walk_forward_backtest(
+            rising if asset == "ethereum" else prices,
+            horizon,
+            empty,
+            max_samples=4,
+            market_prices=prices,
+            funding_rates=empty,
+        )
+        assert result == expected
+
+
+def test_batch_runs_one_governor_job_per_asset():
+    prices = daily_series()
+    empty = TimeSeries.empty()
+    governor = ComputeGovernor(slots=3)
+    pool = ComputePool(governor=governor)
+
+    async def scenario():
+        return [
+            item
+            async for item in pool.backtest_batch(
+                prices,
+                {"bitcoin": (prices, empty, empty), "ethereum": (prices, empty, empty)},
+                [7, 1],
+                max_samples=2,
+            )
+        ]
+
+    results = asyncio.run(scenario())
+
+    assert sorted((asset, horizon) for asset, horizon, _ in results) == [
+        ("bitcoin", 1),
+        ("bitcoin", 7),
+        ("ethereum", 1),
+        ("ethereum", 7),
+    ]
+    assert governor.status()["completed"] == 2
+    assert governor.status()["running"] == 0
@@ -1,7 +1,10 @@
 import asyncio
 from datetime import datetime, timedelta, timezone
 
-from app.dashboard import build_dashboard
+from app import dashboard
+from app.cache import AsyncTTLCache
+from app.dashboard import build_dashboard, forecast_from_history
+from app.governor import BACKGROUND, ComputeGovernor
 from app.market_data import UpstreamServiceError
 
 
@@ -134,3 +137,120 @@ def test_dashboard_uses_binance_market_fallback_when_coingecko_is_unavailable():
     assert payload["selected"]["current_price"] == 126.0
     assert payload["selected"]["change_7d"] > 0
     assert len(payload["selected"]["sparkline"]) == 42
+
+
+def test_dashboard_serves_journaled_forecast_when_compute_is_saturated():
+    governor = ComputeGovernor(slots=1, admission_wait_seconds=0.05)
+    journaled = {
+        "horizon_days": 7,
+        "model_version": "5.1.0",
+        "generated_at": "2026-07-10T12:01:00+00:00",
+        "base_price": 100.0,
+        "target_price": 104.0,
+        "expected_change_pct": 4.0,
+        "direction_key": "bullish",
+        "confidence": 68,
+        "indicators": {"rsi": 55.2},
+        "model": {"probability": {"probability_pct": 61.0}},
+    }
+
+    async def load_journaled():
+        return journaled
+
+    async def scenario():
+        async with governor.slot(BACKGROUND):
+            return await build_dashboard(
+                FakeMarketDataService(),
+                "bitcoin",
+                7,
+                governor=governor,
+                stale_loader=load_journaled,
+            )
+
+    payload = asyncio.run(scenario())
+    forecast = payload["selected"]["forecast"]
+
+    assert forecast["stale"] is True
+    assert forecast["stale_generated_at"] == "2026-07-10T12:01:00+00:00"
+    assert forecast["direction"] == "Emelkedő"
+    assert forecast["probability_forecast"]["probability_pct"] == 61.0
+    assert len(forecast["series"]) == 60
+    assert governor.status()["rejected"] == 1
+
+
+def test_waiting_dashboard_requests_share_one_admission_rejection():
+    governor = ComputeGovernor(slots=1, admission_wait_seconds=0.2)
+    cache = AsyncTTLCache()
+    journaled = {
+        "horizon_days": 7,
+        "model_version": "5.1.0",
+        "generated_at": "2026-07-10T12:01:00+00:00",
+        "base_price": 100.0,
+        "target_price": 104.0,
+        "expected_change_pct": 4.0,
+        "direction_key": "bullish",
+        "confidence": 68,
+        "indicators": {"rsi": 55.2},
+        "model": {},
+    }
+
+    async def load_journaled():
+        return journaled
+
+    async def scenario():
+        async with governor.slot(BACKGROUND):
+            started = asyncio.get_running_loop().time()
+            payloads = await asyncio.gather(
+                *(
+                    build_dashboard(
+                        FakeMarketDataService(),
+                        "bitcoin",
+                        7,
+                        governor=governor,
+                        stale_loader=load_journaled,
+                        cache=cache,
+                    )
+                    for _ in range(5)
+                )
+            )
+            return payloads, asyncio.get_running_loop().time() - started
+
+    payloads, elapsed = asyncio.run(scenario())
+
+    assert all(payload["selected"]["forecast"]["stale"] for payload in payloads)
+    assert governor.status()["rejected"] == 1
+    assert elapsed < 0.6
+
+
+class GreedierMarketDataService(FakeMarketDataService):
+    async def fear_greed(self):
+        return {"value": "80", "value_classification": "Extreme Greed"}
+
+
+def test_identical_dashboard_requests_share_one_build(monkeypatch):
+    builds = []
+
+    def counting_forecast(*args):
+        builds.append(args[2])
+        return forecast_from_history(*args)
+
+    monkeypatch.setattr(dashboard, "forecast_from_history", counting_forecast)
+    cache = AsyncTTLCache()
+
+    async def scenario():
+        burst = await asyncio.gather(
+            *(
+                build_dashboard(FakeMarketDataService(), "bitcoin", 7, cache=cache)
+                for _ in range(100)
+            )
+        )
+        changed = await build_dashboard(GreedierMarketDataService(), "bitcoin", 7, cache=cache)
+        other_horizon = await build_dashboard(FakeMarketDataService(), "bitcoin", 1, cache=cache)
+        return burst, changed, other_horizon
+
+    burst, changed, other_horizon = asyncio.run(scenario())
+
+    assert builds == [7, 7, 1]
+    assert all(payload["selected"] is burst[0]["selected"] for payload in burst)
+    assert changed["market"]["fear_greed"]["value"] == 80
+    assert other_horizon["forecast_publication"]["horizon_days"] == 1
@@ -0,0 +1,66 @@
+from math import sin
+
+import numpy as np
+
+from app.features import FeatureFrame, feature_frame, trailing, trailing_rsi
+
+
+COLUMNS = ("return_1", "return_30", "ema_20", "sma_200", "high_30", "rsi_14")
+
+
+def wavy_prices(days: int = 420) -> list[float]:
+    return [100 * (1 + 0.03 * sin(day / 6)) * 1.001**day for day in range(days)]
+
+
+def test_extended_frame_matches_a_full_build():
+    prices = np.asarray(wavy_prices())
+    frame = FeatureFrame(prices[:400])
+    for name in COLUMNS:
+        frame.column(name)
+    for length in range(401, len(prices) + 1):
+        frame = frame.extended(prices[:length])
+
+    full = FeatureFrame(prices)
+    for name in COLUMNS:
+        assert np.array_equal(frame.column(name), full.column(name), equal_nan=True)
+
+    origins = np.arange(200, len(prices))
+    daily_returns = (prices[1:] / prices[:-1] - 1) * 100
+    assert np.isnan(full.column("sma_200")[198])
+    assert np.array_equal(
+        full.column("sma_200")[origins],
+        trailing(prices, origins, 200).mean(axis=1),
+    )
+    assert np.array_equal(
+        full.column("rsi_14")[origins],
+        trailing_rsi(daily_returns, origins, 14),
+    )
+
+
+def test_frames_are_shared_per_history_and_extended_by_one_close():
+    prices = wavy_prices()
+    earlier = feature_frame(prices[:-1])
+    ema = earlier.column("ema_50")
+
+    extended = feature_frame(prices)
+
+    assert feature_frame(list(prices)) is extended
+    assert np.array_equal(extended.column("ema_50")[:-1], ema)
+    assert extended.column("ema_50")[-1] == FeatureFrame(
+        np.asarray(prices)
+    ).column("ema_50")[-1]
+
+
+def test_slid_window_continues_the_frame_of_the_earlier_window():
+    prices = wavy_prices(460)
+    earlier = feature_frame(prices[:400])
+    for name in COLUMNS:
+        earlier.column(name)
+
+    slid = feature_frame(prices[2:402])
+
+    full = FeatureFrame(np.asarray(prices[2:402]))
+    assert "return_30" in slid._columns
+    assert "ema_20" not in slid._columns
+    for name in COLUMNS:
+        assert np.array_equal(slid.column(name), full.column(name), equal_nan=True)
@@ -1,6 +1,17 @@
 from datetime import datetime, timedelta, timezone
+from statistics import mean, stdev
+from types import SimpleNamespace
 
-from app.forecast import build_forecast
+import pytest
+
+import app.forecast as forecast_module
+from app.forecast import (
+    build_forecast,
+    refit_daily_state,
+    technical_snapshot,
+    technical_snapshot_at,
+)
+from app.indicators import build_indicator_series
 
 
 def synthetic_prices(days: int = 120, daily_change: float = 0.002):
@@ -48,3 +59,46 @@ def test_forecast_is_bounded():
 
     assert -2.5 <= forecast["expected_change_pct"] <= 2.5
     assert forecast["horizon_days"] == 1
+
+
+def test_indicator_series_matches_prefix_snapshots():
+    values = [100 + offset + ((offset * 7) % 11 - 5) * 0.8 for offset in range(260)]
+    values[120:140] = [values[120]] * 20
+    volumes = [None if offset % 9 == 0 else 1_000.0 + offset % 13 for offset in range(260)]
+    series = build_indicator_series(values, volumes)
+
+    for anchor in (0, 1, 13, 14, 40, 125, 199, 259):
+        snapshot = technical_snapshot_at(series, anchor, 7)
+        prefix = values[: anchor + 1]
+        recent = prefix[-20:]
+        assert snapshot["sma200"] == pytest.approx(mean(prefix[-200:]), rel=1e-12)
+        assert snapshot["bollinger_middle"] == pytest.approx(mean(recent), rel=1e-12)
+        assert snapshot["bollinger_upper"] == pytest.approx(
+            mean(recent) + 2 * (stdev(recent) if len(recent) > 1 else 0.0),
+            rel=1e-12,
+        )
+        returns = [(current / previous) - 1 for previous, current in zip(prefix, prefix[1:])]
+        recent_returns = returns[-30:]
+        assert snapshot["daily_volatility"] == pytest.approx(
+            stdev(recent_returns) if len(recent_returns) > 1 else 0.0,
+            rel=1e-12,
+            abs=1e-15,
+        )
+        assert snapshot == technical_snapshot(prefix, 7, volumes[: anchor + 1])
+
+    assert series.volume_ratio_at(20) is None
+    assert series.volume_ratio_at(259) is not None
+
+
+def test_background_refit_resolves_deferred_feature_importance(monkeypatch):
+    fitted = SimpleNamespace(
+        top_features=None,
+        pending_importance=lambda: [{"feature": "return_7d", "importance": 0.4}],
+    )
+    monkeypatch.setattr(forecast_module, "live_probability_state", lambda *args: fitted)
+
+    state = refit_daily_state("probability", synthetic_prices(), 7)
+
+    assert state is fitted
+    assert state.top_features == [{"feature": "return_7d", "importance": 0.4}]
+    assert state.pending_importance is None
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from app.forecast_store import ForecastStore
 from app.training_readiness import build_training_readiness
@@ -86,6 +86,38 @@ def test_store_persists_probability_audit_fields(tmp_path):
     assert record["probability_decision"] == "buy_candidate"
 
 
+def test_store_returns_latest_forecast_with_its_snapshot_model(tmp_path):
+    store = ForecastStore(tmp_path / "forecast.sqlite3")
+    store.initialize()
+    assert store.latest_forecast("bitcoin", 7, "2.0.0") is None
+
+    store.record("bitcoin", "BTC", "2026-07-10T12:01:00+00:00", sample_forecast())
+    newer = {**sample_forecast(), "target_price": 106.0, "expected_change_pct": 6.0}
+    store.record("bitcoin", "BTC", "2026-07-10T12:16:00+00:00", newer)
+    store.record_feature_snapshot(
+        coin_id="bitcoin",
+        symbol="BTC",
+        generated_at="2026-07-10T12:17:00+00:00",
+        horizon_days=7,
+        market={},
+        technical={},
+        derivatives={},
+        news_sentiment={},
+        model={"model": "Ensemble", "probability": {"active": True}},
+    )
+
+    latest = store.latest_forecast("bitcoin", 7, "2.0.0")
+
+    assert latest["generated_at"] == "2026-07-10T12:16:00+00:00"
+    assert latest["target_price"] == 106.0
+    assert latest["indicators"] == {"rsi": 55.2}
+    assert latest["model"]["probability"] == {"active": True}
+    assert store.latest_forecast("bitcoin", 7, "3.0.0") is None
+    recent = datetime(2026, 7, 10, 12, 40, tzinfo=timezone.utc)
+    assert store.latest_forecast("bitcoin", 7, "2.0.0", 45, recent)["target_price"] == 106.0
+    assert store.latest_forecast("bitcoin", 7, "2.0.0", 45, recent + timedelta(hours=1)) is None
+
+
 def test_store_persists_point_in_time_feature_snapshots(tmp_path):
     store = ForecastStore(tmp_path / "forecast.sqlite3")
     store.initialize()
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+
+from app.governor import (
+    ANALYTICS,
+    BACKGROUND,
+    INTERACTIVE,
+    ComputeBusyError,
+    ComputeGovernor,
+)
+
+
+def test_waiting_jobs_are_admitted_by_priority():
+    governor = ComputeGovernor(slots=1, thread_budget=2)
+    order = []
+
+    async def job(name: str, priority: int):
+        async with governor.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        async with governor.slot(BACKGROUND):
+            tasks = [
+                asyncio.create_task(job("backtest", BACKGROUND)),
+                asyncio.create_task(job("lab", ANALYTICS)),
+                asyncio.create_task(job("forecast", INTERACTIVE)),
+                asyncio.create_task(job("second forecast", INTERACTIVE)),
+            ]
+            await asyncio.sleep(0)
+            status = governor.status()
+        await asyncio.gather(*tasks)
+        return status
+
+    status = asyncio.run(scenario())
+
+    assert order == ["forecast", "second forecast", "lab", "backtest"]
+    assert status["running"] == 1
+    assert status["queued"] == 4
+    assert status["queued_by_priority"] == {
+        "interactive": 2,
+        "analytics": 1,
+        "background": 1,
+    }
+    assert status["threads_per_job"] == 2
+    assert governor.status()["running"] == 0
+    assert governor.status()["completed"] == 5
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    governor = ComputeGovernor(slots=1)
+
+    async def scenario():
+        async with governor.slot(INTERACTIVE):
+            waiter = asyncio.create_task(governor.run(BACKGROUND, sum, [1, 2]))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        return await governor.run(INTERACTIVE, sum, [1, 2])
+
+    assert asyncio.run(scenario()) == 3
+    assert governor.status()["running"] == 0
+    assert governor.status()["queued"] == 0
+
+
+def test_admitted_job_gives_up_after_the_admission_wait():
+    governor = ComputeGovernor(slots=1, admission_wait_seconds=0.05)
+
+    async def scenario():
+        async with governor.slot(BACKGROUND):
+            try:
+                await governor.run(INTERACTIVE, sum, [1, 2], admit=True)
+            except ComputeBusyError:
+                rejected = True
+            else:
+                rejected = False
+            queued = governor.queue_depth()
+        return rejected, queued, await governor.run(INTERACTIVE, sum, [1, 2], admit=True)
+
+    assert asyncio.run(scenario()) == (True, 0, 3)
+    assert governor.status()["rejected"] == 1
+    assert governor.status()["running"] == 0
+
+
+def test_one_slot_stays_reserved_for_interactive_jobs():
+    governor = ComputeGovernor(slots=2)
+    order = []
+
+    async def job(name: str, priority: int):
+        async with governor.slot(priority):
+            order.append(name)
+
+    async def scenario():
+        async with governor.slot(BACKGROUND):
+            backtest = asyncio.create_task(job("backtest", BACKGROUND))
+            lab = asyncio.create_task(job("lab", ANALYTICS))
+            await asyncio.sleep(0)
+            await job("forecast", INTERACTIVE)
+            status = governor.status()
+        await asyncio.gather(backtest, lab)
+        return status
+
+    status = asyncio.run(scenario())
+
+    assert order == ["forecast", "lab", "backtest"]
+    assert status["interactive_reserved"] == 1
+    assert status["running"] == 1
+    assert status["queued_by_priority"] == {
+        "interactive": 0,
+        "analytics": 1,
+        "background": 1,
+    }
+
+
+def test_cancelled_caller_keeps_the_slot_until_its_thread_returns():
+    governor = ComputeGovernor(slots=2)
+    release = threading.Event()
+    order = []
+
+    def blocking_fit():
+        release.wait(5)
+        order.append("orphaned fit")
+
+    async def job(name: str):
+        await governor.run(BACKGROUND, order.append, name)
+
+    async def scenario():
+        caller = asyncio.create_task(governor.run(BACKGROUND, blocking_fit))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        held = governor.status()["running"]
+        waiting = asyncio.create_task(job("next backtest"))
+        await asyncio.sleep(0.01)
+        queued = governor.queue_depth(BACKGROUND)
+        release.set()
+        await waiting
+        return held, queued
+
+    assert asyncio.run(scenario()) == (1, 1)
+    assert order == ["orphaned fit", "next backtest"]
+    assert governor.status()["running"] == 0
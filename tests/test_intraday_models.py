@@ -1,7 +1,11 @@
 from datetime import datetime, timedelta, timezone
+from math import isclose
 
 from app.intraday_models import (
     build_intraday_estimate,
+    build_intraday_feature_matrix,
+    build_intraday_feature_vector,
+    clean_intraday_candles,
     prepare_intraday_data,
     walk_forward_intraday_backtest,
 )
@@ -35,6 +39,22 @@ def test_intraday_features_only_create_completed_targets():
     assert max(prepared.targets_by_origin) + 24 < len(prepared.candles)
 
 
+def test_intraday_feature_matrix_matches_per_origin_vectors():
+    candles = clean_intraday_candles(synthetic_candles(800, hourly_change=0.0004))
+    for offset, candle in enumerate(candles):
+        candle["close"] *= 1 + ((offset * 7) % 11 - 5) / 1000
+    origins = [720, 733, 799]
+
+    matrix = build_intraday_feature_matrix(candles, origins)
+
+    for origin, row in zip(origins, matrix.tolist()):
+        expected = build_intraday_feature_vector(candles[: origin + 1])
+        assert all(
+            isclose(actual, reference, rel_tol=1e-9, abs_tol=1e-9)
+            for actual, reference in zip(row, expected)
+        )
+
+
 def test_one_day_intraday_specialist_activates_on_stable_pattern():
     estimate = build_intraday_estimate(
         synthetic_candles(),
@@ -1,8 +1,14 @@
 import asyncio
+import time
 
 import pytest
 
-from app.market_data import MarketDataService, UpstreamServiceError
+from app.candle_store import CandleStore
+from app.market_data import (
+    MarketDataService,
+    UpstreamServiceError,
+    history_data_version,
+)
 
 
 class BinanceHistoryService(MarketDataService):
@@ -56,6 +62,59 @@ def test_hype_daily_history_uses_binance_futures_klines():
     assert service.requests[0][1].endswith("/fapi/v1/klines")
 
 
+def daily_kline(origin, close=None):
+    return [
+        origin * 86_400_000,
+        "100",
+        "105",
+        "95",
+        str(close if close is not None else 100 + origin / 100),
+        "10",
+        origin * 86_400_000 + 86_399_999,
+        "1000",
+    ]
+
+
+class StoredBinanceHistoryService(MarketDataService):
+    def __init__(self, candle_store, last_origin):
+        super().__init__(candle_store)
+        self.calls = []
+        self.last_origin = last_origin
+
+    async def _get_json(self, service, url, params, cache_seconds, headers=None):
+        self.calls.append(params)
+        if "startTime" in params:
+            first = params["startTime"] // 86_400_000
+            return [
+                daily_kline(origin, close=200 if origin == self.last_origin else None)
+                for origin in range(first, self.last_origin + 1)
+            ]
+        if "endTime" not in params:
+            origins = range(self.last_origin - params["limit"] + 1, self.last_origin + 1)
+        else:
+            origins = range(0, 0)
+        return [daily_kline(origin) for origin in origins]
+
+
+def test_binance_history_tops_up_from_persisted_candle_store(tmp_path):
+    store = CandleStore(tmp_path / "candles.sqlite3")
+    store.initialize()
+
+    first = StoredBinanceHistoryService(store, last_origin=399)
+    history = asyncio.run(first._binance_history("BTC", 365))
+    assert len(history["prices"]) == 365
+    assert [call["limit"] for call in first.calls] == [365]
+
+    restarted = StoredBinanceHistoryService(store, last_origin=401)
+    history = asyncio.run(restarted._binance_history("BTC", 365))
+
+    assert len(restarted.calls) == 1
+    assert restarted.calls[0]["startTime"] == 399 * 86_400_000
+    assert history["prices"][-1] == [401 * 86_400_000, 200.0]
+    assert history["prices"][-3][0] == 399 * 86_400_000
+    assert len(store.candles("Binance", "BTCUSDT", "1d", 5000)) == 367
+
+
 class BinanceIntradayService(MarketDataService):
     def __init__(self):
         self.calls = []
@@ -149,6 +208,7 @@ def test_hype_forecast_history_prefers_official_hyperliquid_candles():
     assert len(history["prices"]) == 365
     assert history["total_volumes"][0][1] == 51_000.0
     assert history["source"] == "Hyperliquid Perpetuals"
+    assert history["data_version"] == history_data_version("HYPE", history)
     assert service.requests[0][0] == "Hyperliquid"
     assert service.requests[0][1] == service.HYPERLIQUID_INFO_URL
     assert service.requests[0][2]["type"] == "candleSnapshot"
@@ -156,6 +216,26 @@ def test_hype_forecast_history_prefers_official_hyperliquid_candles():
     assert service.requests[0][2]["req"]["interval"] == "1d"
 
 
+def test_history_data_version_ignores_the_open_candle():
+    day = 86_400_000
+    history = {
+        "source": "Binance Spot",
+        "prices": [[0, 1.0], [day, 2.0], [2 * day, 3.0]],
+        "funding_rates": [[day, 0.01], [day + 1, 0.02]],
+    }
+    version = history_data_version("BTC", history)
+    assert version == f"Binance Spot:BTC:{day}:3:{day + 1}:2"
+
+    live_update = {
+        **history,
+        "prices": [*history["prices"][:-1], [2 * day, 3.5]],
+        "funding_rates": [*history["funding_rates"], [2 * day + 1, 0.03]],
+    }
+    assert history_data_version("BTC", live_update) == version
+    next_day = {**history, "prices": [*history["prices"], [3 * day, 4.0]]}
+    assert history_data_version("BTC", next_day) != version
+
+
 def test_hype_intraday_forecast_prefers_official_hyperliquid_candles():
     service = HyperliquidHistoryService()
 
@@ -169,6 +249,51 @@ def test_hype_intraday_forecast_prefers_official_hyperliquid_candles():
     assert service.requests[0][2]["req"]["interval"] == "1h"
 
 
+class StoredHyperliquidService(MarketDataService):
+    def __init__(self, candle_store, last_hour):
+        super().__init__(candle_store)
+        self.requests = []
+        self.last_hour = last_hour
+
+    async def _post_json(self, service, url, body, cache_seconds):
+        self.requests.append(body["req"])
+        first = body["req"]["startTime"] // 3_600_000
+        if first > self.last_hour:
+            span = (body["req"]["endTime"] - body["req"]["startTime"]) // 3_600_000
+            first = self.last_hour - span + 1
+        return [
+            {
+                "t": index * 3_600_000,
+                "o": "50.0",
+                "h": "52.0",
+                "l": "49.0",
+                "c": "51.0",
+                "v": "1000.0",
+            }
+            for index in range(first, self.last_hour + 1)
+        ]
+
+
+def test_hourly_candle_buffer_extends_with_new_hyperliquid_hours_only(tmp_path):
+    store = CandleStore(tmp_path / "candles.sqlite3")
+    store.initialize()
+    service = StoredHyperliquidService(store, last_hour=999)
+
+    async def load_twice():
+        first = await service.forecast_intraday_history("hyperliquid", hours=720)
+        service.last_hour = 1002
+        second = await service.forecast_intraday_history("hyperliquid", hours=720)
+        return first, second
+
+    first, second = asyncio.run(load_twice())
+
+    assert len(first["candles"]) == len(second["candles"]) == 720
+    assert second["candles"][-1]["timestamp"] == 1002 * 3_600_000
+    assert second["candles"][0]["timestamp"] == 283 * 3_600_000
+    assert service.requests[1]["startTime"] == 999 * 3_600_000
+    assert len(store.candles("Hyperliquid", "HYPE", "1h", 5000)) == 723
+
+
 class BinanceDerivativesService(MarketDataService):
     def __init__(self):
         self.calls = []
@@ -216,6 +341,48 @@ def test_binance_derivatives_history_combines_public_futures_series():
     assert len(service.calls) == 4
 
 
+class StoredFundingService(MarketDataService):
+    def __init__(self, candle_store):
+        super().__init__(candle_store)
+        self.calls = []
+        self.latest = None
+
+    async def _get_json(self, service, url, params, cache_seconds, headers=None):
+        self.calls.append(params)
+        start = params["startTime"]
+        end = params.get("endTime", self.latest)
+        first = start + (-start) % 28_800_000
+        return [
+            {"fundingTime": funding_time, "fundingRate": "0.0001"}
+            for funding_time in range(first, min(end, self.latest) + 1, 28_800_000)
+        ][:1000]
+
+
+def test_funding_ledger_tops_up_from_cursor_after_backfill(tmp_path):
+    store = CandleStore(tmp_path / "candles.sqlite3")
+    store.initialize()
+    service = StoredFundingService(store)
+    now_ms = int(time.time() * 1000) - 86_400_000
+    service.latest = now_ms - now_ms % 28_800_000
+
+    async def load_twice():
+        first = await service._binance_funding_history("BTC", 30)
+        service.latest += 28_800_000
+        second = await service._binance_funding_history("BTC", 30)
+        return first, second
+
+    first, second = asyncio.run(load_twice())
+
+    assert "endTime" in service.calls[0]
+    assert service.calls[-1] == {
+        "symbol": "BTCUSDT",
+        "startTime": first[-1]["fundingTime"] + 1,
+        "limit": 1000,
+    }
+    assert second[-1]["fundingTime"] == service.latest
+    assert len(store.funding_rates("BTCUSDT", 0)) == len(first) + 1
+
+
 class BinanceMarketsService(MarketDataService):
     def __init__(self):
         self.params = None
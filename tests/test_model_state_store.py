@@ -0,0 +1,93 @@
+import app.model_state_store as model_state_store
+from app.cache import data_fingerprint
+from app.live_states import LiveStateRegistry
+from app.model_state_store import ModelStateStore
+
+
+def test_store_keeps_latest_states_per_slot_and_current_version(tmp_path):
+    database = tmp_path / "forecast.sqlite3"
+    old_store = ModelStateStore(database, "1.0.0")
+    old_store.initialize()
+    old_store.save("specialist", "bitcoin", 7, "old", {"weights": [0.0]}, 10, 1.0)
+
+    store = ModelStateStore(database, "2.0.0")
+    store.initialize()
+    for length in (10, 11, 12):
+        store.save(
+            "specialist",
+            "bitcoin",
+            7,
+            f"fp-{length}",
+            {"weights": [float(length)]},
+            length,
+            float(length),
+        )
+    store.save("specialist", "bitcoin", 7, "fp-12", {"weights": [-1.0]}, 12, 12.0)
+
+    latest = store.latest("specialist", "bitcoin", 7)
+    assert latest.fingerprint == "fp-12"
+    assert latest.state == {"weights": [12.0]}
+    assert latest.history_length == 12
+    assert store.latest("specialist", "bitcoin", 1) is None
+    assert old_store.latest("specialist", "bitcoin", 7) is None
+
+    with store._connect() as connection:
+        rows = connection.execute("SELECT fingerprint FROM model_state").fetchall()
+    assert sorted(row["fingerprint"] for row in rows) == ["fp-11", "fp-12"]
+
+
+def test_states_of_another_state_format_are_not_loaded(tmp_path, monkeypatch):
+    database = tmp_path / "forecast.sqlite3"
+    store = ModelStateStore(database, "2.0.0")
+    store.initialize()
+    store.save("specialist", "bitcoin", 7, "fp", {"weights": [1.0]}, 10, 1.0)
+
+    monkeypatch.setattr(model_state_store, "STATE_FORMAT_VERSION", 99)
+    upgraded = ModelStateStore(database, "2.0.0")
+    upgraded.initialize()
+
+    assert upgraded.latest("specialist", "bitcoin", 7) is None
+    with upgraded._connect() as connection:
+        rows = connection.execute("SELECT COUNT(*) AS count FROM model_state").fetchone()
+    assert rows["count"] == 0
+
+
+def test_registry_reuses_stored_state_after_restart(tmp_path):
+    store = ModelStateStore(tmp_path / "forecast.sqlite3", "2.0.0")
+    store.initialize()
+    history = (1.0, 2.0, 3.0)
+    volumes = (5.0, None, 7.0)
+    signature = data_fingerprint(history, volumes, 0.01)
+    assert signature == data_fingerprint(list(history), list(volumes), 0.01)
+    assert signature != data_fingerprint(history, (5.0, 6.0, 7.0), 0.01)
+
+    first = LiveStateRegistry()
+    first.store = store
+    assert first.resolve("family", "btc", 7, history, signature, lambda: "fit") == "fit"
+
+    restarted = LiveStateRegistry()
+    restarted.store = store
+
+    def fail():
+        raise AssertionError("a stored state must not be refit")
+
+    assert restarted.resolve("family", "btc", 7, history, signature, fail) == "fit"
+    [described] = restarted.describe("btc")
+    assert described["source"] == "store"
+    assert described["fingerprint"] == signature
+    assert described["stale"] is False
+
+
+def test_registry_serves_the_previous_state_when_a_capped_window_slides():
+    registry = LiveStateRegistry()
+    history = [float(value) for value in range(1, 11)]
+    assert registry.resolve("family", "btc", 7, history, "a", lambda: "a") == "a"
+    registry.background = True
+
+    def fail():
+        raise AssertionError("a slid window must not train inline")
+
+    assert registry.resolve("family", "btc", 7, history[2:] + [11.0, 12.0], "b", fail) == "a"
+    assert registry.stale_slots() == {("family", "btc", 7)}
+    assert registry.resolve("family", "btc", 7, [5.0] * 10, "c", lambda: "c") == "c"
+    assert registry.describe("btc")[0]["fingerprint"] == "c"
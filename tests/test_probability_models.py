@@ -1,12 +1,17 @@
-from math import pi, sin
+from math import isclose, pi, sin
+
+import numpy as np
 
 from app.probability_models import (
     FEATURE_NAMES,
+    _permutation_importance,
     _purged_blocks,
+    build_probability_feature_matrix,
     build_probability_feature_vector,
     prepare_probability_data,
     probability_from_state,
     probability_registry_payload,
+    state_top_features,
     train_probability_model,
 )
 
@@ -60,6 +65,22 @@ def test_probability_model_reports_calibrated_holdout_metrics():
         assert estimate["probability"] == estimate["baseline_probability"]
 
 
+def test_horizons_share_one_feature_matrix_per_data_version():
+    prices, volumes, market = cyclical_market(days=400)
+    weekly = prepare_probability_data(prices, volumes, market, horizon_days=7)
+    monthly = prepare_probability_data(prices, volumes, market, horizon_days=30)
+    changed = prepare_probability_data(
+        [*prices[:-1], prices[-1] * 1.01],
+        volumes,
+        market,
+        horizon_days=7,
+    )
+
+    assert monthly.features_by_origin is weekly.features_by_origin
+    assert len(monthly.targets_by_origin) == len(weekly.targets_by_origin) - 23
+    assert changed.features_by_origin is not weekly.features_by_origin
+
+
 def test_single_class_history_keeps_probability_model_in_reserve():
     prices = [100 * (1.003**index) for index in range(700)]
     volumes = [1_000_000.0] * len(prices)
@@ -88,6 +109,33 @@ def test_probability_features_include_temporal_and_funding_context():
     assert mapped["lag_return_7d"] != 0
 
 
+def test_feature_matrix_matches_per_origin_vectors_with_gaps():
+    prices, volumes, market = cyclical_market(days=260)
+    volumes = [
+        None if index % 5 == 0 or 205 <= index < 225 else volume
+        for index, volume in enumerate(volumes)
+    ]
+    funding = [
+        None if index % 4 else (0.01 if index > 230 else -0.002 * (index % 7))
+        for index in range(260)
+    ]
+
+    matrix = build_probability_feature_matrix(prices, volumes, market, funding)
+
+    assert sorted(matrix) == list(range(200, 260))
+    for origin in (200, 217, 231, 259):
+        expected = build_probability_feature_vector(
+            prices[: origin + 1],
+            volumes[: origin + 1],
+            market[: origin + 1],
+            funding[: origin + 1],
+        )
+        assert all(
+            isclose(actual, reference, rel_tol=1e-9, abs_tol=1e-9)
+            for actual, reference in zip(matrix[origin], expected)
+        )
+
+
 def test_probability_registry_uses_horizon_specific_candidates():
     registry = {
         item["horizon_days"]: [candidate["key"] for candidate in item["candidates"]]
@@ -97,3 +145,50 @@ def test_probability_registry_uses_horizon_specific_candidates():
     assert registry[1] == ["hist_gradient_boosting", "extra_trees"]
     assert registry[7] == ["logistic", "hist_gradient_boosting"]
     assert registry[30] == ["logistic"]
+
+
+def test_deferred_importance_matches_eager_importance():
+    prices, volumes, market = cyclical_market()
+    prepared = prepare_probability_data(prices, volumes, market, horizon_days=7)
+    eager = train_probability_model(
+        prepared,
+        known_through_origin=len(prices) - 8,
+        verify_history=False,
+    )
+    deferred = train_probability_model(
+        prepared,
+        known_through_origin=len(prices) - 8,
+        verify_history=False,
+        lazy_importance=True,
+    )
+
+    assert deferred.top_features is None
+    assert state_top_features(deferred) == eager.top_features
+    assert deferred.pending_importance is None
+    assert state_top_features(deferred) is deferred.top_features
+
+
+class FirstColumnEstimator:
+    def predict_proba(self, features):
+        probabilities = np.where(np.asarray(features)[:, 0] > 0, 0.9, 0.1)
+        return np.column_stack([1 - probabilities, probabilities])
+
+
+def test_permutation_importance_leaves_out_features_without_signal():
+    features = [
+        [1.0 if index % 2 else -1.0] + [0.5] * (len(FEATURE_NAMES) - 1)
+        for index in range(40)
+    ]
+    targets = [index % 2 for index in range(40)]
+
+    importance = _permutation_importance(
+        FirstColumnEstimator(),
+        None,
+        features,
+        targets,
+        baseline=0.5,
+        shrinkage=1.0,
+    )
+
+    assert [item["key"] for item in importance] == [FEATURE_NAMES[0]]
+    assert importance[0]["importance_pct"] == 100.0
@@ -1,7 +1,13 @@
 from datetime import datetime, timedelta, timezone
+from math import isclose
 
 from app.forecast import build_forecast
-from app.specialist_models import SPECIALIST_REGISTRY
+from app.specialist_models import (
+    SPECIALIST_REGISTRY,
+    build_feature_matrix,
+    build_feature_vector,
+    specialist_feature_rows,
+)
 
 
 def synthetic_history(days: int = 280):
@@ -44,3 +50,45 @@ def test_seven_day_specialist_activates_after_strict_holdout_validation():
         for candidate in forecast["specialist"]["validation_candidates"]
     ) == 1
     assert 0 < forecast["specialist"]["blend_weight"] <= 0.7
+
+
+def test_feature_matrix_matches_per_origin_vectors_and_appends_new_days():
+    prices, volumes = synthetic_history(days=140)
+    values = [price for _, price in prices]
+    volume_values = [
+        None if offset % 4 == 0 or 90 <= offset < 110 else volume
+        for offset, (_, volume) in enumerate(volumes)
+    ]
+
+    matrix = build_feature_matrix(values, volume_values)
+
+    assert len(matrix) == len(values) - 60
+    for origin in (60, 95, 111, 139):
+        expected = build_feature_vector(values[: origin + 1], volume_values[: origin + 1])
+        assert all(
+            isclose(actual, reference, rel_tol=1e-9, abs_tol=1e-9)
+            for actual, reference in zip(matrix[origin - 60], expected)
+        )
+
+    earlier = specialist_feature_rows(values[:-1], volume_values[:-1])
+    extended = specialist_feature_rows(values, volume_values)
+
+    assert extended[0] is earlier[0]
+    assert extended[-1] == build_feature_vector(values, volume_values)
+
+
+def test_slid_window_continues_the_rows_of_the_earlier_window():
+    prices, volumes = synthetic_history(days=160)
+    values = [price for _, price in prices]
+    volume_values = [None if offset % 5 == 0 else volume for offset, (_, volume) in enumerate(volumes)]
+
+    specialist_feature_rows(values[:150], volume_values[:150])
+    slid = specialist_feature_rows(values[2:152], volume_values[2:152])
+    expected = build_feature_matrix(values[2:152], volume_values[2:152])
+
+    assert len(slid) == len(expected)
+    for actual_row, expected_row in zip(slid, expected):
+        assert all(
+            isclose(actual, reference, rel_tol=1e-9, abs_tol=1e-9)
+            for actual, reference in zip(actual_row, expected_row)
+        )
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.forecast import build_forecast, daily_points
+from app.timeseries import DAY_MS, TimeSeries
+
+
+def test_daily_series_keeps_last_valid_observation_per_utc_day():
+    series = TimeSeries.from_points(
+        [
+            [2 * DAY_MS + 5, 12.0],
+            [DAY_MS, 10.0],
+            [DAY_MS + 3_600_000, 11.0],
+            [2 * DAY_MS, 13.0],
+            [3 * DAY_MS, float("nan")],
+            [3 * DAY_MS, -1.0],
+            ["broken"],
+            [None, 1.0],
+        ]
+    )
+
+    daily = series.daily()
+
+    assert daily.days.tolist() == [1, 2]
+    assert daily.values.tolist() == [11.0, 13.0]
+
+
+def test_slicing_shares_read_only_buffers():
+    series = TimeSeries.from_arrays(np.arange(10) * DAY_MS, np.arange(10.0))
+
+    window = series[2:5]
+
+    assert np.shares_memory(window.values, series.values)
+    assert window.values.flags.writeable is False
+    assert window.to_points() == [[2 * DAY_MS, 2.0], [3 * DAY_MS, 3.0], [4 * DAY_MS, 4.0]]
+    assert TimeSeries.from_points(series) is series
+
+
+def test_forecast_accepts_columnar_and_point_histories_alike():
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    prices = [
+        [int((start + timedelta(days=offset)).timestamp() * 1000), 100 * 1.002**offset]
+        for offset in range(120)
+    ]
+
+    from_points = build_forecast(prices, horizon_days=7)
+    from_columns = build_forecast(TimeSeries.from_points(prices), horizon_days=7)
+
+    assert from_points == from_columns
+    assert daily_points(prices)[-1]["timestamp"] == from_points["series"][-1]["timestamp"]
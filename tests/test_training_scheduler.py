@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import app.training_scheduler as training_scheduler
+from app.live_states import REFRESHING, LiveStateRegistry
+from app.training_scheduler import TrainingScheduler
+
+
+def daily_prices(days: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        [int((start + timedelta(days=offset)).timestamp() * 1000), 100 * 1.001**offset]
+        for offset in range(days)
+    ]
+
+
+class SchedulerMarketData:
+    def __init__(self):
+        self.days = 120
+        self.history_calls = 0
+
+    async def forecast_history(self, _coin, days=2000):
+        self.history_calls += 1
+        return {"prices": daily_prices(self.days), "source": "Test"}
+
+    async def forecast_intraday_history(self, _coin, hours=6480):
+        return {"candles": [], "interval": "1h"}
+
+
+def test_registry_reuses_previous_state_for_a_few_new_closes_only():
+    registry = LiveStateRegistry()
+    fits = []
+
+    def train(label):
+        def fit():
+            fits.append(label)
+            return label
+
+        return fit
+
+    history = [1.0, 2.0, 3.0]
+    assert registry.resolve("family", "btc", 7, history, "a", train("a")) == "a"
+    registry.background = True
+    assert registry.resolve("family", "btc", 7, history + [4.0], "b", train("b")) == "a"
+    assert registry.stale_slots() == {("family", "btc", 7)}
+    assert registry.resolve("family", "btc", 7, [9.0, 9.0, 9.0, 9.0], "c", train("c")) == "c"
+
+    token = REFRESHING.set(True)
+    try:
+        assert registry.resolve("family", "btc", 7, [9.0] * 5, "d", train("d")) == "d"
+    finally:
+        REFRESHING.reset(token)
+
+    assert fits == ["a", "c", "d"]
+    assert registry.stale_slots() == set()
+
+
+def test_scheduler_refits_only_after_a_new_daily_close():
+    service = SchedulerMarketData()
+    scheduler = TrainingScheduler(service, workers=2, intraday=False)
+
+    async def scenario():
+        first = await scheduler.run_once()
+        unchanged = await scheduler.run_once()
+        service.days += 1
+        after_close = await scheduler.run_once()
+        return first, unchanged, after_close
+
+    first, unchanged, after_close = asyncio.run(scenario())
+
+    assert first == after_close > 0
+    assert unchanged == 0
+    assert scheduler.status()["errors"] == 0
+    assert scheduler.status()["states"] > 0
+
+
+def test_scheduler_refits_only_the_stale_slot_between_closes(monkeypatch):
+    service = SchedulerMarketData()
+    scheduler = TrainingScheduler(service, intraday=False)
+    refits = []
+
+    def refit(_chart, _benchmark, family, horizon, coin):
+        refits.append((family, coin, horizon))
+
+    monkeypatch.setattr(training_scheduler, "refit_from_history", refit)
+
+    async def scenario():
+        await scheduler.run_once()
+        refits.clear()
+        monkeypatch.setattr(
+            training_scheduler.LIVE_STATES,
+            "stale_slots",
+            lambda: {("specialist", "bitcoin", 7), ("intraday_risk", "bitcoin", 1)},
+        )
+        return await scheduler.run_once()
+
+    assert asyncio.run(scenario()) == 1
+    assert refits == [("specialist", "bitcoin", 7)]